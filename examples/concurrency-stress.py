@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+''' Stress test of one Setup shared by many threads.
+
+Runs against a simulated API server on localhost (no network access or
+credentials needed) that answers every request after a fixed latency. The
+requests go through a real pooled HTTPAdapter, like the one the API mounts
+itself. The script checks that the get_status() throughput grows almost
+linearly with the number of threads, that the connections are reused from
+the pool, and that a thread logging in again and again never makes another
+thread send a user token together with the session token of another login.
+
+Usage: python3 examples/concurrency-stress.py [latency in ms]
+'''
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+
+# Import the package from this checkout when it is not installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from visonic import alarm
+from visonic.core import API
+
+latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.05
+threads = (1, 2, 4, 8, 16)
+requests_per_run = 64
+min_efficiency = 0.7
+
+# One connection per polling thread and one for the login thread
+pool_size = max(threads) + 1
+
+status = {
+    'connected': True,
+    'connected_status': {'bba': {'is_connected': True, 'state': 'online'}},
+    'discovery': {'completed': True, 'stages': 1, 'in_queue': 0, 'triggered': False},
+    'partitions': [{'id': -1, 'state': 'DISARM', 'status': '', 'ready': True, 'options': []}],
+    'rssi': {'level': 'good', 'network': '4G'},
+}
+
+
+class SimulatedServer(ThreadingHTTPServer):
+    ''' Answers like the API server after a fixed latency. '''
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), SimulatedHandler)
+        self.latency = latency
+        self.logins = itertools.count(1)
+        self.mismatches = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class SimulatedHandler(BaseHTTPRequestHandler):
+    ''' Handles the requests of one kept-alive connection. '''
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(server.latency)
+
+        endpoint = self.path.split('/rest_api/', 1)[1].split('/', 1)[-1]
+        if endpoint == 'auth':
+            data = {'user_token': f'user-{next(server.logins)}'}
+        elif endpoint == 'panel/login':
+            # The session token belongs to the user token it was created with
+            data = {'session_token': self.headers['User-Token'].replace('user-', 'session-')}
+        else:
+            if self.headers.get('Session-Token', '').replace('session-', 'user-') != self.headers.get('User-Token'):
+                with server.lock:
+                    server.mismatches += 1
+            data = status
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = respond
+
+
+class LocalAdapter(HTTPAdapter):
+    ''' Pooled adapter sending the https:// requests of the API to the
+    simulated server over plain HTTP. '''
+
+    def __init__(self, address, **kwargs):
+        self.address = address
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = 'http://%s:%d/' % self.address + request.url.split('/', 3)[3]
+        return super().send(request, **kwargs)
+
+
+def measure(setup, workers):
+    ''' Return the get_status() calls per second with a number of threads. '''
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        for result in executor.map(lambda _: setup.get_status(), range(requests_per_run)):
+            assert result.connected
+        return requests_per_run / (time.perf_counter() - start)
+
+
+def relogin(setup, stop):
+    ''' Log in again and again while the other threads poll. '''
+    while not stop.is_set():
+        setup.login('user@example.com', 'password', '123ABC', '1234')
+
+
+server = SimulatedServer(latency)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+session = requests.Session()
+session.mount('https://', LocalAdapter(server.server_address, pool_connections=1, pool_maxsize=pool_size))
+api = API('api.example.com', '00000000-0000-0000-0000-000000000000', session=session)
+setup = alarm.Setup('api.example.com', api.app_id, None, api=api)
+setup.login('user@example.com', 'password', '123ABC', '1234')
+
+print(f'Simulated latency {latency * 1000:.0f} ms, {requests_per_run} get_status() calls per run')
+print('threads  calls/s  speedup  efficiency')
+failed = False
+baseline = None
+stop = threading.Event()
+login_thread = threading.Thread(target=relogin, args=(setup, stop), daemon=True)
+login_thread.start()
+try:
+    for workers in threads:
+        rate = measure(setup, workers)
+        baseline = baseline or rate
+        speedup = rate / baseline
+        efficiency = speedup / workers
+        failed = failed or efficiency < min_efficiency
+        print(f'{workers:7}  {rate:7.1f}  {speedup:7.2f}  {efficiency:10.0%}')
+finally:
+    stop.set()
+    login_thread.join()
+    server.shutdown()
+
+logins = next(server.logins) - 1
+print(f'{logins} logins during the runs, {server.mismatches} requests with a mixed token pair')
+print(f'{server.connections} connections opened for a pool of {pool_size}')
+if server.mismatches or server.connections > pool_size:
+    failed = True
+if failed:
+    print(f'FAILED: efficiency below {min_efficiency:.0%}, mixed token pairs or connections not reused')
+    sys.exit(1)
+print('OK')
@@ -0,0 +1,167 @@
+import datetime
+import io
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from visonic import alarm
+
+HOSTNAME = 'api.example.com'
+APP_ID = '00000000-0000-0000-0000-000000000000'
+
+STATUS = {
+    'connected': True,
+    'connected_status': {'bba': {'is_connected': True, 'state': 'online'},
+                         'gprs': {'is_connected': False, 'state': 'unknown'}},
+    'discovery': {'completed': True, 'stages': 1, 'in_queue': 0, 'triggered': False},
+    'partitions': [{'id': -1, 'state': 'DISARM', 'status': '', 'ready': True, 'options': []}],
+    'rssi': {'level': 'good', 'network': '4G'},
+}
+
+DEVICES = [
+    {'subtype': 'CONTACT', 'device_type': 'ZONE', 'device_number': number, 'enrollment_id': '100-0305',
+     'id': 100 + number, 'name': f'Door {number}', 'partitions': [1], 'preenroll': False, 'removable': True,
+     'renamable': True, 'warnings': None, 'zone_type': 'PERIMETER',
+     'traits': {'location': {'name': 'Garage'}, 'bypass': {'enabled': False}}}
+    for number in range(1, 4)
+]
+
+EVENTS = [
+    {'event': 1000 + number, 'type_id': 86 if number % 2 else 89, 'label': 'ARM' if number % 2 else 'DISARM',
+     'description': 'Armed' if number % 2 else 'Disarmed', 'appointment': 'User 1',
+     'datetime': f'2022-09-11 {number:02d}:00:00', 'video': False, 'device_type': 'USER',
+     'zone': number % 3, 'partitions': [1], 'name': None}
+    for number in range(10)
+]
+
+FEATURES = {
+    'events': {'is_enabled': True}, 'datetime': {'is_enabled': True},
+    'partitions': {'is_enabled': False, 'is_labels_enabled': False, 'max_partitions': 1},
+    'devices': {'is_enabled': True}, 'sirens': {'can_enable': True, 'can_disable': True},
+    'home_automation_devices': {'is_enabled': False},
+    'state': {'is_enabled': True, 'can_set': True, 'can_get': True},
+    'faults': {'is_enabled': True}, 'diagnostic': {'is_enabled': True}, 'wifi': {'is_enabled': False},
+}
+
+COMMANDS = ('set_state', 'set_bypass_zone', 'set_name', 'set_user_code', 'disable_siren', 'activate_siren')
+
+
+def make_response(url, status_code=200, body=None, content=None, elapsed=0.0):
+    """ Build a requests.Response without a network connection. """
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.reason = requests.status_codes._codes.get(status_code, ('',))[0].replace('_', ' ').title()
+    response.elapsed = datetime.timedelta(seconds=elapsed)
+    response._content = content if content is not None else json.dumps(body).encode('utf-8')
+    response._content_consumed = True
+    response.raw = io.BytesIO(response._content)
+    return response
+
+
+class FakeSession(object):
+    """ Stands in for a requests session and answers like the API server.
+    A route maps an endpoint name to a body, or to a callable taking
+    (url, headers, data) and returning a body or a Response. Unknown
+    endpoints are answered with 404. """
+
+    def __init__(self, delay=0.0, routes=None):
+        self.delay = delay
+        self.calls = []
+        self.adapters = {}
+        self.lock = threading.Lock()
+        self.routes = {
+            'version': {'rest_versions': ['4.0', '9.0']},
+            'status': STATUS,
+            'devices': DEVICES,
+            'events': EVENTS,
+            'feature_set': FEATURES,
+            'troubles': [],
+            'locations': [],
+            'users': {'users': []},
+            'cameras': [],
+            'auth': {'user_token': 'user-token'},
+            'panel/login': {'session_token': 'session-token'},
+            'panels': [{'panel_serial': 'A1', 'alias': 'Home'}],
+        }
+        self.routes.update(routes or {})
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+    def close(self):
+        pass
+
+    def endpoints(self):
+        """ Return the names of the endpoints requested so far, in order. """
+        with self.lock:
+            return [endpoint_name(url) for url, headers, data in self.calls]
+
+    def count(self, endpoint):
+        return self.endpoints().count(endpoint)
+
+    def respond(self, url, headers, data=None):
+        with self.lock:
+            self.calls.append((url, headers or {}, data))
+            number = len(self.calls)
+        if self.delay:
+            time.sleep(self.delay)
+
+        name = endpoint_name(url)
+        route = self.routes.get(name)
+        if route is None and name in COMMANDS:
+            route = {'process_token': f'token-{number}'}
+        if route is None and name == 'process_status':
+            tokens = url.split('process_tokens=', 1)[1].split(',')
+            route = [{'token': token, 'status': 'succeeded', 'message': '', 'error': None} for token in tokens]
+        if route is None:
+            return make_response(url, 404, {'error': 404})
+
+        body = route(url, headers or {}, data) if callable(route) else route
+        if isinstance(body, requests.Response):
+            return body
+        return make_response(url, 200, body, elapsed=self.delay)
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        return self.respond(url, headers)
+
+    def post(self, url, headers=None, data=None, timeout=None, **kwargs):
+        return self.respond(url, headers, data)
+
+
+def process_statuses(status):
+    """ Return a process_status route answering every token with the same status. """
+    def route(url, headers, data):
+        tokens = url.split('process_tokens=', 1)[1].split(',')
+        return [{'token': token, 'status': status, 'message': '', 'error': None} for token in tokens]
+    return route
+
+
+def endpoint_name(url):
+    """ Return the endpoint name of a URL, for example 'status' or 'panel/login'. """
+    path = url.split('?', 1)[0].split('/rest_api/', 1)[-1]
+    return path if path == 'version' else path.split('/', 1)[-1]
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def make_setup(monkeypatch):
+    """ Return a factory creating a Setup talking to a FakeSession. """
+
+    def factory(session=None, login=True, **kwargs):
+        session = session if session is not None else FakeSession()
+        monkeypatch.setattr(requests, 'session', lambda: session)
+        monkeypatch.setattr(requests, 'Session', lambda: session)
+        setup = alarm.Setup(kwargs.pop('hostname', HOSTNAME), APP_ID, **kwargs)
+        if login:
+            setup.login('user@example.com', 'password', 'A1', '1234')
+        return setup, session
+
+    return factory
@@ -0,0 +1,40 @@
+import json
+
+from conftest import FakeSession, make_response
+from visonic.batch import BatchExecutor, NameOperation, UserCodeOperation
+from visonic.exceptions import InvalidUserCodeError
+
+
+def test_runs_operations_in_order(make_setup):
+    setup, session = make_setup()
+    operations = [NameOperation('DEVICE', 101, 'Front door'), UserCodeOperation(2, '4321'),
+                  NameOperation('PARTITION', 1, 'Ground floor')]
+    results = BatchExecutor(setup, max_workers=3).run(operations)
+
+    assert [result.key for result in results] == operations
+    assert all(result.succeeded for result in results)
+    assert session.count('set_name') == 2
+    assert session.count('set_user_code') == 1
+    assert session.count('process_status') == 1
+
+    names = sorted(json.loads(data)['name'] for url, headers, data in session.calls if url.endswith('/set_name'))
+    assert names == ['Front door', 'Ground floor']
+
+
+def test_failed_operation_does_not_stop_the_batch(make_setup):
+    def user_code(url, headers, data):
+        response = make_response(url, 444, {'error': 10444})
+        response.reason = 'Wrong user code'
+        return response
+
+    setup, session = make_setup(FakeSession(routes={'set_user_code': user_code}))
+    results = BatchExecutor(setup).run([UserCodeOperation(2, '1'), NameOperation('USER', 2, 'Guest')])
+
+    assert isinstance(results[0].error, InvalidUserCodeError)
+    assert results[1].succeeded
+
+
+def test_user_code_is_not_shown():
+    operation = UserCodeOperation(2, '4321')
+    assert '4321' not in repr(operation)
+    assert repr(NameOperation('USER', 2, 'Guest')) == "NameOperation(object_class = 'USER', id = 2, name = 'Guest')"
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+
+import pytest
+
+from conftest import HOSTNAME, make_response
+from visonic import capabilities
+from visonic.capabilities import CapabilityMap
+from visonic.exceptions import NotFoundError, NotSupportedError
+from visonic.hosts import HostPool
+
+
+def not_found(url, headers, data):
+    return make_response(url, 404, {'error': 404})
+
+
+def test_known_unsupported_endpoint_fails_without_request(make_setup):
+    setup, session = make_setup()
+    with pytest.raises(NotSupportedError):
+        setup.api.get_panel_info()
+    assert session.count('panel_info') == 0
+
+
+def test_learns_missing_endpoint_from_404(make_setup):
+    setup, session = make_setup()
+    session.routes['troubles'] = not_found
+
+    with pytest.raises(NotFoundError):
+        setup.api.get_troubles()
+    with pytest.raises(NotSupportedError):
+        setup.api.get_troubles()
+    assert session.count('troubles') == 1
+    assert setup.api.capabilities.unsupported(HOSTNAME, setup.api.rest_version) == ['troubles']
+
+
+def test_never_learns_login_endpoints():
+    capability_map = CapabilityMap()
+    capability_map.mark_unsupported(HOSTNAME, '9.0', 'panel/login')
+    assert capability_map.is_supported(HOSTNAME, '9.0', 'panel/login')
+
+
+def test_learned_endpoint_is_probed_again_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(capabilities.time, 'time', lambda: now[0])
+    capability_map = CapabilityMap(ttl=60)
+    capability_map.mark_unsupported(HOSTNAME, '9.0', 'troubles')
+
+    now[0] += 60
+    assert not capability_map.is_supported(HOSTNAME, '9.0', 'troubles')
+    now[0] += 1
+    assert capability_map.is_supported(HOSTNAME, '9.0', 'troubles')
+    assert capability_map.unsupported(HOSTNAME, '9.0') == []
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'capabilities.json')
+    capability_map = CapabilityMap(path)
+    capability_map.mark_unsupported(HOSTNAME, '9.0', 'troubles')
+    capability_map.mark_unsupported('other.example.com', '4.0', 'cameras')
+
+    loaded = CapabilityMap(path)
+    assert loaded.unsupported(HOSTNAME, '9.0') == ['troubles']
+    assert loaded.unsupported('other.example.com', '4.0') == ['cameras']
+    assert os.listdir(str(tmp_path)) == ['capabilities.json']
+
+
+def test_concurrent_saves_leave_a_complete_file(tmp_path):
+    path = str(tmp_path / 'capabilities.json')
+    maps = [CapabilityMap(path) for _ in range(4)]
+    errors = []
+
+    def learn(capability_map, number):
+        try:
+            for endpoint in range(25):
+                capability_map.mark_unsupported(HOSTNAME, '9.0', f'endpoint-{number}-{endpoint}')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=learn, args=(m, n)) for n, m in enumerate(maps)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(path, 'r', encoding='utf-8') as fh:
+        json.load(fh)
+    assert os.listdir(str(tmp_path)) == ['capabilities.json']
+
+
+def test_learns_per_routed_host(make_setup):
+    setup, session = make_setup(hostname='a.example.com')
+    setup.api.set_host_pool(HostPool(['a.example.com', 'b.example.com'], probe_interval=0))
+
+    def troubles(url, headers, data):
+        if url.startswith('https://a.example.com/'):
+            return make_response(url, 404, {'error': 404})
+        return []
+    session.routes['troubles'] = troubles
+
+    with pytest.raises(NotFoundError):
+        setup.api.get_troubles()
+    rest_version = setup.api.rest_version
+    assert setup.api.capabilities.unsupported('a.example.com', rest_version) == ['troubles']
+    assert setup.api.capabilities.unsupported('b.example.com', rest_version) == []
+
+    # The host lacking the endpoint is skipped, the other one still answers
+    assert setup.api.get_troubles() == []
+    urls = [url for url, headers, data in session.calls if 'troubles' in url]
+    assert urls[-1].startswith('https://b.example.com/')
+
+    session.routes['troubles'] = not_found
+    with pytest.raises(NotFoundError):
+        setup.api.get_troubles()
+    with pytest.raises(NotSupportedError):
+        setup.api.get_troubles()
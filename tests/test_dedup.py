@@ -0,0 +1,58 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from conftest import FakeSession, process_statuses
+
+
+def test_concurrent_identical_commands_share_one_request(make_setup):
+    setup, session = make_setup(FakeSession(delay=0.05), dedup_window=5)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        tokens = list(executor.map(lambda _: setup.disarm(), range(4)))
+    assert len(set(tokens)) == 1
+    assert session.count('set_state') == 1
+
+
+def test_succeeded_command_is_reused_within_the_window(make_setup):
+    setup, session = make_setup(dedup_window=0.2)
+    token = setup.disarm()
+    setup.get_process_status(token)
+    assert setup.disarm() == token
+    assert session.count('set_state') == 1
+
+    time.sleep(0.25)
+    assert setup.disarm() != token
+    assert session.count('set_state') == 2
+
+
+def test_command_not_known_to_succeed_is_sent_again(make_setup):
+    setup, session = make_setup(dedup_window=5)
+    first = setup.disarm()
+    assert setup.disarm() != first
+    assert session.count('set_state') == 2
+
+
+def test_failed_command_is_sent_again(make_setup):
+    setup, session = make_setup(FakeSession(routes={'process_status': process_statuses('failed')}), dedup_window=5)
+    token = setup.disarm()
+    setup.get_process_status(token)
+    assert setup.disarm() != token
+    assert session.count('set_state') == 2
+
+
+def test_other_commands_and_targets_are_sent(make_setup):
+    setup, session = make_setup(dedup_window=5)
+    for token in (setup.arm_away(), setup.arm_away(1), setup.set_bypass_zone(3, True)):
+        setup.get_process_status(token)
+    setup.disarm()
+    setup.arm_away(1)
+    setup.set_bypass_zone(3, False)
+    assert session.count('set_state') == 3
+    assert session.count('set_bypass_zone') == 2
+
+
+def test_disabled_by_default(make_setup):
+    setup, session = make_setup()
+    token = setup.disarm()
+    setup.get_process_status(token)
+    setup.disarm()
+    assert session.count('set_state') == 2
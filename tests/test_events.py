@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def test_filters_by_type_zone_and_label(make_setup):
+    setup, session = make_setup()
+
+    assert all(event.type_id == 86 for event in setup.get_events(types={86}))
+    assert all(event.zone in (1, 2) for event in setup.get_events(zones={1, 2}))
+    assert [event.label for event in setup.get_events(labels={'DISARM'})] == ['DISARM'] * 5
+
+
+def test_since_event_id(make_setup):
+    setup, session = make_setup()
+
+    assert [event.id for event in setup.get_events(since=1007)] == [1008, 1009]
+
+
+@pytest.mark.parametrize('since', [
+    datetime(2022, 9, 11, 7, 0),
+    '2022-09-11 07:00:00',
+    datetime(2022, 9, 11, 5, 0, tzinfo=timezone.utc),
+    datetime(2022, 9, 11, 7, 0, tzinfo=timezone(timedelta(hours=2))),
+    '2022-09-11T06:00:00+01:00',
+])
+def test_since_datetime(make_setup, since):
+    setup, session = make_setup()
+
+    # The server reports the events at 00:00 - 09:00 UTC, returned two hours later
+    events = setup.get_events(timestamp_hour_offset=2, since=since)
+
+    assert [event.datetime for event in events] == [f'2022-09-11 {hour:02d}:00:00' for hour in range(7, 12)]
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import FakeSession, make_response
+from visonic.eventstore import EventStore
+
+
+@pytest.fixture
+def store():
+    store = EventStore()
+    yield store
+    store.close()
+
+
+def test_get_events_stores_each_event_once(make_setup, store):
+    setup, session = make_setup(event_store=store)
+    assert setup.event_store is store
+
+    setup.get_events()
+    setup.get_events()
+    assert store.count() == 10
+    assert store.count('A1') == 10
+    assert store.count('B2') == 0
+
+
+def test_stored_events_match_the_returned_events(make_setup, store):
+    setup, session = make_setup(event_store=store)
+    events = setup.get_events()
+    assert [e.as_dict() for e in store.events('A1')] == [e.as_dict() for e in events]
+    assert [e.id for e in store.events(limit=3)] == [1007, 1008, 1009]
+
+
+def test_queries(make_setup, store):
+    setup, session = make_setup(event_store=store)
+    setup.get_events(timestamp_hour_offset=0)
+
+    assert [e.id for e in store.events_between('2022-09-11 02:00:00', datetime(2022, 9, 11, 5))] == [1002, 1003, 1004]
+    assert [e.id for e in store.events_for_zone(1)] == [1001, 1004, 1007]
+    assert [e.id for e in store.events_of_type(86, start='2022-09-11 05:00:00')] == [1005, 1007, 1009]
+    assert len(store.events_for_partition(1, panel='A1')) == 10
+    assert store.events_for_partition(2) == []
+
+
+def test_events_are_kept_per_panel(store):
+    store.add('A1', [])
+    with pytest.raises(ValueError):
+        store.add(None, [])
+
+
+def test_get_events_needs_a_panel_login(make_setup, store):
+    setup, session = make_setup(event_store=store, login=False)
+    with pytest.raises(ValueError):
+        setup.get_events()
+    assert session.count('events') == 0
+
+
+def test_failed_panel_login_keeps_the_serial(make_setup, store):
+    session = FakeSession()
+    setup, session = make_setup(session, event_store=store, login=False)
+    setup.authenticate('user@example.com', 'password')
+    session.routes['panel/login'] = lambda url, headers, data: make_response(url, 204, content=b'')
+
+    assert not setup.panel_login('A1', '1234')
+    assert setup.panel_serial is None
+    assert not setup.login('user@example.com', 'password', 'A1', '1234')
+    assert setup.panel_serial is None
+
+    session.routes['panel/login'] = {'session_token': 'session-token'}
+    assert setup.panel_login('A1', '1234')
+    assert setup.panel_serial == 'A1'
+
+    session.routes['panel/login'] = lambda url, headers, data: make_response(url, 204, content=b'')
+    assert not setup.panel_login('B2', '1234')
+    assert setup.panel_serial == 'A1'
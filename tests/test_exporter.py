@@ -0,0 +1,90 @@
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import make_response
+from visonic.exporter import PanelExporter
+
+
+def session_expired(session, times=1):
+    """ Answer the next status requests with an expired session token. """
+    expired = [times]
+    body = session.routes['status']
+
+    def status(url, headers, data):
+        if expired[0]:
+            expired[0] -= 1
+            response = make_response(url, 440, {'error': 10001})
+            response.reason = 'Session token not found'
+            return response
+        return body
+    session.routes['status'] = status
+
+
+def test_renders_the_panel_state(make_setup):
+    setup, session = make_setup()
+    exporter = PanelExporter()
+    exporter.add_panel('home "1"', setup)
+    exporter.poll()
+
+    metrics = exporter.metrics
+    assert 'visonic_panel_connected{panel="home \\"1\\""} 1' in metrics
+    assert 'visonic_partition_state{panel="home \\"1\\"",partition="-1",state="DISARM"} 1' in metrics
+    assert 'visonic_partition_ready{panel="home \\"1\\"",partition="-1"} 1' in metrics
+    assert 'visonic_panel_troubles{panel="home \\"1\\""} 0' in metrics
+    assert metrics.count('visonic_device_warnings{') == 3
+    assert 'visonic_exporter_up{panel="home \\"1\\""} 1' in metrics
+    assert '# TYPE visonic_exporter_token_refreshes_total counter' in metrics
+
+
+def test_refreshes_expired_tokens(make_setup):
+    setup, session = make_setup()
+    session_expired(session)
+    exporter = PanelExporter()
+    exporter.add_panel('home', setup, 'user@example.com', 'password', 'A1', '1234')
+    exporter.poll()
+
+    assert 'visonic_exporter_up{panel="home"} 1' in exporter.metrics
+    assert 'visonic_exporter_token_refreshes_total{panel="home"} 1' in exporter.metrics
+    assert session.count('auth') == 2
+
+
+def test_counts_errors_without_credentials(make_setup):
+    setup, session = make_setup()
+    session_expired(session)
+    exporter = PanelExporter()
+    exporter.add_panel('home', setup)
+    exporter.poll()
+
+    assert 'visonic_exporter_up{panel="home"} 0' in exporter.metrics
+    assert 'visonic_exporter_poll_errors_total{panel="home",error="SessionTokenError"} 1' in exporter.metrics
+    assert 'visonic_panel_connected{' not in exporter.metrics
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_serves_the_cached_metrics(make_setup):
+    setup, session = make_setup()
+    port = free_port()
+    exporter = PanelExporter(interval=60, address='127.0.0.1', port=port)
+    exporter.add_panel('home', setup)
+    exporter.start()
+    try:
+        exporter.poll()
+        statuses = session.count('status')
+        for _ in range(3):
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+                assert response.headers['Content-Type'].startswith('text/plain')
+                assert 'visonic_panel_connected{panel="home"} 1' in response.read().decode('utf-8')
+        assert session.count('status') == statuses
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/other')
+    finally:
+        exporter.stop()
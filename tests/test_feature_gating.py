@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import FEATURES, FakeSession
+from visonic.exceptions import NotSupportedError
+
+
+def features(**overrides):
+    """ Return the feature set with some groups replaced. """
+    return dict(FEATURES, **overrides)
+
+
+def test_disabled_feature_fails_without_request(make_setup):
+    session = FakeSession(routes={'feature_set': features(events={'is_enabled': False})})
+    setup, session = make_setup(session, feature_gating=True)
+
+    with pytest.raises(NotSupportedError, match='events_enabled'):
+        setup.get_events()
+    assert session.count('events') == 0
+    assert setup.get_status().connected
+
+
+def test_feature_set_fetched_once_per_panel(make_setup):
+    setup, session = make_setup(feature_gating=True)
+    setup.get_status()
+    setup.get_devices()
+    setup.disarm()
+    assert session.count('feature_set') == 1
+
+    setup.panel_login('B2', '1234')
+    setup.get_status()
+    assert session.count('feature_set') == 2
+
+    setup.clear_feature_set_cache()
+    setup.get_status()
+    assert session.count('feature_set') == 3
+
+
+def test_commands_are_gated(make_setup):
+    session = FakeSession(routes={'feature_set': features(state={'is_enabled': True, 'can_set': False, 'can_get': True},
+                                                         sirens={'can_enable': False, 'can_disable': True})})
+    setup, session = make_setup(session, feature_gating=True)
+
+    for command in (setup.arm_away, setup.arm_home, setup.disarm, setup.activate_siren):
+        with pytest.raises(NotSupportedError):
+            command()
+    setup.disable_siren()
+    assert session.endpoints().count('set_state') == 0
+
+
+def test_disabled_by_default(make_setup):
+    session = FakeSession(routes={'feature_set': features(events={'is_enabled': False})})
+    setup, session = make_setup(session)
+    setup.get_events()
+    assert session.count('feature_set') == 0
@@ -0,0 +1,99 @@
+import json
+import time
+
+from conftest import FakeSession, STATUS
+from visonic.exceptions import NotFoundError, PartitionNotReadyError
+from visonic.fleet import FleetOrchestrator, FleetTarget, RateLimiter
+
+
+class Panel(FakeSession):
+    """ FakeSession of a panel with two partitions whose state follows the
+    set_state commands. """
+
+    def __init__(self, ready=True, process_status='succeeded'):
+        self.partitions = [
+            {'id': 1, 'state': 'DISARM', 'status': '', 'ready': ready, 'options': []},
+            {'id': 2, 'state': 'DISARM', 'status': '', 'ready': True, 'options': []},
+        ]
+        self.process_status = process_status
+        super().__init__(routes={'status': self.status, 'process_status': self.process})
+
+    def status(self, url, headers, data):
+        return dict(STATUS, partitions=[dict(p) for p in self.partitions])
+
+    def process(self, url, headers, data):
+        tokens = url.split('process_tokens=', 1)[1].split(',')
+        return [{'token': token, 'status': self.process_status, 'message': '', 'error': None} for token in tokens]
+
+    def respond(self, url, headers, data=None):
+        if data is not None and url.endswith('/set_state') and self.process_status == 'succeeded':
+            command = json.loads(data)
+            for partition in self.partitions:
+                if command['partition'] in (-1, partition['id']):
+                    partition['state'] = command['state']
+        return super().respond(url, headers, data)
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # Two requests of the burst at once, then 20 per second
+    assert time.monotonic() - start >= 0.18
+
+
+def test_arms_and_confirms_targets(make_setup):
+    setups = [make_setup(Panel())[0] for _ in range(3)]
+    fleet = FleetOrchestrator(rate_per_host=1000, interval=0.01)
+
+    results = list(fleet.arm_away([(setup, 1) for setup in setups] + [FleetTarget(setups[0], 2, 'Garage')]))
+    assert len(results) == 4
+    assert all(result.succeeded and result.state == 'AWAY' for result in results)
+    assert all(result.process.status == 'succeeded' for result in results)
+
+
+def test_status_checked_once_per_panel(make_setup):
+    setup, panel = make_setup(Panel())
+    fleet = FleetOrchestrator(rate_per_host=1000, interval=0.01)
+    list(fleet.arm_home([(setup, 1), (setup, 2)]))
+    assert panel.count('set_state') == 2
+    # One readiness check and one confirmation for both partitions
+    assert panel.count('status') == 2
+
+
+def test_partition_not_ready(make_setup):
+    setup, panel = make_setup(Panel(ready=False))
+    fleet = FleetOrchestrator(rate_per_host=1000, interval=0.01)
+    results = {result.target.partition: result for result in fleet.arm_away([(setup, 1), (setup, 2)])}
+
+    assert isinstance(results[1].error, PartitionNotReadyError)
+    assert results[2].succeeded
+    assert panel.count('set_state') == 1
+
+
+def test_unknown_partition_is_not_armed(make_setup):
+    setup, panel = make_setup(Panel())
+    fleet = FleetOrchestrator(rate_per_host=1000, interval=0.01)
+    [result] = fleet.arm_away([(setup, 7)])
+
+    assert isinstance(result.error, NotFoundError)
+    assert panel.count('set_state') == 0
+
+
+def test_unknown_partition_is_not_waited_for(make_setup):
+    setup, panel = make_setup(Panel())
+    fleet = FleetOrchestrator(rate_per_host=1000, interval=0.01, timeout=30)
+    start = time.monotonic()
+    [result] = fleet.disarm([(setup, 7)])
+
+    assert isinstance(result.error, NotFoundError)
+    assert time.monotonic() - start < 5
+
+
+def test_failed_process(make_setup):
+    setup, panel = make_setup(Panel(process_status='failed'))
+    fleet = FleetOrchestrator(rate_per_host=1000, interval=0.01)
+    [result] = fleet.arm_away([(setup, 1)])
+    assert not result.succeeded and not result.confirmed
+    assert result.process.status == 'failed'
@@ -0,0 +1,60 @@
+import pytest
+
+from visonic.exceptions import NotFoundError
+from visonic.hooks import MetricsCollector, RequestHook
+
+
+class RecordingHook(RequestHook):
+
+    def __init__(self):
+        self.events = []
+
+    def on_request_start(self, endpoint, method, bytes_out):
+        self.events.append(('start', endpoint, method))
+
+    def on_response(self, endpoint, method, status_code, bytes_in, latency, server_time, decode_time):
+        self.events.append(('response', endpoint, method, status_code))
+
+    def on_error(self, endpoint, method, error, latency):
+        self.events.append(('error', endpoint, method, type(error).__name__))
+
+
+def test_hooks_see_requests_and_responses(make_setup):
+    setup, session = make_setup()
+    hook = RecordingHook()
+    setup.api.add_hook(hook)
+
+    setup.get_status()
+
+    assert hook.events == [('start', 'status', 'GET'), ('response', 'status', 'GET', 200)]
+
+
+def test_hooks_see_errors(make_setup):
+    setup, session = make_setup()
+    hook = RecordingHook()
+    setup.api.add_hook(hook)
+    del session.routes['locations']
+
+    with pytest.raises(NotFoundError):
+        setup.get_locations()
+
+    assert hook.events[-1] == ('error', 'locations', 'GET', 'NotFoundError')
+
+
+def test_metrics_collector_counts_per_endpoint(make_setup):
+    setup, session = make_setup()
+    metrics = MetricsCollector(buckets=(0.5, 1.0))
+    setup.api.add_hook(metrics)
+
+    setup.get_status()
+    setup.get_status()
+    setup.disarm()
+
+    stats = metrics.as_dict()
+    assert stats['GET status']['requests'] == 2
+    assert stats['GET status']['responses'] == 2
+    assert stats['GET status']['latency_histogram']['0.5'] == 2
+    assert stats['POST set_state']['bytes_out'] > 0
+
+    metrics.reset()
+    assert metrics.as_dict() == {}
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from visonic.exceptions import ConnectionTimeoutError
+from visonic.hosts import HostPool
+
+
+def test_candidates_fastest_healthy_first():
+    pool = HostPool(['a', 'b', 'c'], probe_interval=0)
+    assert pool.candidates() == ['a', 'b', 'c']
+
+    pool.observe('a', 0.3)
+    pool.observe('b', 0.1)
+    assert pool.candidates() == ['b', 'a', 'c']
+
+    pool.mark_failed('b')
+    assert pool.candidates() == ['a', 'c', 'b']
+    assert pool.best() == 'a'
+
+
+def test_failed_host_is_avoided_for_the_cooldown():
+    pool = HostPool(['a', 'b'], probe_interval=0, failure_cooldown=0.05)
+    pool.mark_failed('a')
+    assert not pool.is_healthy('a')
+    time.sleep(0.1)
+    assert pool.is_healthy('a')
+
+    # A successful request makes the host healthy again at once
+    pool.mark_failed('b')
+    pool.observe('b', 0.1)
+    assert pool.is_healthy('b')
+
+
+def routed(make_setup, errors):
+    """ Return a Setup routing over hosts a and b, where the requests to a
+    host in errors raise its exception. """
+    setup, session = make_setup(hostname='a.example.com')
+    setup.api.set_host_pool(HostPool(['a.example.com', 'b.example.com'], probe_interval=0))
+    respond = session.respond
+
+    def send(url, headers, data=None):
+        hostname = url.split('/')[2]
+        if hostname in errors:
+            session.calls.append((url, headers, data))
+            raise errors[hostname]
+        return respond(url, headers, data)
+
+    session.get = lambda url, headers=None, timeout=None, **kwargs: send(url, headers)
+    session.post = lambda url, headers=None, data=None, timeout=None, **kwargs: send(url, headers, data)
+    return setup, session
+
+
+def hosts(session, endpoint):
+    return [url.split('/')[2] for url, headers, data in session.calls if url.split('?')[0].endswith('/' + endpoint)]
+
+
+def test_get_fails_over_after_a_read_timeout(make_setup):
+    setup, session = routed(make_setup, {'a.example.com': requests.exceptions.ReadTimeout()})
+    assert setup.get_status().connected
+    assert hosts(session, 'status') == ['a.example.com', 'b.example.com']
+    assert setup.api.host_pool.candidates()[0] == 'b.example.com'
+
+    # The tokens go to the host that was used
+    url, headers, data = session.calls[-1]
+    assert headers['Host'] == 'b.example.com'
+    assert headers['Session-Token'] == 'session-token'
+
+
+def test_post_is_only_resent_when_not_connected(make_setup):
+    setup, session = routed(make_setup, {'a.example.com': requests.exceptions.ConnectTimeout()})
+    setup.disarm()
+    assert hosts(session, 'set_state') == ['a.example.com', 'b.example.com']
+
+    setup, session = routed(make_setup, {'a.example.com': requests.exceptions.ReadTimeout()})
+    with pytest.raises(ConnectionTimeoutError, match="'a.example.com'"):
+        setup.disarm()
+    assert hosts(session, 'set_state') == ['a.example.com']
+
+
+def test_timeout_names_the_routed_host(make_setup):
+    setup, session = routed(make_setup, {'a.example.com': requests.exceptions.ReadTimeout(),
+                                         'b.example.com': requests.exceptions.ReadTimeout()})
+    with pytest.raises(ConnectionTimeoutError, match="'b.example.com' did not respond"):
+        setup.get_status()
+
+
+def test_close_stops_probing(make_setup):
+    before = set(threading.enumerate())
+    setup, session = make_setup(hostname=['a.example.com', 'b.example.com'])
+    assert set(threading.enumerate()) - before
+
+    setup.close()
+    assert not [thread for thread in set(threading.enumerate()) - before if thread.is_alive()]
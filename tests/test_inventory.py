@@ -0,0 +1,78 @@
+import time
+
+from conftest import EVENTS
+from visonic.classes import Event
+from visonic.inventory import InventoryCache
+
+
+def event(id, label, type_id=0):
+    return Event(id=id, type_id=type_id, label=label, description='', appointment='', datetime='2022-09-11 10:00:00',
+                 video=False, device_type='ZONE', zone=1, partitions=[1], name=None)
+
+
+def add_event(session, id, label, type_id=0):
+    new = dict(EVENTS[0], event=id, label=label, type_id=type_id, datetime='2022-09-11 10:00:00')
+    session.routes['events'] = list(session.routes['events']) + [new]
+
+
+def test_inventories_are_kept_until_a_relevant_event(make_setup):
+    setup, session = make_setup()
+    inventory = InventoryCache(setup)
+    assert inventory.poll() == set()
+    assert inventory.last_event == 1009
+
+    for _ in range(3):
+        assert len(inventory.get_devices()) == 3
+        inventory.get_locations()
+        inventory.poll()
+    assert session.count('devices') == 1
+    assert session.count('locations') == 1
+
+    add_event(session, 1010, 'ZONE_BYPASS')
+    assert inventory.poll() == {'devices'}
+    inventory.get_devices()
+    inventory.get_locations()
+    assert session.count('devices') == 2
+    assert session.count('locations') == 1
+
+
+def test_events_are_processed_once():
+    inventory = InventoryCache(None)
+    assert inventory.process_events([event(5, 'USER_CODE_CHANGED')]) == {'users'}
+    assert inventory.process_events([event(5, 'USER_CODE_CHANGED'), event(4, 'ENROLL')]) == set()
+    assert inventory.process_events([event(6, 'DEVICE_ENROLLED')]) == {'devices', 'locations'}
+    assert inventory.last_event == 6
+
+
+def test_custom_type_ids_and_labels():
+    inventory = InventoryCache(None, type_ids={120: ('locations',)}, labels={'NEW_SENSOR': ('devices',)})
+    assert inventory.inventories_for(event(1, 'SOMETHING', type_id=120)) == {'locations'}
+    assert inventory.inventories_for(event(2, 'NEW_SENSOR')) == {'devices'}
+    assert inventory.inventories_for(event(3, None)) == set()
+
+
+def test_invalidate_and_max_age(make_setup):
+    setup, session = make_setup()
+    inventory = InventoryCache(setup, max_age=0.1)
+    inventory.get_devices()
+    inventory.get_users()
+    inventory.invalidate('users')
+    inventory.get_devices()
+    inventory.get_users()
+    assert session.count('devices') == 1
+    assert session.count('users') == 2
+
+    time.sleep(0.15)
+    inventory.get_devices()
+    assert session.count('devices') == 2
+
+    inventory.invalidate()
+    inventory.get_users()
+    assert session.count('users') == 3
+
+
+def test_returned_lists_are_copies(make_setup):
+    setup, session = make_setup()
+    inventory = InventoryCache(setup)
+    inventory.get_devices().clear()
+    assert len(inventory.get_devices()) == 3
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from visonic.core import API
+
+
+def test_sends_version_requests_while_idle(make_setup):
+    setup, session = make_setup(keep_warm=0.05)
+    versions = session.count('version')
+    time.sleep(0.3)
+    assert session.count('version') >= versions + 2
+
+    setup.close()
+    versions = session.count('version')
+    time.sleep(0.15)
+    assert session.count('version') == versions
+
+
+def test_no_version_requests_while_busy(make_setup):
+    setup, session = make_setup(keep_warm=0.2)
+    versions = session.count('version')
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        setup.get_status()
+        time.sleep(0.02)
+    assert session.count('version') == versions
+    setup.close()
+
+
+def test_context_manager_stops_keep_warm(make_setup):
+    before = set(threading.enumerate())
+    setup, session = make_setup(login=False)
+    with setup:
+        setup.api.start_keep_warm(0.05, preconnect=False)
+        assert set(threading.enumerate()) - before
+    assert not [thread for thread in set(threading.enumerate()) - before if thread.is_alive()]
+
+
+def test_shared_api_is_left_open(make_setup, session):
+    api = API('api.example.com', '00000000-0000-0000-0000-000000000000', session=session)
+    api.start_keep_warm(0.05, preconnect=False)
+    setup, session = make_setup(session=session, api=api, api_version=None, login=False)
+    setup.close()
+    versions = session.count('version')
+    time.sleep(0.15)
+    assert session.count('version') > versions
+    api.close()
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import requests
+
+from conftest import make_response
+from visonic.latency import LatencyTracker
+
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.observe('status', 0.1)
+    tracker.observe('status', 0.2)
+    assert tracker.percentile('status', 0.95) is None
+
+    tracker.observe('status', 0.3)
+    assert tracker.percentile('status', 0.95) == 0.3
+    assert tracker.percentile('devices', 0.95) is None
+
+
+def test_timeout_is_bounded():
+    tracker = LatencyTracker(min_samples=2, min_timeout=0.5, max_timeout=4.0)
+    assert tracker.timeout('status', 4) == 4
+
+    for _ in range(5):
+        tracker.observe('status', 0.01)
+    assert tracker.timeout('status', 4) == 0.5
+
+    for _ in range(100):
+        tracker.observe('slow', 3.0)
+    assert tracker.timeout('slow', 4) == 4.0
+
+
+def test_adaptive_timeouts_only_for_get(make_setup):
+    setup, session = make_setup()
+    setup.api.set_adaptive_timeouts()
+    for _ in range(20):
+        setup.get_status()
+        setup.disarm()
+
+    timeouts = {}
+    respond = session.respond
+
+    def get(url, headers=None, timeout=None, **kwargs):
+        timeouts['GET'] = timeout
+        return respond(url, headers)
+
+    def post(url, headers=None, data=None, timeout=None, **kwargs):
+        timeouts['POST'] = timeout
+        return respond(url, headers, data)
+
+    session.get, session.post = get, post
+    setup.get_status()
+    setup.disarm()
+
+    assert timeouts['GET'] < 4
+    assert timeouts['POST'] == 4
+
+
+def slow_first_copy(session, first_delay, second_delay):
+    """ Answer the first status request after first_delay and the following ones after second_delay. """
+    calls = []
+    lock = threading.Lock()
+
+    def status(url, headers, data):
+        with lock:
+            calls.append(time.monotonic())
+            number = len(calls)
+        time.sleep(first_delay if number == 1 else second_delay)
+        return session.routes['hedged']
+
+    session.routes['hedged'] = session.routes['status']
+    session.routes['status'] = status
+    return calls
+
+
+def test_hedged_request_returns_the_fastest_reply(make_setup):
+    setup, session = make_setup()
+    setup.api.set_hedging(endpoints=('status',), delay=0.1)
+    calls = slow_first_copy(session, 2.0, 0.05)
+
+    start = time.monotonic()
+    assert setup.get_status().connected
+    assert time.monotonic() - start < 1.0
+    assert len(calls) == 2
+
+
+def test_hedged_request_falls_back_when_a_copy_fails(make_setup):
+    setup, session = make_setup()
+    setup.api.set_hedging(endpoints=('status',), delay=0.05)
+    calls = []
+
+    def status(url, headers, data):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            raise requests.exceptions.ReadTimeout('first copy timed out')
+        time.sleep(0.3)
+        return make_response(url, 200, session.routes['hedged'])
+
+    session.routes['hedged'] = session.routes['status']
+    session.routes['status'] = status
+
+    assert setup.get_status().connected
+    assert len(calls) == 2
+
+
+def test_concurrent_hedged_requests_do_not_queue(make_setup):
+    setup, session = make_setup()
+    setup.api.set_hedging(endpoints=('status',), delay=0.05)
+    session.routes['hedged'] = session.routes['status']
+    session.routes['status'] = lambda url, headers, data: time.sleep(0.3) or session.routes['hedged']
+
+    threads = [threading.Thread(target=setup.get_status) for _ in range(20)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 40 copies of 0.3 seconds would take 1.5 seconds with 8 pooled workers
+    assert time.monotonic() - start < 1.0
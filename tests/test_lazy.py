@@ -0,0 +1,54 @@
+from conftest import FakeSession
+from visonic.classes import Event, Status, Trouble
+from visonic.devices import ContactDevice
+from visonic.lazy import LazyContactDevice, LazyStatus
+
+TROUBLES = [{'device_type': 'ZONE', 'location': 'Garage', 'partitions': [1], 'trouble_type': 'TAMPER',
+             'zone': 2, 'zone_name': 'Door 2', 'zone_type': 'PERIMETER'}]
+
+
+def both(make_setup, method, **kwargs):
+    """ Return the result of a Setup method without and with lazy views. """
+    eager, session = make_setup(FakeSession(routes={'troubles': TROUBLES}))
+    lazy, session = make_setup(FakeSession(routes={'troubles': TROUBLES}), lazy=True)
+    return getattr(eager, method)(**kwargs), getattr(lazy, method)(**kwargs)
+
+
+def fields(model):
+    """ Return the printed fields of a model, without the class names. """
+    return str(model).split(': ', 1)[1].replace('LazyPartition(', 'Partition(')
+
+
+def test_devices_match_the_models(make_setup):
+    eager, lazy = both(make_setup, 'get_devices')
+    assert all(isinstance(device, LazyContactDevice) and isinstance(device, ContactDevice) for device in lazy)
+    assert [fields(device) for device in lazy] == [fields(device) for device in eager]
+    assert [device.as_dict() for device in lazy] == [device.as_dict() for device in eager]
+
+
+def test_events_match_the_models(make_setup):
+    eager, lazy = both(make_setup, 'get_events', timestamp_hour_offset=3)
+    assert all(isinstance(event, Event) for event in lazy)
+    assert [event.as_dict() for event in lazy] == [event.as_dict() for event in eager]
+
+
+def test_status_matches_the_model(make_setup):
+    eager, lazy = both(make_setup, 'get_status')
+    assert isinstance(lazy, LazyStatus) and isinstance(lazy, Status)
+    assert fields(lazy) == fields(eager)
+
+
+def test_troubles_match_the_models(make_setup):
+    eager, lazy = both(make_setup, 'get_troubles')
+    assert all(isinstance(trouble, Trouble) for trouble in lazy)
+    assert [fields(trouble) for trouble in lazy] == [fields(trouble) for trouble in eager]
+
+
+def test_properties_are_computed_when_read(make_setup):
+    setup, session = make_setup(lazy=True)
+    device = setup.get_devices()[0]
+    assert vars(device) == {'_raw': device._raw}
+
+    assert device.name == 'Door 1'
+    assert set(vars(device)) == {'_raw', '_Device__name'}
+    assert device.name == 'Door 1'
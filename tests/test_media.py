@@ -0,0 +1,101 @@
+import os
+
+import pytest
+import requests
+
+from conftest import HOSTNAME, make_response
+from visonic.exceptions import ConnectionTimeoutError, NotFoundError, SessionTokenError
+from visonic.media import MediaFetcher
+
+
+class Camera(object):
+
+    def __init__(self, zone, timestamp, preview_path):
+        self.zone = zone
+        self.timestamp = timestamp
+        self.preview_path = preview_path
+
+
+@pytest.fixture
+def files(make_setup, tmp_path):
+    """ Serve file downloads from a dictionary of {url: content or exception}. """
+    setup, session = make_setup()
+    served = {}
+    requested = []
+    get = session.get
+
+    def download(url, headers=None, timeout=None, stream=False, **kwargs):
+        if not stream:
+            return get(url, headers, timeout)
+        requested.append((url, headers))
+        content = served.get(url)
+        if isinstance(content, Exception):
+            raise content
+        if content is None:
+            return make_response(url, 404, {'error': 404})
+        if isinstance(content, int):
+            return make_response(url, content, {'error': content})
+        return make_response(url, 200, content=content)
+
+    session.get = download
+    return setup, served, requested
+
+
+def test_previews_are_cached_by_zone_and_timestamp(files, tmp_path):
+    setup, served, requested = files
+    served[f'https://{HOSTNAME}/previews/4.jpg'] = b'image'
+    fetcher = MediaFetcher(setup, str(tmp_path))
+    camera = Camera(4, '2022-09-11 12:00:00', '/previews/4.jpg')
+
+    first = fetcher.fetch_previews([camera])
+    second = fetcher.fetch_previews([camera])
+
+    assert first == second
+    assert open(first[4], 'rb').read() == b'image'
+    assert len(requested) == 1
+
+
+def test_preview_without_timestamp_is_downloaded_again(files, tmp_path):
+    setup, served, requested = files
+    url = f'https://{HOSTNAME}/previews/4.jpg'
+    fetcher = MediaFetcher(setup, str(tmp_path))
+    camera = Camera(4, None, '/previews/4.jpg')
+
+    served[url] = b'old'
+    fetcher.fetch_previews([camera])
+    served[url] = b'new'
+    paths = fetcher.fetch_previews([camera])
+
+    assert len(requested) == 2
+    assert open(paths[4], 'rb').read() == b'new'
+
+
+def test_tokens_are_only_sent_to_the_api_server(files, tmp_path):
+    setup, served, requested = files
+    served[f'https://{HOSTNAME}/previews/4.jpg'] = b'image'
+    served['https://cdn.example.net/videos/1.mp4?signature=abc'] = b'video'
+
+    setup.api.download('/previews/4.jpg', str(tmp_path / 'preview.jpg'))
+    setup.api.download('https://cdn.example.net/videos/1.mp4?signature=abc', str(tmp_path / 'video.mp4'))
+
+    api_headers, cdn_headers = requested[0][1], requested[1][1]
+    assert api_headers['Session-Token'] == 'session-token'
+    assert 'Session-Token' not in cdn_headers and 'User-Token' not in cdn_headers
+    assert 'Host' not in api_headers and 'Host' not in cdn_headers
+
+
+@pytest.mark.parametrize('content, error', [
+    (None, NotFoundError),
+    (440, SessionTokenError),
+    (requests.exceptions.ConnectTimeout('connect timeout'), ConnectionTimeoutError),
+    (requests.exceptions.ReadTimeout('read timeout'), ConnectionTimeoutError),
+])
+def test_download_errors_are_mapped(files, tmp_path, content, error):
+    setup, served, requested = files
+    served[f'https://{HOSTNAME}/previews/4.jpg'] = content
+    path = tmp_path / 'preview.jpg'
+
+    with pytest.raises(error):
+        setup.api.download('/previews/4.jpg', str(path))
+    assert not os.path.exists(str(path) + '.part')
+    assert not path.exists()
@@ -0,0 +1,73 @@
+import json
+
+from conftest import FakeSession, make_response, process_statuses
+from visonic.exceptions import NotFoundError
+from visonic.processes import ProcessTracker, submit_concurrently
+
+
+def test_bypasses_zones_with_one_status_request(make_setup):
+    setup, session = make_setup()
+    results = setup.set_bypass_zones({zone: zone % 2 == 0 for zone in range(1, 6)})
+
+    assert sorted(results) == [1, 2, 3, 4, 5]
+    assert all(result.succeeded for result in results.values())
+    assert len({result.token for result in results.values()}) == 5
+    assert session.count('set_bypass_zone') == 5
+    assert session.count('process_status') == 1
+
+    sent = {json.loads(data)['zone']: json.loads(data)['set']
+            for url, headers, data in session.calls if url.endswith('/set_bypass_zone')}
+    assert sent == {1: False, 2: True, 3: False, 4: True, 5: False}
+
+
+def test_failed_submission_is_reported_per_zone(make_setup):
+    def bypass(url, headers, data):
+        if json.loads(data)['zone'] == 3:
+            return make_response(url, 404, {'error': 404})
+        return {'process_token': 'token-' + str(json.loads(data)['zone'])}
+
+    setup, session = make_setup(FakeSession(routes={'set_bypass_zone': bypass}))
+    results = setup.set_bypass_zones({1: True, 2: True, 3: True})
+
+    assert results[1].succeeded and results[2].succeeded
+    assert not results[3].succeeded and results[3].token is None
+    assert isinstance(results[3].error, NotFoundError)
+    assert 'token-3' not in session.calls[-1][0]
+
+
+def test_poll_is_batched(make_setup):
+    setup, session = make_setup()
+    processes = ProcessTracker(setup, batch_size=2).poll(['a', 'b', 'c', 'd', 'e'])
+    assert sorted(processes) == ['a', 'b', 'c', 'd', 'e']
+    assert session.count('process_status') == 3
+
+
+def test_wait_gives_up_after_the_timeout(make_setup):
+    setup, session = make_setup(FakeSession(routes={'process_status': process_statuses('handled')}))
+    tracker = ProcessTracker(setup, interval=0.01, timeout=0.1)
+    processes = tracker.wait(['a', 'b'])
+
+    assert [process.status for process in processes.values()] == ['handled', 'handled']
+    assert session.count('process_status') > 1
+
+    results = tracker.run(lambda zone: setup.set_bypass_zone(zone, True), [1])
+    assert not results[1].succeeded and results[1].error is None
+
+
+def test_no_wait_polls_once(make_setup):
+    setup, session = make_setup(FakeSession(routes={'process_status': process_statuses('handled')}))
+    results = setup.set_bypass_zones({1: True, 2: False}, wait=False)
+    assert session.count('process_status') == 1
+    assert [result.process.status for result in results.values()] == ['handled', 'handled']
+
+
+def test_submit_concurrently_collects_errors():
+    def submit(key):
+        if key == 'bad':
+            raise ValueError(key)
+        return key.upper()
+
+    results = submit_concurrently(submit, ['a', 'bad', 'c'], max_workers=2)
+    assert results['a'] == ('A', None) and results['c'] == ('C', None)
+    assert results['bad'][0] is None and isinstance(results['bad'][1], ValueError)
+    assert submit_concurrently(submit, []) == {}
@@ -0,0 +1,65 @@
+import threading
+
+from visonic.profiling import Profiler
+
+
+def test_records_the_phases_of_each_method(make_setup):
+    setup, session = make_setup(profile=True)
+    setup.get_events()
+    setup.get_events()
+    setup.get_devices()
+
+    stats = setup.profiler.as_dict()
+    assert set(stats['get_events']) == {'network', 'decode', 'parse', 'build', 'total'}
+    assert stats['get_events']['total']['calls'] == 2
+    assert stats['get_devices']['network']['calls'] == 1
+    for phase in stats['get_events'].values():
+        assert phase['wall'] >= 0 and phase['cpu'] >= 0
+    assert stats['get_events']['network']['wall'] <= stats['get_events']['total']['wall']
+
+
+def test_disabled_by_default(make_setup):
+    setup, session = make_setup()
+    assert setup.profiler is None
+    setup.get_status()
+
+
+def test_phases_outside_a_method_are_direct():
+    profiler = Profiler()
+    with profiler.phase('network'):
+        pass
+    with profiler.method('outer'):
+        with profiler.method('inner'):
+            with profiler.phase('build'):
+                pass
+        with profiler.phase('parse'):
+            pass
+
+    stats = profiler.as_dict()
+    assert stats['(direct)']['network']['calls'] == 1
+    assert set(stats['inner']) == {'build', 'total'}
+    assert set(stats['outer']) == {'parse', 'total'}
+
+    profiler.reset()
+    assert profiler.as_dict() == {}
+
+
+def test_methods_are_attributed_per_thread():
+    profiler = Profiler()
+    barrier = threading.Barrier(4)
+
+    def run(name):
+        with profiler.method(name):
+            barrier.wait()
+            with profiler.phase('work'):
+                pass
+
+    threads = [threading.Thread(target=run, args=(f'method-{n}',)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = profiler.as_dict()
+    assert sorted(stats) == [f'method-{n}' for n in range(4)]
+    assert all(phases['work']['calls'] == 1 for phases in stats.values())
@@ -0,0 +1,60 @@
+import copy
+import json
+
+import pytest
+
+from conftest import STATUS
+from visonic.alarm import UNCHANGED
+
+
+def test_unchanged_response_is_not_decoded_again(make_setup):
+    setup, session = make_setup(reuse_unchanged=True)
+
+    first = setup.get_status()
+    assert setup.get_status(if_changed=True) is UNCHANGED
+    assert setup.get_status() is first
+    assert setup.api.get_status() is setup.api.get_status()
+
+
+def test_changed_response_is_decoded(make_setup):
+    setup, session = make_setup(reuse_unchanged=True)
+    first = setup.get_status()
+
+    session.routes['status'] = dict(STATUS, connected=False)
+    second = setup.get_status(if_changed=True)
+    assert second is not UNCHANGED
+    assert first.connected and not second.connected
+
+
+def test_responses_are_not_shared_between_sessions(make_setup):
+    setup, session = make_setup(reuse_unchanged=True)
+    first = setup.api.get_status()
+
+    setup.api.set_tokens('user-token', 'other-session-token')
+    assert setup.api.get_status() is not first
+    assert setup.get_status(if_changed=True) is not UNCHANGED
+
+
+def test_reused_responses_are_read_only(make_setup):
+    setup, session = make_setup(reuse_unchanged=True)
+    status = setup.api.get_status()
+
+    with pytest.raises(TypeError):
+        status['connected'] = False
+    with pytest.raises(TypeError):
+        status['partitions'].append({})
+    with pytest.raises(TypeError):
+        status['rssi'].update(level='poor')
+    assert setup.api.get_status() == STATUS
+
+    modifiable = copy.deepcopy(status)
+    modifiable['partitions'].append({})
+    assert type(modifiable) is dict and type(modifiable['partitions']) is list
+    assert json.loads(json.dumps(status)) == STATUS
+
+
+def test_responses_are_modifiable_without_reuse(make_setup):
+    setup, session = make_setup()
+    status = setup.api.get_status()
+    status['partitions'].append({})
+    assert setup.api.get_status() is not status
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from conftest import FakeSession, STATUS
+from visonic.scheduler import ALARMS, CONTROL, INVENTORY, STATUS as STATUS_CLASS, RequestScheduler
+
+
+def waiter(scheduler, priority, order):
+    """ Start a thread taking a slot, recording it and giving it back. """
+    def run():
+        with scheduler.slot(priority):
+            order.append(priority)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_needs_a_non_control_slot():
+    with pytest.raises(ValueError):
+        RequestScheduler(max_concurrent=2, reserved=2)
+
+
+def test_priorities():
+    scheduler = RequestScheduler()
+    assert scheduler.priority('set_state') == CONTROL
+    assert scheduler.priority('alarms') == ALARMS
+    assert scheduler.priority('status') == STATUS_CLASS
+    assert scheduler.priority('events') == INVENTORY
+    assert RequestScheduler(priorities={'events': ALARMS}).priority('events') == ALARMS
+
+
+def test_reserved_slot_is_kept_for_control():
+    scheduler = RequestScheduler(max_concurrent=2, reserved=1)
+    order = []
+    scheduler.acquire(INVENTORY)
+
+    waiting = waiter(scheduler, STATUS_CLASS, order)
+    control = waiter(scheduler, CONTROL, order)
+    control.join(5)
+    assert order == [CONTROL]
+
+    scheduler.release()
+    waiting.join(5)
+    assert order == [CONTROL, STATUS_CLASS]
+    assert scheduler.active == 0
+
+
+def test_free_slot_goes_to_the_most_urgent_waiter():
+    scheduler = RequestScheduler(max_concurrent=2, reserved=1)
+    order = []
+    scheduler.acquire(INVENTORY)
+
+    threads = []
+    for priority in (INVENTORY, STATUS_CLASS, ALARMS):
+        threads.append(waiter(scheduler, priority, order))
+        time.sleep(0.02)
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == [ALARMS, STATUS_CLASS, INVENTORY]
+
+
+def test_limits_the_concurrent_requests(make_setup):
+    active = [0, 0]
+    lock = threading.Lock()
+
+    def status(url, headers, data):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return STATUS
+
+    setup, session = make_setup(FakeSession(routes={'status': status}))
+    setup.api.set_scheduler(RequestScheduler(max_concurrent=3, reserved=1))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: setup.get_status(), range(16)))
+    assert active[1] == 2
+    wait_for(lambda: setup.api.scheduler.active == 0)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+import requests
+
+from conftest import APP_ID, HOSTNAME, FakeSession
+from visonic.exceptions import SessionTokenError, UserAuthRequiredError
+from visonic.session import MultiPanelSession
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    users = iter(range(1, 100))
+    session = FakeSession(routes={
+        'auth': lambda url, headers, data: {'user_token': f'user-{next(users)}'},
+        'panel/login': lambda url, headers, data: {'session_token': 'session-' + json.loads(data)['panel_serial']},
+    })
+    monkeypatch.setattr(requests, 'session', lambda: session)
+    monkeypatch.setattr(requests, 'Session', lambda: session)
+    return session
+
+
+def tokens(session, endpoint):
+    return [(headers.get('User-Token'), headers.get('Session-Token'))
+            for url, headers, data in session.calls if url.endswith('/' + endpoint)]
+
+
+def test_authenticates_once_for_all_panels(fake):
+    multi = MultiPanelSession(HOSTNAME, APP_ID)
+    multi.authenticate('user@example.com', 'password')
+    home = multi.panel_login('A1', '1234')
+    cabin = multi.panel_login('B2', '1234')
+
+    assert fake.count('auth') == 1
+    assert fake.count('panel/login') == 2
+    assert tokens(fake, 'panel/login') == [('user-1', None), ('user-1', None)]
+    assert multi.panels == {'A1': home, 'B2': cabin}
+    assert multi['A1'] is home and home.panel_serial == 'A1'
+
+    home.get_status()
+    cabin.get_status()
+    assert tokens(fake, 'status') == [('user-1', 'session-A1'), ('user-1', 'session-B2')]
+
+
+def test_new_user_token_is_shared_with_the_panels(fake):
+    multi = MultiPanelSession(HOSTNAME, APP_ID)
+    multi.authenticate('user@example.com', 'password')
+    home = multi.panel_login('A1', '1234')
+
+    multi.authenticate('user@example.com', 'password')
+    home.get_status()
+    assert tokens(fake, 'status') == [('user-2', 'session-A1')]
+
+    # Logging in again reuses the Setup of the panel
+    assert multi.panel_login('A1', '1234') is home
+
+
+def test_panel_login_needs_authentication(fake):
+    multi = MultiPanelSession(HOSTNAME, APP_ID)
+    with pytest.raises(UserAuthRequiredError):
+        multi.panel_login('A1', '1234')
+    with pytest.raises(SessionTokenError):
+        multi.panel('A1')
+
+
+def test_options_are_passed_to_the_panels(fake):
+    multi = MultiPanelSession(HOSTNAME, APP_ID, profile=True)
+    multi.authenticate('user@example.com', 'password')
+    home = multi.panel_login('A1', '1234')
+    assert home.profiler is not None
+    assert multi.account.profiler is None
+    assert home.api.rest_version == multi.account.api.rest_version
+    assert fake.count('version') == 1
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+import pytest
+import requests
+
+from conftest import APP_ID, HOSTNAME, FakeSession
+from visonic.sharding import HashRing, ShardedPanel, ShardedPoller, _poll_shard
+
+
+def test_hash_ring_spreads_keys_and_moves_few_of_them():
+    keys = [f'panel-{number}' for number in range(1000)]
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+
+    counts = [0] * 4
+    for key in keys:
+        counts[before.node(key)] += 1
+    assert min(counts) > 150
+
+    moved = [key for key in keys if before.node(key) != after.node(key)]
+    assert all(after.node(key) == 4 for key in moved)
+    assert len(moved) < 350
+
+
+def test_hash_ring_needs_nodes():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+@pytest.fixture
+def fake_requests(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(requests, 'session', lambda: session)
+    monkeypatch.setattr(requests, 'Session', lambda: session)
+    return session
+
+
+def run_shard(panels, resources=('status',), seconds=0.3):
+    """ Run the worker loop in a thread for a while and return its messages. """
+    deltas = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        try:
+            _poll_shard(0, panels, HOSTNAME, APP_ID, resources, 0.1, 4, {}, deltas, stop)
+        except requests.exceptions.ConnectionError:
+            pass
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join(5)
+    messages = []
+    while not deltas.empty():
+        messages.append(deltas.get())
+    return messages
+
+
+def test_worker_authenticates_each_account_once(fake_requests):
+    panels = [ShardedPanel(serial, '1234', 'one@example.com', 'secret') for serial in ('A', 'B', 'C')]
+    panels.append(ShardedPanel('D', '1234', 'two@example.com', 'secret'))
+
+    messages = run_shard(panels)
+
+    assert fake_requests.count('auth') == 2
+    assert fake_requests.count('panel/login') == 4
+    first = messages[0][1]
+    assert sorted(delta.panel_serial for delta in first) == ['A', 'B', 'C', 'D']
+    assert all(delta.status.connected for delta in first)
+    assert messages[-1] == (0, None)
+
+
+def test_worker_reports_stop_when_startup_fails(fake_requests):
+    def refuse(url, headers, data):
+        raise requests.exceptions.ConnectionError('refused')
+
+    fake_requests.routes['version'] = refuse
+
+    messages = run_shard([ShardedPanel('A', '1234', 'one@example.com', 'secret')], seconds=0)
+
+    assert messages == [(0, None)]
+
+
+def test_deltas_end_when_a_worker_is_killed(fake_requests):
+    context = multiprocessing.get_context('fork')
+    panels = [ShardedPanel('A', '1234', 'one@example.com', 'secret')]
+    poller = ShardedPoller(HOSTNAME, APP_ID, panels, workers=1, interval=0.1, resources=('status',),
+                           context=context)
+    poller.start()
+    try:
+        assert poller.get(timeout=10)
+        for child in multiprocessing.active_children():
+            os.kill(child.pid, signal.SIGKILL)
+
+        start = time.monotonic()
+        list(poller.deltas())
+        assert time.monotonic() - start < 5
+    finally:
+        poller.stop(timeout=1)
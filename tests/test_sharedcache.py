@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from conftest import FakeSession
+from visonic.exceptions import SessionTokenError
+from visonic.sharedcache import SharedPanel, SharedStateCache
+
+
+@pytest.fixture
+def caches(tmp_path):
+    """ Return a factory of caches on one database, like several processes. """
+    path = str(tmp_path / 'state.db')
+    opened = []
+
+    def factory(**kwargs):
+        cache = SharedStateCache(path, **kwargs)
+        opened.append(cache)
+        return cache
+
+    yield factory
+    for cache in opened:
+        cache.close()
+
+
+def test_state_and_tokens_are_shared(caches, make_setup):
+    setup, session = make_setup()
+    first, second = caches(), caches()
+    first.put('A1', 'devices', setup.get_devices())
+    first.put_tokens('A1', 'user-token', 'session-token')
+
+    devices, updated = second.get('A1', 'devices')
+    assert [device.name for device in devices] == ['Door 1', 'Door 2', 'Door 3']
+    assert time.time() - updated < 5
+    assert second.get_tokens('A1') == ('user-token', 'session-token')
+    assert second.get('A1', 'status') is None and second.get_tokens('B2') is None
+
+
+def test_one_lease_holder_per_panel(caches):
+    first, second = caches(lease_time=0.2), caches(lease_time=0.2)
+    assert first.owner != second.owner
+
+    assert first.acquire_lease('A1')
+    assert first.acquire_lease('A1')
+    assert not second.acquire_lease('A1')
+    assert second.acquire_lease('B2')
+
+    # The lease is handed over when released or expired
+    first.release_lease('A1')
+    assert second.acquire_lease('A1')
+    assert not first.acquire_lease('A1')
+    time.sleep(0.25)
+    assert first.acquire_lease('A1')
+
+
+def test_only_the_lease_holder_requests_the_api(caches, make_setup):
+    leader, leader_session = make_setup()
+    follower, follower_session = make_setup(login=False)
+    panels = [SharedPanel(leader, caches(), 'A1', max_age=30), SharedPanel(follower, caches(), 'A1', max_age=30)]
+
+    assert panels[0].get_status().value.connected
+    for _ in range(3):
+        assert panels[1].get_status().value.connected
+        assert len(panels[1].get_devices().value) == 3
+    assert leader_session.count('status') == 1
+    assert follower_session.count('status') == 0
+
+
+def test_follower_takes_over_with_the_shared_tokens(caches, make_setup):
+    leader, leader_session = make_setup()
+    follower, follower_session = make_setup(login=False)
+    leader_cache = caches(lease_time=0.1)
+    SharedPanel(leader, leader_cache, 'A1', max_age=0.05).get_status()
+
+    # The leader stopped refreshing, its lease expired
+    time.sleep(0.15)
+    panel = SharedPanel(follower, caches(lease_time=0.1), 'A1', max_age=0.05)
+    status = panel.get_status()
+    assert not status.stale
+    assert follower_session.count('status') == 1
+    assert follower_session.count('auth') == 0
+
+    url, headers, data = follower_session.calls[-1]
+    assert headers['Session-Token'] == 'session-token'
+    assert not leader_cache.acquire_lease('A1')
+
+
+def test_logs_in_without_shared_tokens(caches, make_setup):
+    setup, session = make_setup(login=False)
+    cache = caches()
+    with pytest.raises(SessionTokenError):
+        SharedPanel(setup, cache, 'A1').get_status()
+
+    panel = SharedPanel(setup, cache, 'A1', email='user@example.com', password='password', user_code='1234')
+    assert panel.get_status().value.connected
+    assert session.count('auth') == 1
+    assert caches().get_tokens('A1') == ('user-token', 'session-token')
+
+
+def test_waits_for_the_lease_holder(caches, make_setup):
+    setup, session = make_setup()
+    holder = caches()
+    assert holder.acquire_lease('A1')
+
+    panel = SharedPanel(setup, caches(), 'A1', wait=0.2)
+    with pytest.raises(TimeoutError):
+        panel.get_status()
+    assert session.count('status') == 0
+    with pytest.raises(ValueError):
+        panel.get('events')
@@ -0,0 +1,61 @@
+import pytest
+
+from visonic.devices import ContactDevice, KeyFobDevice
+from visonic.snapshot import SnapshotFile, from_bytes, to_bytes
+
+
+def test_models_round_trip(make_setup):
+    setup, session = make_setup()
+    state = {'status': setup.get_status(), 'devices': setup.get_devices(), 'events': setup.get_events()}
+
+    restored = from_bytes(to_bytes(state))
+    assert str(restored['status']) == str(state['status'])
+    assert [type(d) for d in restored['devices']] == [type(d) for d in state['devices']]
+    assert [str(d) for d in restored['devices']] == [str(d) for d in state['devices']]
+    assert [e.as_dict() for e in restored['events']] == [e.as_dict() for e in state['events']]
+
+
+def test_subclass_fields_round_trip():
+    fob = KeyFobDevice(None, 1, 'CONTROL_PANEL', '300-0001', 7, 'Fob', [1], False, True, True,
+                       'KEYFOB', None, None, owner_id=3, owner_name='User 3')
+    assert str(from_bytes(to_bytes(fob))) == str(fob)
+
+
+def test_plain_values_round_trip():
+    value = {'none': None, 'flags': [True, False], 'small': -5, 'large': 2 ** 40, 'float': 0.25,
+             'text': 'å' * 300, 'nested': {'list': [1, 'two', [3]]}}
+    assert from_bytes(to_bytes(value)) == value
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        from_bytes(b'JSON{}')
+    with pytest.raises(TypeError):
+        to_bytes(object())
+
+
+def test_snapshot_file(make_setup, tmp_path):
+    setup, session = make_setup()
+    path = str(tmp_path / 'panels.snap')
+    SnapshotFile.write(path, {'A1': setup.snapshot(), 'B2': {'status': None}})
+
+    with SnapshotFile(path) as snapshots:
+        assert snapshots.keys() == ['A1', 'B2']
+        assert len(snapshots) == 2 and 'A1' in snapshots and 'C3' not in snapshots
+        assert snapshots['A1']['status'].connected
+        assert isinstance(snapshots['A1']['devices'][0], ContactDevice)
+        assert snapshots.get('C3', 'missing') == 'missing'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['panels.snap']
+
+
+def test_not_a_snapshot_file(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\x00' * 32)
+    with pytest.raises(ValueError):
+        SnapshotFile(str(path))
+
+
+def test_snapshot_skips_unsupported_resources(make_setup):
+    setup, session = make_setup()
+    state = setup.snapshot(resources=('status', 'panel_info', 'devices'))
+    assert sorted(state) == ['devices', 'status']
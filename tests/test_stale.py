@@ -0,0 +1,93 @@
+import time
+
+import pytest
+import requests
+
+from conftest import STATUS, FakeSession
+from visonic.stale import StaleWhileRevalidate
+
+
+class Flaky(object):
+    """ Status route that fails while down is set. """
+
+    def __init__(self):
+        self.down = False
+
+    def __call__(self, url, headers, data):
+        if self.down:
+            raise requests.exceptions.ConnectionError('down')
+        return STATUS
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_first_call_fetches_every_resource(make_setup):
+    setup, session = make_setup()
+    cache = StaleWhileRevalidate(setup, max_age=30)
+
+    status = cache.get_status()
+    assert status.value.connected and not status.stale and status.error is None
+    assert len(cache.get_devices().value) == 3
+    assert cache.get_troubles().value == []
+    assert [session.count(name) for name in ('status', 'devices', 'troubles')] == [1, 1, 1]
+
+
+def test_stale_value_is_returned_while_refreshing(make_setup):
+    setup, session = make_setup(FakeSession(delay=0.05))
+    cache = StaleWhileRevalidate(setup, max_age=0.4)
+    first = cache.get_status()
+
+    time.sleep(0.45)
+    start = time.monotonic()
+    stale = cache.get_status()
+    assert time.monotonic() - start < 0.1
+    assert stale.stale and stale.value is first.value
+    for _ in range(5):
+        cache.get_status()
+    assert cache.refreshing
+
+    wait_for(lambda: not cache.refreshing)
+    fresh = cache.get_status()
+    assert not fresh.stale and fresh.value is not first.value
+    assert session.count('status') == 2
+
+
+def test_failed_refresh_keeps_the_last_good_value(make_setup):
+    flaky = Flaky()
+    setup, session = make_setup(FakeSession(routes={'status': flaky}))
+    cache = StaleWhileRevalidate(setup, max_age=0.1, retry_after=0.3)
+    good = cache.get_status().value
+
+    flaky.down = True
+    cache.refresh(wait=True)
+    status = cache.get_status()
+    assert status.value is good
+    assert status.stale and isinstance(status.error, requests.exceptions.ConnectionError)
+
+    # No new refresh until retry_after has passed
+    time.sleep(0.15)
+    requests_sent = session.count('status')
+    cache.get_status()
+    assert not cache.refreshing and session.count('status') == requests_sent
+
+    flaky.down = False
+    time.sleep(0.2)
+    cache.get_status()
+    wait_for(lambda: not cache.refreshing)
+    assert cache.get_status().error is None
+
+
+def test_first_fetch_error_is_raised(make_setup):
+    flaky = Flaky()
+    flaky.down = True
+    setup, session = make_setup(FakeSession(routes={'status': flaky}))
+    cache = StaleWhileRevalidate(setup)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cache.get_status()
+    with pytest.raises(ValueError):
+        cache.get('events')
@@ -0,0 +1,43 @@
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from conftest import FakeSession
+
+
+def test_login_never_mixes_token_pairs(make_setup):
+    users = iter(range(1, 100000))
+    session = FakeSession(delay=0.001, routes={
+        'auth': lambda url, headers, data: {'user_token': f'user-{next(users)}'},
+        'panel/login': lambda url, headers, data: {'session_token': headers['User-Token'].replace('user-', 'session-')},
+    })
+    setup, session = make_setup(session)
+
+    stop = threading.Event()
+
+    def relogin():
+        while not stop.is_set():
+            setup.login('user@example.com', 'password', 'A1', '1234')
+
+    thread = threading.Thread(target=relogin)
+    thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: setup.get_status(), range(200)))
+    finally:
+        stop.set()
+        thread.join()
+
+    pairs = [(headers['User-Token'], headers['Session-Token'])
+             for url, headers, data in session.calls if url.endswith('/status')]
+    assert len(pairs) == 200
+    assert session.count('auth') >= 2
+    assert all(session_token == user_token.replace('user-', 'session-') for user_token, session_token in pairs)
+
+
+def test_set_tokens_replaces_both(make_setup):
+    setup, session = make_setup()
+    setup.api.set_tokens('user-2', 'session-2')
+    assert (setup.api.user_token, setup.api.session_token) == ('user-2', 'session-2')
+    setup.get_status()
+    url, headers, data = session.calls[-1]
+    assert (headers['User-Token'], headers['Session-Token']) == ('user-2', 'session-2')
@@ -1,6 +1,8 @@
 import json
 import requests
 
+from datetime import timezone
+
 from dateutil import parser
 from dateutil.relativedelta import *
 
@@ -8,6 +10,22 @@ from visonic.devices import *
 from visonic.core import API
 from visonic.exceptions import *
 from visonic.classes import *
+from visonic.hosts import HostPool
+from visonic import lazy as lazy_views
+from visonic.processes import ProcessTracker
+from visonic.profiling import NULL_PHASE, Profiler, profiled
+
+
+class _Unchanged(object):
+    """ Type of the UNCHANGED marker. """
+
+    def __repr__(self):
+        return 'UNCHANGED'
+
+
+# Returned by get_* methods called with if_changed=True when the response
+# is the same as the previous one
+UNCHANGED = _Unchanged()
 
 
 class Setup(object):
@@ -16,10 +34,100 @@ class Setup(object):
     # API Connection
     __api = None
 
-    def __init__(self, hostname, app_id, api_version='latest'):
-        """ Initiate the connection to the REST API. """
-        self.__api = API(hostname, app_id)
-        self.set_rest_version(api_version)
+    # Phase profiler, only set when profiling is enabled
+    __profiler = None
+
+    # Feature set flags that must be enabled for a method to be called
+    # when feature gating is enabled
+    __required_features = {
+        'activate_siren': ('sirens_can_enable',),
+        'arm_away': ('state_enabled', 'state_can_set'),
+        'arm_home': ('state_enabled', 'state_can_set'),
+        'disable_siren': ('sirens_can_disable',),
+        'disarm': ('state_enabled', 'state_can_set'),
+        'get_devices': ('devices_enabled',),
+        'get_events': ('events_enabled',),
+        'get_status': ('state_enabled', 'state_can_get'),
+        'get_troubles': ('faults_enabled',),
+    }
+
+    def __init__(self, hostname, app_id, api_version='latest', profile=False, feature_gating=False,
+                 capabilities=None, keep_warm=None, dedup_window=0, api=None, pool_size=10,
+                 event_store=None, lazy=False, reuse_unchanged=False):
+        """ Initiate the connection to the REST API. Set profile to True to
+        record wall and CPU time per phase for each method (see profiler).
+        Set feature_gating to True to raise NotSupportedError locally for
+        features disabled in the panel feature set. Pass a CapabilityMap in
+        capabilities to share or persist the endpoints known per version.
+        Pass a list of hostnames to fail over between several API servers.
+        Set keep_warm to an interval in seconds to keep the connections to
+        the API server open between rare commands. Set dedup_window to a
+        number of seconds to deduplicate identical arm, disarm and bypass
+        commands (for example a double tap). Pass an existing API instance in
+        api to use it instead of creating a new one, and api_version=None to
+        keep its REST API version. Set pool_size to at least the number of
+        threads calling the Setup at the same time. Pass an EventStore in
+        event_store to keep every event returned by get_events(). Set lazy
+        to True to return views from get_devices(), get_events(), get_status()
+        and get_troubles() that only compute a property when it is read.
+        Set reuse_unchanged to True to skip decoding and building the
+        devices, events, status and troubles when the response is unchanged. """
+        # The API is closed by close() only when it was created here
+        self.__owns_api = api is None
+        if api is not None:
+            self.__api = api
+        elif isinstance(hostname, (list, tuple)):
+            pool = HostPool(hostname)
+            self.__api = API(hostname[0], app_id, capabilities, pool_size=pool_size)
+            self.__api.set_host_pool(pool)
+            pool.start()
+        else:
+            self.__api = API(hostname, app_id, capabilities, pool_size=pool_size)
+        self.__api.set_deduplication(dedup_window)
+        if api_version is not None:
+            self.set_rest_version(api_version)
+
+        # The version request above has already opened the first connection
+        self.__keep_warm = bool(keep_warm)
+        if keep_warm:
+            self.__api.start_keep_warm(keep_warm, preconnect=api_version is None)
+
+        # Feature sets cached per panel serial
+        self.__feature_gating = feature_gating
+        self.__feature_sets = {}
+        self.__panel_serial = None
+
+        # Optional persistent event history (see visonic.eventstore)
+        self.__event_store = event_store
+
+        # Return lazy views instead of models (see visonic.lazy)
+        self.__lazy = lazy
+
+        # Models built from the last response of each method, by method
+        self.__models = {}
+        self.__reuse_unchanged = reuse_unchanged
+        if reuse_unchanged:
+            self.__api.set_response_reuse(True)
+
+        if profile:
+            self.__profiler = Profiler()
+            self.__api.set_profiler(self.__profiler)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """ Stop the background threads started for this Setup (keep-warm
+        and host pool probing) and close the API it created. A shared API
+        passed in is left open. """
+        if self.__owns_api:
+            self.__api.close()
+        elif self.__keep_warm:
+            self.__api.stop_keep_warm()
 
     # System properties
     @property
@@ -27,6 +135,57 @@ class Setup(object):
         """ Return the API for direct access. """
         return self.__api
 
+    @property
+    def panel_serial(self):
+        """ Return the serial of the panel logged in to, None before panel_login(). """
+        return self.__panel_serial
+
+    @property
+    def event_store(self):
+        """ Return the EventStore fed by get_events(), or None. """
+        return self.__event_store
+
+    @property
+    def profiler(self):
+        """ Return the phase profiler, or None when profiling is disabled. """
+        return self.__profiler
+
+    def __phase(self, name):
+        """ Return a context manager timing a phase of the current method. """
+        return self.__profiler.phase(name) if self.__profiler else NULL_PHASE
+
+    def __unchanged(self, key, response, if_changed):
+        """ Return the models built from the same (unchanged) response
+        object, or UNCHANGED when if_changed is set. None if it changed. """
+        cached = self.__models.get(key) if key is not None else None
+        if cached is None or cached[0] is not response:
+            return None
+        if if_changed:
+            return UNCHANGED
+        return list(cached[1]) if isinstance(cached[1], list) else cached[1]
+
+    def __remember(self, key, response, models):
+        """ Keep the models built from a response for __unchanged(). """
+        if self.__reuse_unchanged and key is not None:
+            self.__models[key] = (response, list(models) if isinstance(models, list) else models)
+        return models
+
+    def __check_features(self, method):
+        """ Raise NotSupportedError if the method needs a feature that is
+        disabled on the panel. The feature set is fetched once per panel. """
+        if not self.__feature_gating:
+            return
+        features = self.__feature_sets.get(self.__panel_serial)
+        if features is None:
+            features = self.get_feature_set()
+        for flag in self.__required_features[method]:
+            if not getattr(features, flag):
+                raise NotSupportedError(f'{method}() is not supported by the alarm panel ({flag} is disabled).')
+
+    def clear_feature_set_cache(self):
+        """ Forget the cached feature sets so they are fetched again. """
+        self.__feature_sets = {}
+
     def access_grant(self, user_id, email):
         """ Grant a user access to the alarm panel via the API. """
         return self.__api.access_grant(user_id, email)
@@ -37,14 +196,17 @@ class Setup(object):
 
     def activate_siren(self):
         """ Activate the siren (sound the alarm). """
+        self.__check_features('activate_siren')
         return self.__api.activate_siren()['process_token']
 
     def arm_home(self, partition=-1):
         """ Send Arm Home command to the alarm system. """
+        self.__check_features('arm_home')
         return self.__api.arm_home(partition)['process_token']
 
     def arm_away(self, partition=-1):
         """ Send Arm Away command to the alarm system. """
+        self.__check_features('arm_away')
         return self.__api.arm_away(partition)['process_token']
 
     def authenticate(self, email, password):
@@ -57,204 +219,300 @@ class Setup(object):
 
     def disable_siren(self, mode='all'):
         """ Disable the siren (mute the alarm). """
+        self.__check_features('disable_siren')
         return self.__api.disable_siren(mode=mode)['process_token']
 
     def disarm(self, partition=-1):
         """ Send Disarm command to the alarm system. """
+        self.__check_features('disarm')
         return self.__api.disarm(partition)['process_token']
 
+    @profiled
     def get_cameras(self):
         """ Fetch all the devices that are available. """
         camera_list = []
 
         cameras = self.__api.get_cameras()
 
-        for camera in cameras:
-            new_camera = Camera(
-                location=camera['location'].capitalize(),
-                partitions=camera['partitions'],
-                preenroll=camera['preenroll'],
-                preview_path=camera['preview_path'],
-                status=camera['status'],
-                timestamp=camera['timestamp'],
-                zone=camera['zone'],
-                zone_name=camera['zone_name'].capitalize(),
-            )
-            camera_list.append(new_camera)
+        with self.__phase('build'):
+            for camera in cameras:
+                new_camera = Camera(
+                    location=camera['location'].capitalize(),
+                    partitions=camera['partitions'],
+                    preenroll=camera['preenroll'],
+                    preview_path=camera['preview_path'],
+                    status=camera['status'],
+                    timestamp=camera['timestamp'],
+                    zone=camera['zone'],
+                    zone_name=camera['zone_name'].capitalize(),
+                )
+                camera_list.append(new_camera)
 
         return camera_list
 
-    def get_devices(self):
-        """ Fetch all the devices that are available. """
+    @profiled
+    def get_devices(self, if_changed=False):
+        """ Fetch all the devices that are available. With if_changed set,
+        UNCHANGED is returned when the devices are the same as last time
+        (requires reuse_unchanged). """
+        self.__check_features('get_devices')
         device_list = []
 
         devices = self.__api.get_devices()
-
-        for device in devices:
-            if device['subtype'] == 'CONTACT':
-                contact_device = ContactDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                    location=device['traits']['location']['name'].capitalize() if 'location' in device['traits'] else None,
-                    soak=device['traits']['soak']['enabled'] if 'soak' in device['traits'] else False,
-                )
-                device_list.append(contact_device)
-            elif device['subtype'] == 'MOTION_CAMERA':
-                contact_device = CameraDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                    location=device['traits']['location']['name'].capitalize() if 'location' in device['traits'] else None,
-                    soak=device['traits']['soak']['enabled'] if 'soak' in device['traits'] else False,
-                    vod=device['traits']['vod'] if 'vod' in device['traits'] else None,
-                )
-                device_list.append(contact_device)
-            elif device['subtype'] == 'SMOKE':
-                contact_device = SmokeDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                    location=device['traits']['location']['name'].capitalize() if 'location' in device['traits'] else None,
-                    soak=device['traits']['soak']['enabled'] if 'soak' in device['traits'] else False,
-                )
-                device_list.append(contact_device)
-            elif device['subtype'] == 'BASIC_KEYFOB':
-                contact_device = KeyFobDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                    owner_id=device['traits']['owner']['id'] if 'owner' in device['traits'] else None,
-                    owner_name=device['traits']['owner']['name'] if 'owner' in device['traits'] else None,
-                )
-                device_list.append(contact_device)
-            elif device['device_type'] == 'GSM':
-                contact_device = GSMDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                    signal_level=device['traits']['signal_level']['level'] if 'signal_level' in device['traits'] else None,
-                )
-                device_list.append(contact_device)
-            elif device['device_type'] == 'PGM':
-                contact_device = PGMDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                    parent_id=device['traits']['parent']['id'] if 'parent' in device['traits'] else None,
-                    parent_port=device['traits']['parent']['port'] if 'parent' in device['traits'] else None,
-                )
-                device_list.append(contact_device)
+        unchanged = self.__unchanged('devices', devices, if_changed)
+        if unchanged is not None:
+            return unchanged
+
+        if self.__lazy:
+            with self.__phase('build'):
+                return self.__remember('devices', devices, [lazy_views.device(device) for device in devices])
+
+        with self.__phase('build'):
+            for device in devices:
+                if device['subtype'] == 'CONTACT':
+                    contact_device = ContactDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                        location=device['traits']['location']['name'].capitalize() if 'location' in device['traits'] else None,
+                        soak=device['traits']['soak']['enabled'] if 'soak' in device['traits'] else False,
+                    )
+                    device_list.append(contact_device)
+                elif device['subtype'] == 'MOTION_CAMERA':
+                    contact_device = CameraDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                        location=device['traits']['location']['name'].capitalize() if 'location' in device['traits'] else None,
+                        soak=device['traits']['soak']['enabled'] if 'soak' in device['traits'] else False,
+                        vod=device['traits']['vod'] if 'vod' in device['traits'] else None,
+                    )
+                    device_list.append(contact_device)
+                elif device['subtype'] == 'SMOKE':
+                    contact_device = SmokeDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                        location=device['traits']['location']['name'].capitalize() if 'location' in device['traits'] else None,
+                        soak=device['traits']['soak']['enabled'] if 'soak' in device['traits'] else False,
+                    )
+                    device_list.append(contact_device)
+                elif device['subtype'] == 'BASIC_KEYFOB':
+                    contact_device = KeyFobDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                        owner_id=device['traits']['owner']['id'] if 'owner' in device['traits'] else None,
+                        owner_name=device['traits']['owner']['name'] if 'owner' in device['traits'] else None,
+                    )
+                    device_list.append(contact_device)
+                elif device['device_type'] == 'GSM':
+                    contact_device = GSMDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                        signal_level=device['traits']['signal_level']['level'] if 'signal_level' in device['traits'] else None,
+                    )
+                    device_list.append(contact_device)
+                elif device['device_type'] == 'PGM':
+                    contact_device = PGMDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                        parent_id=device['traits']['parent']['id'] if 'parent' in device['traits'] else None,
+                        parent_port=device['traits']['parent']['port'] if 'parent' in device['traits'] else None,
+                    )
+                    device_list.append(contact_device)
+                else:
+                    generic_device = GenericDevice(
+                        bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
+                        device_number=device['device_number'],
+                        device_type=device['device_type'],
+                        enrollment_id=device['enrollment_id'],
+                        id=device['id'],
+                        name=device['name'],
+                        partitions=device['partitions'],
+                        preenroll=device['preenroll'],
+                        removable=device['removable'],
+                        renamable=device['renamable'],
+                        subtype=device['subtype'],
+                        warnings=device['warnings'],
+                        zone_type=device['zone_type'],
+                    )
+                    device_list.append(generic_device)
+        return self.__remember('devices', devices, device_list)
+
+    @staticmethod
+    def __filter_events(events, timestamp_hour_offset, since, types, zones, partitions, labels):
+        """ Return the raw events matching the filters, oldest first. The
+        events are scanned from the newest and the scan stops at the first
+        event older than since, so older timestamps are never parsed. """
+        if since is not None and not isinstance(since, int):
+            if isinstance(since, str):
+                since = parser.parse(since)
+            # Compare with the server time (UTC) of the events. A naive
+            # datetime is in the time of the returned events.
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
             else:
-                generic_device = GenericDevice(
-                    bypass=device['traits']['bypass']['enabled'] if 'bypass' in device['traits'] else False,
-                    device_number=device['device_number'],
-                    device_type=device['device_type'],
-                    enrollment_id=device['enrollment_id'],
-                    id=device['id'],
-                    name=device['name'],
-                    partitions=device['partitions'],
-                    preenroll=device['preenroll'],
-                    removable=device['removable'],
-                    renamable=device['renamable'],
-                    subtype=device['subtype'],
-                    warnings=device['warnings'],
-                    zone_type=device['zone_type'],
-                )
-                device_list.append(generic_device)
-        return device_list
-
-    def get_events(self, timestamp_hour_offset=2):
-        """ Get the last couple of events (60 events on my system). """
+                since = since - relativedelta(hours=timestamp_hour_offset)
+        types = set(types) if types is not None else None
+        zones = set(zones) if zones is not None else None
+        partitions = set(partitions) if partitions is not None else None
+        labels = set(labels) if labels is not None else None
+
+        matches = []
+        for event in reversed(events):
+            if since is not None:
+                if isinstance(since, int):
+                    if event['event'] <= since:
+                        break
+                elif parser.parse(event['datetime']).replace(tzinfo=None) < since:
+                    break
+            if types is not None and event['type_id'] not in types:
+                continue
+            if zones is not None and event['zone'] not in zones:
+                continue
+            if partitions is not None and partitions.isdisjoint(event['partitions'] or ()):
+                continue
+            if labels is not None and event['label'] not in labels:
+                continue
+            matches.append(event)
+        matches.reverse()
+        return matches
+
+    @profiled
+    def get_events(self, timestamp_hour_offset=2, since=None, types=None, zones=None, partitions=None, labels=None,
+                   if_changed=False):
+        """ Get the last couple of events (60 events on my system). The
+        events can be filtered by type id, zone, partition and label, and
+        limited to those newer than since (an event id, or a datetime to
+        get the events at or after it; a naive datetime is in the time of
+        the returned events, an aware one is converted). With if_changed set, UNCHANGED is
+        returned when the events are the same as last time (requires
+        reuse_unchanged, filtered calls are never UNCHANGED). """
+        self.__check_features('get_events')
         event_list = []
 
-        events = self.__api.get_events()
-
-        for event in events:
-            # Event timestamp
-            dt = parser.parse(event['datetime'])
-            dt = dt + relativedelta(hours=timestamp_hour_offset)
-            timestamp = dt.strftime('%Y-%m-%d %H:%M:%S')
-            event['datetime'] = timestamp
-
-            new_event = Event(
-                id=event['event'],
-                type_id=event['type_id'],
-                label=event['label'],
-                description=event['description'],
-                appointment=event['appointment'],
-                datetime=event['datetime'],
-                video=event['video'],
-                device_type=event['device_type'],
-                zone=event['zone'],
-                partitions=event['partitions'],
-                name=event['name'],
-            )
+        # The stored events belong to the panel logged in to
+        if self.__event_store is not None and self.__panel_serial is None:
+            raise ValueError('Log in to a panel with panel_login() or login() before storing its events.')
+
+        response = events = self.__api.get_events()
+
+        # Only unfiltered events are reused
+        key = None
+        if any(value is not None for value in (since, types, zones, partitions, labels)):
+            with self.__phase('filter'):
+                events = self.__filter_events(events, timestamp_hour_offset, since, types, zones, partitions, labels)
+        else:
+            key = ('events', timestamp_hour_offset)
+            unchanged = self.__unchanged(key, response, if_changed)
+            if unchanged is not None:
+                return unchanged
+
+        if self.__lazy:
+            with self.__phase('build'):
+                event_list = [lazy_views.LazyEvent(event, timestamp_hour_offset) for event in events]
+            if self.__event_store is not None:
+                with self.__phase('store'):
+                    self.__event_store.add(self.__panel_serial, event_list)
+            return self.__remember(key, response, event_list)
+
+        # The response is not modified, it may be reused by the API
+        timestamps = []
+        with self.__phase('parse'):
+            for event in events:
+                # Event timestamp
+                dt = parser.parse(event['datetime'])
+                dt = dt + relativedelta(hours=timestamp_hour_offset)
+                timestamps.append(dt.strftime('%Y-%m-%d %H:%M:%S'))
+
+        with self.__phase('build'):
+            for event, timestamp in zip(events, timestamps):
+                new_event = Event(
+                    id=event['event'],
+                    type_id=event['type_id'],
+                    label=event['label'],
+                    description=event['description'],
+                    appointment=event['appointment'],
+                    datetime=timestamp,
+                    video=event['video'],
+                    device_type=event['device_type'],
+                    zone=event['zone'],
+                    partitions=event['partitions'],
+                    name=event['name'],
+                )
 
-            event_list.append(new_event)
+                event_list.append(new_event)
 
-        return event_list
+        if self.__event_store is not None:
+            with self.__phase('store'):
+                self.__event_store.add(self.__panel_serial, event_list)
 
+        return self.__remember(key, response, event_list)
+
+    @profiled
     def get_feature_set(self):
         """ Fetch the locations associated with the alarm system. """
         feature_set = self.__api.get_feature_set()
@@ -275,8 +533,10 @@ class Setup(object):
             diagnostic_enabled=feature_set['diagnostic']['is_enabled'],
             wifi_enabled=feature_set['wifi']['is_enabled'],
         )
+        self.__feature_sets[self.__panel_serial] = features
         return features
 
+    @profiled
     def get_locations(self):
         """ Fetch the locations associated with the alarm system. """
         location_list = []
@@ -284,12 +544,14 @@ class Setup(object):
             location_list.append(Location(location['hel_id'], location['name'].capitalize(), location['is_editable']))
         return location_list
 
+    @profiled
     def get_panel_info(self):
         """ Fetch basic information about the alarm system. """
         gpi = self.__api.get_panel_info()
 
         return PanelInfo(gpi['current_user'], gpi['manufacturer'], gpi['model'], gpi['serial'])
 
+    @profiled
     def get_panels(self):
         """ Fetch a list of panels associated with the user. """
         panel_list = []
@@ -303,6 +565,7 @@ class Setup(object):
 
         return panel_list
 
+    @profiled
     def get_process_status(self, process_token):
         """ Fetch the status information associated with a process token. """
         process_list = []
@@ -320,59 +583,86 @@ class Setup(object):
         """ Fetch the supported API versions. """
         return self.api.get_version_info()['rest_versions']
 
-    def get_status(self):
-        """ Fetch the current state of the alarm system. """
+    @profiled
+    def get_status(self, if_changed=False):
+        """ Fetch the current state of the alarm system. With if_changed
+        set, UNCHANGED is returned when the status is the same as last time
+        (requires reuse_unchanged). """
+        self.__check_features('get_status')
 
         status = self.__api.get_status()
+        unchanged = self.__unchanged('status', status, if_changed)
+        if unchanged is not None:
+            return unchanged
+
+        if self.__lazy:
+            return self.__remember('status', status, lazy_views.LazyStatus(status))
 
         partition_list = []
 
-        # Create the partitions
-        for partition in status['partitions']:
-            new_part = Partition(
-                id=partition['id'], 
-                state=partition['state'], 
-                status=partition['status'], 
-                ready=partition['ready'], 
-                options=partition['options'],
+        with self.__phase('build'):
+            # Create the partitions
+            for partition in status['partitions']:
+                new_part = Partition(
+                    id=partition['id'], 
+                    state=partition['state'], 
+                    status=partition['status'], 
+                    ready=partition['ready'], 
+                    options=partition['options'],
+                )
+                partition_list.append(new_part)
+
+            # Create the status
+            new_status = Status(
+                connected=status['connected'],
+                bba_connected=status['connected_status']['bba']['is_connected'] if 'bba' in status['connected_status'] else False,
+                bba_state=status['connected_status']['bba']['state'] if 'bba' in status['connected_status'] else 'unknown',
+                gprs_connected=status['connected_status']['gprs']['is_connected'] if 'gprs' in status['connected_status'] else False,
+                gprs_state=status['connected_status']['gprs']['state'] if 'gprs' in status['connected_status'] else 'unknown',
+                discovery_completed=status['discovery']['completed'],
+                discovery_stages=status['discovery']['stages'],
+                discovery_in_queue=status['discovery']['in_queue'],
+                discovery_triggered=status['discovery']['triggered'],
+                partitions=partition_list,
+                rssi_level=status['rssi']['level'],
+                rssi_network=status['rssi']['network'],
             )
-            partition_list.append(new_part)
-
-        # Create the status
-        new_status = Status(
-            connected=status['connected'],
-            bba_connected=status['connected_status']['bba']['is_connected'] if 'bba' in status['connected_status'] else False,
-            bba_state=status['connected_status']['bba']['state'] if 'bba' in status['connected_status'] else 'unknown',
-            gprs_connected=status['connected_status']['gprs']['is_connected'] if 'gprs' in status['connected_status'] else False,
-            gprs_state=status['connected_status']['gprs']['state'] if 'gprs' in status['connected_status'] else 'unknown',
-            discovery_completed=status['discovery']['completed'],
-            discovery_stages=status['discovery']['stages'],
-            discovery_in_queue=status['discovery']['in_queue'],
-            discovery_triggered=status['discovery']['triggered'],
-            partitions=partition_list,
-            rssi_level=status['rssi']['level'],
-            rssi_network=status['rssi']['network'],
-        )
 
-        return new_status
+        return self.__remember('status', status, new_status)
 
-    def get_troubles(self):
-        """ Fetch all the troubles that are available. """
+    @profiled
+    def get_troubles(self, if_changed=False):
+        """ Fetch all the troubles that are available. With if_changed set,
+        UNCHANGED is returned when the troubles are the same as last time
+        (requires reuse_unchanged). """
+        self.__check_features('get_troubles')
         trouble_list = []
-        for trouble in self.__api.get_troubles():
-            new_trouble = Trouble(
-                device_type=trouble['device_type'],
-                location=trouble['location'],
-                partitions=trouble['partitions'],
-                trouble_type=trouble['trouble_type'],
-                zone=trouble['zone'],
-                zone_name=trouble['zone_name'],
-                zone_type=trouble['zone_type'],
-            )
 
-            trouble_list.append(new_trouble)
-        return trouble_list
+        troubles = self.__api.get_troubles()
+        unchanged = self.__unchanged('troubles', troubles, if_changed)
+        if unchanged is not None:
+            return unchanged
+
+        if self.__lazy:
+            with self.__phase('build'):
+                return self.__remember('troubles', troubles, [lazy_views.LazyTrouble(trouble) for trouble in troubles])
+
+        with self.__phase('build'):
+            for trouble in troubles:
+                new_trouble = Trouble(
+                    device_type=trouble['device_type'],
+                    location=trouble['location'],
+                    partitions=trouble['partitions'],
+                    trouble_type=trouble['trouble_type'],
+                    zone=trouble['zone'],
+                    zone_name=trouble['zone_name'],
+                    zone_type=trouble['zone_type'],
+                )
+
+                trouble_list.append(new_trouble)
+        return self.__remember('troubles', troubles, trouble_list)
 
+    @profiled
     def get_users(self):
         """ Fetch a list of users in the alarm system. """
         users_info = self.__api.get_users()
@@ -385,6 +675,7 @@ class Setup(object):
 
         return user_list
 
+    @profiled
     def get_wakeup_sms(self):
         """ Fetch a list of users in the alarm system. """
         wakeup_sms = self.__api.get_wakeup_sms()
@@ -394,13 +685,25 @@ class Setup(object):
         )
         return sms
 
+    def login(self, email, password, panel_serial, user_code, user_token=None):
+        """ Authenticate (unless a user token is given) and log in to the alarm
+        panel, replacing both tokens together. Safe to call while other
+        threads use the Setup, unlike authenticate() followed by panel_login(). """
+        result = self.__api.login(email, password, panel_serial, user_code, user_token)
+        if result:
+            self.__panel_serial = panel_serial
+        return result
+
     def panel_add(self, alias, panel_serial, master_user_code, access_proof=None):
         """ Add a new alarm panel to the user account. A master user code is required. """
         return self.__api.panel_add(alias, panel_serial, access_proof, master_user_code)
 
     def panel_login(self, panel_serial, user_code):
         """ Establish a connection between the alarm panel and the API server. """
-        return self.__api.panel_login(panel_serial, user_code)
+        result = self.__api.panel_login(panel_serial, user_code)
+        if result:
+            self.__panel_serial = panel_serial
+        return result
 
     def panel_rename(self, alias, panel_serial):
         """ Rename an alarm panel. """
@@ -422,6 +725,18 @@ class Setup(object):
         """ Enabled or disable zone bypassing (for example, bypass a sensor to disable it). """
         return self.__api.set_bypass_zone(zone, set_enabled)['process_token']
 
+    def set_bypass_zones(self, zones, max_workers=8, wait=True, timeout=30):
+        """ Enable or disable bypassing for many zones at once. The zones
+        argument maps zone numbers to True (bypass) or False. The requests are
+        sent concurrently (at most max_workers at a time) and all process
+        tokens are tracked together. Returns {zone: OperationResult}. """
+        tracker = ProcessTracker(self, timeout=timeout)
+        return tracker.run(lambda zone: self.set_bypass_zone(zone, zones[zone]), zones, max_workers, wait)
+
+    def set_name(self, object_class, id, name):
+        """ Set the name of any type of object (USER, DEVICE, PARTITION, ...) by ID. """
+        return self.__api.set_name(object_class, id, name)['process_token']
+
     def set_name_user(self, user_id, name):
         """ Set the name of a user by user ID. """
         return self.__api.set_name('USER', user_id, name)['process_token']
@@ -432,8 +747,7 @@ class Setup(object):
         configure the library to use the latest version supported by the server,
         unless overridden in the version parameter.
         """
-        rest_versions = self.api.get_version_info()['rest_versions']
-        rest_versions.sort(key=float)
+        rest_versions = sorted(self.api.get_version_info()['rest_versions'], key=float)
         if version == "latest":
             self.__api.set_rest_version(rest_versions[-1])
         elif version in rest_versions:
@@ -445,3 +759,14 @@ class Setup(object):
         """ Set the code of a user by user ID. """
         return self.__api.set_user_code(user_code, user_id)['process_token']
 
+    def snapshot(self, resources=('status', 'devices', 'troubles', 'locations')):
+        """ Fetch the current state of the panel as {resource: value}, ready
+        to be stored with visonic.snapshot (to_bytes() or SnapshotFile).
+        Resources that are not supported by the panel or API are left out. """
+        state = {}
+        for resource in resources:
+            try:
+                state[resource] = getattr(self, 'get_' + resource)()
+            except NotSupportedError:
+                pass
+        return state
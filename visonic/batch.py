@@ -0,0 +1,75 @@
+from visonic.processes import ProcessTracker
+
+
+class NameOperation(object):
+    """ Set the name of any type of object (USER, DEVICE, PARTITION, ...). """
+
+    def __init__(self, object_class, id, name):
+        """ Set the private variable values on instantiation. """
+        self.__object_class = object_class
+        self.__id = id
+        self.__name = name
+
+    def __repr__(self):
+        """ Define how the object is represented on output to console. """
+        return f"{type(self).__name__}(object_class = '{self.object_class}', id = {self.id}, name = '{self.name}')"
+
+    def submit(self, setup):
+        """ Send the request and return the process token. """
+        return setup.set_name(self.__object_class, self.__id, self.__name)
+
+    @property
+    def object_class(self):
+        return self.__object_class
+
+    @property
+    def id(self):
+        return self.__id
+
+    @property
+    def name(self):
+        return self.__name
+
+
+class UserCodeOperation(object):
+    """ Set the code of a user. """
+
+    def __init__(self, user_id, user_code):
+        """ Set the private variable values on instantiation. """
+        self.__user_id = user_id
+        self.__user_code = user_code
+
+    def __repr__(self):
+        """ Define how the object is represented on output to console (without the code). """
+        return f"{type(self).__name__}(user_id = {self.user_id})"
+
+    def submit(self, setup):
+        """ Send the request and return the process token. """
+        return setup.set_user_code(self.__user_id, self.__user_code)
+
+    @property
+    def user_id(self):
+        return self.__user_id
+
+    @property
+    def user_code(self):
+        return self.__user_code
+
+
+class BatchExecutor(object):
+    """ Runs naming and user code operations with bounded concurrency and
+    tracks all of the process tokens together. """
+
+    def __init__(self, setup, max_workers=8, timeout=30):
+        """ Set the private variable values on instantiation. """
+        self.__setup = setup
+        self.__max_workers = max_workers
+        self.__tracker = ProcessTracker(setup, timeout=timeout)
+
+    def run(self, operations, wait=True):
+        """ Run the operations and return a list of OperationResult objects
+        in the same order. The key of each result is its operation. """
+        operations = list(operations)
+        results = self.__tracker.run(lambda operation: operation.submit(self.__setup),
+                                     operations, self.__max_workers, wait)
+        return [results[operation] for operation in operations]
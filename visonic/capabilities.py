@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Endpoints known to be unavailable in a REST API version. Versions not in
+# the table fall back to the '*' entry.
+KNOWN_UNSUPPORTED = {
+    '4.0': (),
+    '*': ('panel_info',),
+}
+
+# Endpoints that are never learned as unavailable, a 404 response from them
+# does not mean that the endpoint is missing
+NEVER_UNSUPPORTED = ('version', 'auth', 'panel/login')
+
+# Seconds until a learned endpoint is probed again
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class CapabilityMap(object):
+    """ Keeps track of which endpoints are available per (hostname, REST API
+    version). The map starts out from a shipped table and learns from 404
+    responses, so an unavailable endpoint only costs one round trip until
+    it is probed again after ttl seconds (None keeps it forever). Pass a
+    path to persist what has been learned between runs. """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        """ Set the private variable values on instantiation. """
+        self.__path = path
+        self.__ttl = ttl
+        self.__unsupported = {}
+        self.__lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def ttl(self):
+        return self.__ttl
+
+    def __expired(self, learned):
+        """ Check if an endpoint learned at the given time should be probed again. """
+        return self.__ttl is not None and time.time() - learned > self.__ttl
+
+    def is_supported(self, hostname, rest_version, endpoint):
+        """ Check if an endpoint is available on a server and version. """
+        known = KNOWN_UNSUPPORTED.get(rest_version, KNOWN_UNSUPPORTED['*'])
+        if endpoint in known:
+            return False
+
+        learned = self.__unsupported.get((hostname, rest_version), {}).get(endpoint)
+        if learned is None:
+            return True
+        if self.__expired(learned):
+            # Let the next request probe the endpoint again
+            with self.__lock:
+                self.__unsupported.get((hostname, rest_version), {}).pop(endpoint, None)
+            return True
+        return False
+
+    def mark_unsupported(self, hostname, rest_version, endpoint):
+        """ Remember that an endpoint is not available and persist the map. """
+        if endpoint in NEVER_UNSUPPORTED:
+            return
+        with self.__lock:
+            endpoints = self.__unsupported.setdefault((hostname, rest_version), {})
+            if endpoint in endpoints:
+                return
+            endpoints[endpoint] = time.time()
+        if self.__path is not None:
+            self.save()
+
+    def unsupported(self, hostname, rest_version):
+        """ Return the learned unavailable endpoints of a server and version. """
+        endpoints = self.__unsupported.get((hostname, rest_version), {})
+        return sorted(endpoint for endpoint, learned in list(endpoints.items()) if not self.__expired(learned))
+
+    def clear(self):
+        """ Forget everything that has been learned. """
+        with self.__lock:
+            self.__unsupported = {}
+        if self.__path is not None:
+            self.save()
+
+    def load(self):
+        """ Load the learned endpoints from the JSON file. """
+        with open(self.__path, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+        with self.__lock:
+            self.__unsupported = {
+                (entry['hostname'], entry['rest_version']): dict(entry['unsupported'])
+                for entry in data
+            }
+
+    def save(self):
+        """ Write the learned endpoints to the JSON file. """
+        # The map is written under the lock through a temporary file of its
+        # own, so concurrent writers never interleave or see a partial file
+        with self.__lock:
+            data = [
+                {'hostname': hostname, 'rest_version': rest_version, 'unsupported': dict(sorted(endpoints.items()))}
+                for (hostname, rest_version), endpoints in self.__unsupported.items()
+            ]
+            directory = os.path.dirname(os.path.abspath(self.__path))
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as fh:
+                try:
+                    json.dump(data, fh, indent=2)
+                except BaseException:
+                    fh.close()
+                    os.unlink(fh.name)
+                    raise
+            os.replace(fh.name, self.__path)
@@ -1,38 +1,158 @@
+import hashlib
 import json
+import os
+import threading
+import time
 import requests
 
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from datetime import datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError, ReadTimeoutError
 
+from visonic.capabilities import CapabilityMap
 from visonic.exceptions import *
+from visonic.latency import LatencyTracker
+from visonic.profiling import NULL_PHASE
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError('Reused API responses are shared and read-only, use copy.deepcopy() for a modifiable copy.')
+
+
+class _FrozenDict(dict):
+    """ Read-only dict of a reused response. A copy is a plain dict. """
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class _FrozenList(list):
+    """ Read-only list of a reused response. A copy is a plain list. """
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+def _freeze(value):
+    """ Return a decoded JSON value with every dict and list made read-only. """
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    return value
+
 
 class API(object):
-    """ Class used for communication with the Visonic API """
+    """ Class used for communication with the Visonic API. An instance can
+    be shared by many threads (for example the workers of a
+    ThreadPoolExecutor). Both tokens are replaced together (see login() and
+    set_tokens()), so a request never sends a user token with the session
+    token of another login. A plain request takes no lock of the instance,
+    the optional features (host pool, latency tracking, scheduler,
+    command deduplication) hold short locks of their own. """
 
     # Client configuration
     __app_type = 'com.visonic.powermaxapp'
     __user_agent = 'Dart/2.10 (dart:io)'
     __rest_version = '9.0'
 
-    # API tokens
-    __user_token = None
-    __session_token = None
+    # API tokens as one (user token, session token) tuple. The tuple is
+    # replaced as a whole under the lock, so a request reads a consistent
+    # pair of tokens without taking the lock itself.
+    __tokens = (None, None)
 
     # Use a session to reuse one TCP connection instead of creating a new
     # connection for every call to the API
     __session = None
     __timeout = 4
 
-    def __init__(self, hostname, app_id):
-        """ Class constructor initializes all URL variables. """
+    # Registered request instrumentation hooks (see visonic.hooks)
+    __hooks = ()
+
+    # Optional phase profiler (see visonic.profiling)
+    __profiler = None
+
+    # Latency based timeouts and hedged requests (see visonic.latency)
+    __latency = None
+    __adaptive_timeouts = False
+    __hedged_endpoints = frozenset()
+    __hedge_delay = 1.0
+
+    # Optional pool of API servers to fail over between (see visonic.hosts)
+    __host_pool = None
+
+    # Optional priority request scheduler (see visonic.scheduler)
+    __scheduler = None
+
+    # Identical state commands within this many seconds share one request
+    __dedup_window = 0
+
+    # Digest and decoded body of the last response per session token and
+    # URL when unchanged responses are reused, see __decode_response(). Only
+    # GET URLs without parameters are kept, the oldest entry is dropped
+    # beyond __max_responses entries.
+    __responses = None
+    __max_responses = 256
+
+    # Background thread keeping the pooled connections open
+    __keep_warm_thread = None
+    __last_request = 0.0
+
+    def __init__(self, hostname, app_id, capabilities=None, session=None, pool_size=10):
+        """ Class constructor initializes all URL variables. A CapabilityMap
+        can be passed to share (and persist) the known endpoints, and a
+        requests session to share one connection pool between several API
+        instances. pool_size is the number of connections kept open to the
+        API server, it should be at least the number of threads sharing
+        the API instance. """
 
         # Set connection specific details
         self.__hostname = hostname
         self.__app_id = app_id
 
+        # Endpoints available per hostname and REST API version
+        self.__capabilities = capabilities if capabilities is not None else CapabilityMap()
+
+        # Protects the tokens and the lazily created shared helpers
+        self.__lock = threading.Lock()
+
+        # Tokens used by the requests of the current thread only, while
+        # login() obtains a new pair of tokens, and the host the current
+        # request of the thread was sent to
+        self.__local = threading.local()
+
+        # Recently sent state commands, see __send_command()
+        self.__commands = {}
+
         self.render_urls()
 
-        # Create a new session
-        self.__session = requests.session()
+        # Create a new session unless a shared one was given
+        self.__owns_session = session is None
+        if session is None:
+            session = requests.session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+        self.__session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """ Stop the keep-warm thread and the probing of the host pool, and
+        close the session unless it was shared by passing it in. """
+        self.stop_keep_warm()
+        if self.__host_pool is not None:
+            self.__host_pool.stop()
+        if self.__owns_session:
+            self.__session.close()
 
     def render_urls(self):
         """ Configure the API endpoints. """
@@ -80,6 +200,20 @@ class API(object):
         self.__url_home_automation_devices  = self.__url_base + '/home_automation_devices'
         self.__url_make_video               = self.__url_base + '/make_video'
 
+    def set_hostname(self, hostname):
+        """ Change the API server used for the following requests. """
+        self.__hostname = hostname
+        self.render_urls()
+
+    def set_host_pool(self, pool):
+        """ Route requests through a HostPool of API servers (None disables). """
+        self.__host_pool = pool
+
+    @property
+    def host_pool(self):
+        """ Property to keep track of the pool of API servers. """
+        return self.__host_pool
+
     def set_rest_version(self, version):
         """ Set which version to use when connection to the API. """
         self.__rest_version = version
@@ -154,13 +288,95 @@ class API(object):
         # Raise an exception when we are not authorized to access the endpoint
         raise UnauthorizedError(str(api))
 
+    def __endpoint_name(self, url):
+        """ Return the endpoint name of a URL, for example 'status' or 'access/grant'. """
+        # The URL may point to another host of the host pool
+        path = url.split('?', 1)[0].split('/rest_api/', 1)[-1]
+        if path.startswith(self.__rest_version + '/'):
+            return path[len(self.__rest_version) + 1:]
+        return path
+
     def __send_request(self, url, with_session_token=True, with_user_token=True, data_json=None, request_type='GET'):
-        """ Send a GET or POST request to the server. Includes the Session-Token
-        only if with_session_token is True. """
+        """ Send a GET or POST request to the server and return the decoded
+        response. Registered hooks are notified about the request. """
+        self.__last_request = time.monotonic()
+
+        # Fail instantly instead of sending a request to an endpoint that is
+        # known to be unavailable in this version of the API on every host
+        # the request may be routed to
+        endpoint = self.__endpoint_name(url)
+        hostnames = self.__host_pool.hostnames if self.__host_pool is not None else [self.__hostname]
+        if not any(self.__capabilities.is_supported(hostname, self.__rest_version, endpoint) for hostname in hostnames):
+            raise NotSupportedError(f"The '{endpoint}' endpoint is not available in version {self.__rest_version} of the API on '{', '.join(hostnames)}'.")
+
+        # Wait for a request slot of the endpoint's priority class
+        scheduler = self.__scheduler
+        if scheduler is None:
+            return self.__dispatch(url, endpoint, with_session_token, with_user_token, data_json, request_type)
+        with scheduler.slot(scheduler.priority(endpoint)):
+            return self.__dispatch(url, endpoint, with_session_token, with_user_token, data_json, request_type)
+
+    def __dispatch(self, url, endpoint, with_session_token, with_user_token, data_json, request_type):
+        """ Perform and decode the request, notifying the hooks and profiler. """
+        hooks = self.__hooks
+        profiler = self.__profiler
+        if not hooks and profiler is None:
+            response = self.__perform_request(url, with_session_token, with_user_token, data_json, request_type)
+            return self.__decode_response(response, url, request_type)
+
+        bytes_out = len(data_json) if data_json is not None else 0
+        for hook in hooks:
+            hook.on_request_start(endpoint, request_type, bytes_out)
+
+        start = time.perf_counter()
+        try:
+            with profiler.phase('network') if profiler else NULL_PHASE:
+                response = self.__perform_request(url, with_session_token, with_user_token, data_json, request_type)
+            received = time.perf_counter()
+            with profiler.phase('decode') if profiler else NULL_PHASE:
+                result = self.__decode_response(response, url, request_type)
+        except Exception as e:
+            latency = time.perf_counter() - start
+            for hook in hooks:
+                hook.on_error(endpoint, request_type, e, latency)
+            raise
+        decoded = time.perf_counter()
+
+        for hook in hooks:
+            hook.on_response(endpoint, request_type, response.status_code, len(response.content),
+                             received - start, response.elapsed.total_seconds(), decoded - received)
+        return result
+
+    def __decode_response(self, response, url, request_type):
+        """ Decode the JSON body of a successful response. When unchanged
+        responses are reused, a GET response with the same body as the
+        previous one of the same session returns the previously decoded
+        (read-only) object without decoding. """
+        if response.status_code != requests.codes.ok:
+            return None
 
-        # Prepare the headers to be sent
+        responses = self.__responses
+        if responses is None or request_type != 'GET' or '?' in url:
+            return json.loads(response.content.decode('utf-8'))
+
+        # Keyed by session token too, so panels never share a decoded object
+        session_token = (getattr(self.__local, 'tokens', None) or self.__tokens)[1]
+        key = (session_token, url)
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        previous = responses.get(key)
+        if previous is not None and previous[0] == digest:
+            return previous[1]
+        result = _freeze(json.loads(response.content.decode('utf-8')))
+        responses.pop(key, None)
+        responses[key] = (digest, result)
+        while len(responses) > self.__max_responses:
+            responses.pop(next(iter(responses)), None)
+        return result
+
+    def __build_headers(self, with_session_token=True, with_user_token=True, data_json=None, request_type='GET', hostname=None):
+        """ Prepare the headers of a request, including the tokens when requested. """
         headers = {
-            'Host': self.__hostname,
+            'Host': hostname or self.__hostname,
             'Connection': 'keep-alive',
             'Accept': '*/*',
             'User-Agent': self.__user_agent,
@@ -173,25 +389,162 @@ class API(object):
             headers['Content-Type'] = 'application/json'
             headers['Content-Length'] = str(len(data_json))
 
+        # Read both tokens at once, they may be replaced by another thread
+        user_token, session_token = getattr(self.__local, 'tokens', None) or self.__tokens
+
         # Include the session token in the header
         if with_session_token:
-            headers['Session-Token'] = self.__session_token
+            headers['Session-Token'] = session_token
 
         # Include the user authentication token in the header
         if with_user_token:
-            headers['User-Token'] = self.__user_token
+            headers['User-Token'] = user_token
+
+        return headers
+
+    @staticmethod
+    def __not_connected(error):
+        """ Check if a request failed before a connection to the host was
+        established, so the request has certainly not been sent. """
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+    def __transmit_routed(self, url, with_session_token, with_user_token, data_json, request_type):
+        """ Send the request to the fastest healthy host of the host pool and
+        fail over to the next host when the connection fails. The tokens are
+        sent to whichever host is used. """
+        pool = self.__host_pool
+        if pool is None:
+            self.__local.hostname = self.__hostname
+            headers = self.__build_headers(with_session_token, with_user_token, data_json, request_type)
+            return self.__transmit(url, headers, data_json, request_type)
+
+        # A GET request is safe to send again after any connection error or
+        # a read timeout. A POST may have reached the server when the
+        # connection was lost, so it is only sent again when no connection
+        # could be established.
+        if request_type == 'GET':
+            failover_errors = (requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout)
+        else:
+            failover_errors = (requests.exceptions.ConnectionError,)
+
+        # The host is chosen per request, the instance is not changed. Hosts
+        # known to lack the endpoint are skipped.
+        path = url.split('/', 3)[3]
+        endpoint = self.__endpoint_name(url)
+        candidates = [h for h in pool.candidates() if self.__capabilities.is_supported(h, self.__rest_version, endpoint)]
+        if not candidates:
+            raise NotSupportedError(f"The '{endpoint}' endpoint is not available in version {self.__rest_version} of the API on '{', '.join(pool.hostnames)}'.")
+        for index, hostname in enumerate(candidates):
+            url = 'https://' + hostname + '/' + path
+            self.__local.hostname = hostname
+            headers = self.__build_headers(with_session_token, with_user_token, data_json, request_type, hostname)
+
+            start = time.perf_counter()
+            try:
+                response = self.__transmit(url, headers, data_json, request_type)
+            except failover_errors as e:
+                pool.mark_failed(hostname)
+                if index == len(candidates) - 1 or (request_type != 'GET' and not self.__not_connected(e)):
+                    raise
+                for hook in self.__hooks:
+                    hook.on_retry(endpoint, request_type)
+                continue
+            pool.observe(hostname, time.perf_counter() - start)
+            return response
+
+    def __transmit(self, url, headers, data_json, request_type):
+        """ Send the request over the session. Uses the adaptive timeout of
+        the endpoint for GET requests and hedges them when enabled. """
+        if self.__latency is None:
+            return self.__send(url, headers, data_json, request_type, self.__timeout)
+
+        # A POST that times out may still be executed by the panel, so it
+        # always gets the full timeout
+        endpoint = self.__endpoint_name(url)
+        timeout = self.__timeout
+        if self.__adaptive_timeouts and request_type == 'GET':
+            timeout = self.__latency.timeout(endpoint, self.__timeout)
+        if request_type == 'GET' and endpoint in self.__hedged_endpoints:
+            return self.__send_hedged(url, headers, endpoint, timeout)
+        return self.__send_observed(url, headers, data_json, request_type, endpoint, timeout)
+
+    def __send(self, url, headers, data_json, request_type, timeout):
+        """ Send a GET or POST request over the session. """
+        if request_type == 'GET':
+            return self.__session.get(url, headers=headers, timeout=timeout)
+        elif request_type == 'POST':
+            return self.__session.post(url, headers=headers, data=data_json, timeout=timeout)
+
+    def __send_observed(self, url, headers, data_json, request_type, endpoint, timeout):
+        """ Send a request and record its latency in the latency tracker. """
+        start = time.perf_counter()
+        try:
+            return self.__send(url, headers, data_json, request_type, timeout)
+        finally:
+            self.__latency.observe(endpoint, time.perf_counter() - start)
+
+    @staticmethod
+    def __start(function, *args):
+        """ Run a function on a new daemon thread and return a Future of its
+        result. The copies of a hedged request get their own threads, so
+        concurrent hedged requests never queue behind each other. """
+        future = Future()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def __send_hedged(self, url, headers, endpoint, timeout):
+        """ Send a GET request and a second copy if the first has not been
+        answered within the p95 latency of the endpoint. The first
+        successful reply of either copy wins, an error is only raised when
+        both copies failed. """
+        delay = self.__latency.percentile(endpoint, 0.95) or self.__hedge_delay
+
+        first = self.__start(self.__send_observed, url, headers, None, 'GET', endpoint, timeout)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        for hook in self.__hooks:
+            hook.on_retry(endpoint, 'GET')
+        second = self.__start(self.__send_observed, url, headers, None, 'GET', endpoint, timeout)
+
+        futures = [first, second]
+        error = None
+        while futures:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+            futures = list(pending)
+        raise error
+
+    def __perform_request(self, url, with_session_token=True, with_user_token=True, data_json=None, request_type='GET'):
+        """ Send a GET or POST request to the server. Includes the Session-Token
+        only if with_session_token is True. """
 
         # Perform the request and raise an exception
         # if the response is not OK (HTML 200)
         try:
-            if request_type == 'GET':
-                response = self.__session.get(url, headers=headers, timeout=self.__timeout)
-            elif request_type == 'POST':
-                response = self.__session.post(url, headers=headers, data=data_json, timeout=self.__timeout)
+            response = self.__transmit_routed(url, with_session_token, with_user_token, data_json, request_type)
             response.raise_for_status()
         except requests.exceptions.ConnectTimeout:
-            raise ConnectionTimeoutError(f"Connection to '{self.__hostname}' timed out after {str(self.__timeout)} seconds.")
+            # Name the host the request was routed to, see __transmit_routed()
+            raise ConnectionTimeoutError(f"Connection to '{self.__local.hostname}' timed out after {str(self.__timeout)} seconds.")
             return None
+        except requests.exceptions.ReadTimeout:
+            raise ConnectionTimeoutError(f"The API server '{self.__local.hostname}' did not respond in time.")
         except requests.exceptions.HTTPError as e:
             api = json.loads(response.content.decode('utf-8'))
             if   '400 Client Error: Bad Request' in str(e):
@@ -201,6 +554,12 @@ class API(object):
             elif '403 Client Error: Forbidden' in str(e):
                 self.__raise_on_forbidden(response.content)
             elif '404 Client Error: Not Found' in str(e):
+                # Only a GET without parameters tells that the endpoint itself
+                # is missing, commands also return 404 for unknown objects.
+                # It is learned for the host that answered.
+                if request_type == 'GET' and '?' not in url:
+                    hostname = urlparse(response.url).hostname or self.__hostname
+                    self.__capabilities.mark_unsupported(hostname, self.__rest_version, self.__endpoint_name(url))
                 raise NotFoundError()
             elif '420 Client Error:' in str(e):
                 # TODO: {'error': 10020, 'error_message': 'Login temporary blocked', 'error_reason_code': 'LoginTemporaryBlocked', 'extras': [{'key': 'timeout', 'value': 44}]} // 44 = seconds to unblocked
@@ -216,11 +575,57 @@ class API(object):
                 print(api)
                 raise
 
-        # Check HTTP response code
-        if response.status_code == requests.codes.ok:
-            return json.loads(response.content.decode('utf-8'))
-        else:
-            return None
+        return response
+
+    def __send_command(self, url, target, data_json):
+        """ Send a state changing POST request to a target (partition or
+        zone). While an identical command for the target is in flight, or its
+        process is known to have succeeded less than dedup_window seconds
+        ago, its response (and process token) is returned instead of a new
+        request. A command that was answered but whose process failed or is
+        not known to have succeeded is sent again. A different command for
+        the same target replaces the remembered one. """
+        window = self.__dedup_window
+        if not window:
+            return self.__send_request(url, data_json=data_json, request_type='POST')
+
+        key = (self.__tokens[1], url, target)
+        with self.__lock:
+            now = time.monotonic()
+            for old_key, old_command in list(self.__commands.items()):
+                if old_command['done'].is_set() and now - old_command['finished'] > window:
+                    del self.__commands[old_key]
+            command = self.__commands.get(key)
+            owner = command is None or command['data'] != data_json or \
+                (command['done'].is_set() and command['status'] != 'succeeded')
+            if owner:
+                command = self.__commands[key] = {
+                    'data': data_json,
+                    'done': threading.Event(),
+                    'finished': None,
+                    'result': None,
+                    'error': None,
+                    'status': None,
+                }
+
+        if not owner:
+            command['done'].wait()
+            if command['error'] is not None:
+                raise command['error']
+            return command['result']
+
+        try:
+            command['result'] = self.__send_request(url, data_json=data_json, request_type='POST')
+        except Exception as e:
+            command['error'] = e
+            with self.__lock:
+                if self.__commands.get(key) is command:
+                    del self.__commands[key]
+            raise
+        finally:
+            command['finished'] = time.monotonic()
+            command['done'].set()
+        return command['result']
 
     ######################
     # Public API methods #
@@ -229,7 +634,28 @@ class API(object):
     @property
     def session_token(self):
         """ Property to keep track of the session token. """
-        return self.__session_token
+        return self.__tokens[1]
+
+    def set_session_token(self, session_token):
+        """ Use a session token obtained elsewhere (for example a shared cache). """
+        with self.__lock:
+            self.__tokens = (self.__tokens[0], session_token)
+
+    def set_user_token(self, user_token):
+        """ Use a user token obtained elsewhere (for example by another API instance). """
+        with self.__lock:
+            self.__tokens = (user_token, self.__tokens[1])
+
+    def set_tokens(self, user_token, session_token):
+        """ Replace the user token and the session token together, so that
+        no request sends one of the new tokens with one of the old ones. """
+        with self.__lock:
+            self.__tokens = (user_token, session_token)
+
+    @property
+    def rest_version(self):
+        """ Property to keep track of the REST API version in use. """
+        return self.__rest_version
 
     @property
     def hostname(self):
@@ -239,13 +665,119 @@ class API(object):
     @property
     def user_token(self):
         """ Property to keep track of the user token beeing assigned during authentication. """
-        return self.__user_token
+        return self.__tokens[0]
 
     @property
     def app_id(self):
         """ Property to keep track of the user id (UUID) beeing used. """
         return self.__app_id
 
+    @property
+    def capabilities(self):
+        """ Property to keep track of the endpoints available on the server. """
+        return self.__capabilities
+
+    @property
+    def hooks(self):
+        """ Property to keep track of the registered request hooks. """
+        return self.__hooks
+
+    def add_hook(self, hook):
+        """ Register a request hook (see visonic.hooks.RequestHook). """
+        with self.__lock:
+            self.__hooks = self.__hooks + (hook,)
+
+    def remove_hook(self, hook):
+        """ Unregister a previously registered request hook. """
+        with self.__lock:
+            self.__hooks = tuple(h for h in self.__hooks if h is not hook)
+
+    @property
+    def latency(self):
+        """ Property to keep track of the latency tracker (None until enabled). """
+        return self.__latency
+
+    def __ensure_latency_tracker(self):
+        with self.__lock:
+            if self.__latency is None:
+                self.__latency = LatencyTracker(max_timeout=self.__timeout)
+
+    def set_adaptive_timeouts(self, enabled=True):
+        """ Derive the timeout of each endpoint from its observed latency
+        (never longer than the default timeout) instead of a fixed timeout. """
+        self.__adaptive_timeouts = enabled
+        if enabled:
+            self.__ensure_latency_tracker()
+
+    def set_hedging(self, endpoints=('status',), delay=1.0):
+        """ Hedge GET requests to the endpoints: a second copy is sent when
+        the first has not been answered within the p95 latency (or delay
+        seconds until enough samples exist). Pass () to disable hedging. """
+        self.__hedged_endpoints = frozenset(endpoints)
+        self.__hedge_delay = delay
+        if endpoints:
+            self.__ensure_latency_tracker()
+
+    def set_deduplication(self, window):
+        """ Deduplicate identical arm, disarm and zone bypass commands sent
+        within window seconds of each other (0 disables deduplication). """
+        self.__dedup_window = window
+
+    def set_response_reuse(self, enabled=True):
+        """ Return the same decoded object for a GET request whose response
+        body is identical to the previous response, instead of decoding it
+        again. The returned objects are shared and read-only, modifying
+        them raises TypeError (copy.deepcopy() returns a modifiable copy). """
+        self.__responses = {} if enabled else None
+
+    def set_scheduler(self, scheduler):
+        """ Send the requests through a RequestScheduler (None disables). """
+        self.__scheduler = scheduler
+
+    @property
+    def scheduler(self):
+        """ Property to keep track of the request scheduler. """
+        return self.__scheduler
+
+    def set_profiler(self, profiler):
+        """ Record network and decode phase timings in the profiler (None disables). """
+        self.__profiler = profiler
+
+    def preconnect(self):
+        """ Open a connection to the API server ahead of the first real request. """
+        self.get_version_info()
+
+    def __keep_warm(self, interval, stop):
+        """ Send a cheap request whenever the session has been idle for interval seconds. """
+        while not stop.wait(max(0.0, interval - (time.monotonic() - self.__last_request))):
+            if time.monotonic() - self.__last_request >= interval:
+                try:
+                    self.get_version_info()
+                except Exception:
+                    pass
+
+    def start_keep_warm(self, interval=20, preconnect=True):
+        """ Keep the pooled keep-alive connections open by sending a cheap
+        version request whenever the session has been idle for interval
+        seconds, so rare commands such as disarm() skip the TCP and TLS
+        handshake. The interval should be shorter than the idle timeout of
+        the server. """
+        self.stop_keep_warm()
+        if preconnect:
+            self.preconnect()
+        stop = threading.Event()
+        thread = threading.Thread(target=self.__keep_warm, args=(interval, stop), daemon=True)
+        self.__keep_warm_thread = (thread, stop)
+        thread.start()
+
+    def stop_keep_warm(self):
+        """ Stop keeping the connections open. """
+        if self.__keep_warm_thread is not None:
+            thread, stop = self.__keep_warm_thread
+            self.__keep_warm_thread = None
+            stop.set()
+            thread.join()
+
     def get_version_info(self):
         """ Find out which REST API versions are supported. """
         return self.__send_request(self.__url_version,
@@ -253,8 +785,8 @@ class API(object):
                                        with_user_token=False,
                                        request_type='GET')
 
-    def authenticate(self, email, password):
-        """ Try to authenticate and get a user auth token. """
+    def __request_user_token(self, email, password):
+        """ Authenticate and return a new user token, None on failure. """
         auth_info = {
             'email': email,
             'password': password,
@@ -267,12 +799,38 @@ class API(object):
                                        with_user_token=False,
                                        data_json=auth_json,
                                        request_type='POST')
-        if res is not None:
-            self.__user_token = res['user_token']
+        return res['user_token'] if res is not None else None
+
+    def authenticate(self, email, password):
+        """ Try to authenticate and get a user auth token. """
+        user_token = self.__request_user_token(email, password)
+        if user_token is not None:
+            self.set_user_token(user_token)
             return True
         else:
             return False
 
+    def login(self, email, password, panel_serial, user_code, user_token=None):
+        """ Authenticate (unless a user token is given) and log in to a panel.
+        The new tokens are only used by the current thread until both have
+        been obtained, then they replace the tokens of the instance together.
+        Use this instead of authenticate() and panel_login() to log in again
+        while other threads are sending requests. """
+        if user_token is None:
+            user_token = self.__request_user_token(email, password)
+            if user_token is None:
+                return False
+
+        self.__local.tokens = (user_token, None)
+        try:
+            session_token = self.__request_session_token(panel_serial, user_code)
+        finally:
+            self.__local.tokens = None
+        if session_token is None:
+            return False
+        self.set_tokens(user_token, session_token)
+        return True
+
     def is_logged_in(self):
         """ Check if the session token is still valid. """
         try:
@@ -348,7 +906,19 @@ class API(object):
     def get_process_status(self, process_token):
         """ Get the current status of a process running on API server. """
         url = self.__url_process_status + process_token
-        return self.__send_request(url, request_type='GET')
+        processes = self.__send_request(url, request_type='GET')
+        if self.__dedup_window and processes:
+            self.__record_process_status(processes)
+        return processes
+
+    def __record_process_status(self, processes):
+        """ Remember the status of the processes of deduplicated commands. """
+        statuses = {process.get('token'): process.get('status') for process in processes if isinstance(process, dict)}
+        with self.__lock:
+            for command in self.__commands.values():
+                result = command['result']
+                if isinstance(result, dict) and result.get('process_token') in statuses:
+                    command['status'] = statuses[result['process_token']]
 
     def get_smart_devices(self):
         """ Get a list of smart devices. """
@@ -386,8 +956,8 @@ class API(object):
         panel_json = json.dumps(panel_data, separators=(',', ':'))
         return self.__send_request(self.__url_panel_add, data_json=panel_json, request_type='POST')
 
-    def panel_login(self, panel_serial, user_code):
-        """ Try to login to the alarm panel and get a session token. """
+    def __request_session_token(self, panel_serial, user_code):
+        """ Log in to the alarm panel and return a new session token, None on failure. """
         login_info = {
             'user_code': user_code,
             'app_type': self.__app_type,
@@ -400,8 +970,13 @@ class API(object):
                                        with_session_token=False,
                                        data_json=login_json,
                                        request_type='POST')
-        if res is not None:
-            self.__session_token = res['session_token']
+        return res['session_token'] if res is not None else None
+
+    def panel_login(self, panel_serial, user_code):
+        """ Try to login to the alarm panel and get a session token. """
+        session_token = self.__request_session_token(panel_serial, user_code)
+        if session_token is not None:
+            self.set_session_token(session_token)
             return True
         else:
             return False
@@ -447,7 +1022,7 @@ class API(object):
         """ Enable or disable bypass mode for a zone. """
         bypass_data = {'zone': zone, 'set': set_enabled}
         bypass_json = json.dumps(bypass_data, separators=(',', ':'))
-        return self.__send_request(self.__url_set_bypass_zone, data_json=bypass_json, request_type='POST')
+        return self.__send_command(self.__url_set_bypass_zone, zone, bypass_json)
 
     def set_name(self, object_class, id, name):
         """ Set the name of any type of object in the alarm system. """
@@ -465,19 +1040,84 @@ class API(object):
         """ Arm in Home mode. """
         arm_info = {'partition': partition, 'state': 'HOME'}
         arm_json = json.dumps(arm_info, separators=(',', ':'))
-        return self.__send_request(self.__url_set_state, data_json=arm_json, request_type='POST')
+        return self.__send_command(self.__url_set_state, partition, arm_json)
 
     def arm_away(self, partition):
         """ Arm in Away mode. """
         arm_info = {'partition': partition, 'state': 'AWAY'}
         arm_json = json.dumps(arm_info, separators=(',', ':'))
-        return self.__send_request(self.__url_set_state, data_json=arm_json, request_type='POST')
+        return self.__send_command(self.__url_set_state, partition, arm_json)
 
     def disarm(self, partition):
         """ Disarm the alarm system. """
         disarm_info = {'partition': partition, 'state': 'DISARM'}
         disarm_json = json.dumps(disarm_info, separators=(',', ':'))
-        return self.__send_request(self.__url_set_state, data_json=disarm_json, request_type='POST')
+        return self.__send_command(self.__url_set_state, partition, disarm_json)
+
+    def download(self, url, path, chunk_size=65536):
+        """ Stream a file (for example a camera preview) to disk in chunks
+        instead of loading it into memory. Relative URLs are resolved against
+        the API server. The tokens are only sent to the API servers, never to
+        another host (for example a CDN or a signed URL). Returns the number
+        of bytes written. """
+        if not url.startswith('http'):
+            url = 'https://' + self.__hostname + ('' if url.startswith('/') else '/') + url
+
+        hostname = urlparse(url).hostname
+        pool = self.__host_pool
+        api_host = hostname == self.__hostname or (pool is not None and hostname in pool.hostnames)
+        if api_host:
+            headers = self.__build_headers()
+        else:
+            headers = {'Accept': '*/*', 'User-Agent': self.__user_agent, 'Accept-Encoding': 'gzip'}
+
+        # Let the session set the Host header of the URL
+        headers.pop('Host', None)
+
+        temp_path = path + '.part'
+        size = 0
+        try:
+            with self.__session.get(url, headers=headers, timeout=self.__timeout, stream=True) as response:
+                if response.status_code == 404:
+                    raise NotFoundError(f"The file '{url}' was not found on the server.")
+                if api_host and response.status_code == 440:
+                    raise SessionTokenError()
+                if api_host and response.status_code in (400, 401, 403):
+                    self.__raise_on_download_error(response)
+                response.raise_for_status()
+                with open(temp_path, 'wb') as fh:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        fh.write(chunk)
+                        size += len(chunk)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if isinstance(e, requests.exceptions.ConnectTimeout):
+                raise ConnectionTimeoutError(f"Connection to '{hostname}' timed out after {str(self.__timeout)} seconds.")
+            # A timeout while streaming the body is raised as a ConnectionError
+            if isinstance(e, requests.exceptions.ReadTimeout) or \
+                    (isinstance(e, requests.exceptions.ConnectionError) and e.args and isinstance(e.args[0], ReadTimeoutError)):
+                raise ConnectionTimeoutError(f"The server '{hostname}' did not respond in time.")
+            raise
+        os.replace(temp_path, path)
+        return size
+
+    def __raise_on_download_error(self, response):
+        """ Raise the exception of a 400, 401 or 403 response to a download,
+        like for the other requests when the body is an API error. """
+        try:
+            json.loads(response.content.decode('utf-8'))['error']
+        except (ValueError, KeyError, TypeError):
+            if response.status_code == 401:
+                raise UnauthorizedError()
+            response.raise_for_status()
+
+        if response.status_code == 400:
+            self.__raise_on_bad_request(response.content)
+        elif response.status_code == 401:
+            self.__raise_on_unauthorized(response.content)
+        else:
+            self.__raise_on_forbidden(response.content)
 
     def send_get(self, url):
         """ Send a custom POST request. """
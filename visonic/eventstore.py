@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import threading
+
+from datetime import datetime
+
+from visonic.classes import Event
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    panel TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    type_id INTEGER,
+    label TEXT,
+    description TEXT,
+    appointment TEXT,
+    datetime TEXT,
+    video TEXT,
+    device_type TEXT,
+    zone INTEGER,
+    partitions TEXT,
+    name TEXT,
+    PRIMARY KEY (panel, id)
+);
+CREATE TABLE IF NOT EXISTS event_partitions (
+    panel TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    partition INTEGER NOT NULL,
+    PRIMARY KEY (panel, partition, id)
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (datetime);
+CREATE INDEX IF NOT EXISTS events_panel_time ON events (panel, datetime);
+CREATE INDEX IF NOT EXISTS events_type_time ON events (type_id, datetime);
+CREATE INDEX IF NOT EXISTS events_zone_time ON events (zone, datetime);
+"""
+
+_COLUMNS = 'panel, id, type_id, label, description, appointment, datetime, video, device_type, zone, partitions, name'
+
+
+def _timestamp(value):
+    """ Return a datetime (or string) in the format used by Event.datetime. """
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class EventStore(object):
+    """ Keeps the events of one or more panels in a SQLite database, so the
+    history is not lost when events drop out of the ~60 events returned by
+    the API. Events are deduplicated on (panel, event id) and indexed by
+    panel, time, type_id, zone and partition. """
+
+    def __init__(self, path=':memory:'):
+        """ Set the private variable values on instantiation. """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__connection:
+            self.__connection.executescript(_SCHEMA)
+
+    @property
+    def path(self):
+        return self.__path
+
+    def close(self):
+        """ Close the database connection. """
+        with self.__lock:
+            self.__connection.close()
+
+    def add(self, panel, events):
+        """ Store the events of a panel in one transaction. Returns the number
+        of events that were not stored before. """
+        if panel is None:
+            raise ValueError('The serial of the panel the events belong to is required.')
+
+        rows = []
+        partitions = []
+        for event in events:
+            rows.append((panel, event.id, event.type_id, event.label, event.description,
+                         event.appointment, event.datetime, json.dumps(event.video), event.device_type,
+                         event.zone, json.dumps(event.partitions), event.name))
+            partitions.extend((panel, event.id, partition) for partition in event.partitions or [])
+
+        with self.__lock, self.__connection:
+            before = self.__connection.total_changes
+            self.__connection.executemany(
+                f'INSERT OR IGNORE INTO events ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            added = self.__connection.total_changes - before
+            self.__connection.executemany(
+                'INSERT OR IGNORE INTO event_partitions (panel, id, partition) VALUES (?, ?, ?)', partitions)
+        return added
+
+    def sync(self, setup, panel=None):
+        """ Fetch the events of a logged in Setup and store them. The panel
+        defaults to the serial the Setup is logged in to. Returns the number
+        of new events. """
+        return self.add(panel or setup.panel_serial, setup.get_events())
+
+    def __query(self, conditions, parameters, panel, start, end, limit, join=''):
+        """ Select the events matching the conditions, oldest first. """
+        conditions = list(conditions)
+        parameters = list(parameters)
+        if panel is not None:
+            conditions.append('e.panel = ?')
+            parameters.append(panel)
+        if start is not None:
+            conditions.append('e.datetime >= ?')
+            parameters.append(_timestamp(start))
+        if end is not None:
+            conditions.append('e.datetime < ?')
+            parameters.append(_timestamp(end))
+
+        sql = f'SELECT e.id, e.type_id, e.label, e.description, e.appointment, e.datetime, e.video, ' \
+              f'e.device_type, e.zone, e.partitions, e.name FROM events e {join}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if limit is None:
+            sql += ' ORDER BY e.datetime, e.id'
+        else:
+            sql += ' ORDER BY e.datetime DESC, e.id DESC LIMIT ?'
+            parameters.append(limit)
+
+        with self.__lock:
+            rows = self.__connection.execute(sql, parameters).fetchall()
+        if limit is not None:
+            rows.reverse()
+
+        return [Event(id=row[0], type_id=row[1], label=row[2], description=row[3], appointment=row[4],
+                      datetime=row[5], video=json.loads(row[6]), device_type=row[7], zone=row[8],
+                      partitions=json.loads(row[9]), name=row[10])
+                for row in rows]
+
+    def events(self, panel=None, limit=None):
+        """ Return the stored events, optionally only the latest limit events. """
+        return self.__query((), (), panel, None, None, limit)
+
+    def events_between(self, start, end, panel=None):
+        """ Return the events from start up to (not including) end. The times
+        are datetime objects or 'YYYY-MM-DD HH:MM:SS' strings. """
+        return self.__query((), (), panel, start, end, None)
+
+    def events_for_zone(self, zone, panel=None, start=None, end=None):
+        """ Return the events of a zone. """
+        return self.__query(('e.zone = ?',), (zone,), panel, start, end, None)
+
+    def events_of_type(self, type_ids, panel=None, start=None, end=None):
+        """ Return the events of one or more type ids. """
+        if isinstance(type_ids, int):
+            type_ids = [type_ids]
+        placeholders = ', '.join('?' * len(type_ids))
+        return self.__query((f'e.type_id IN ({placeholders})',), type_ids, panel, start, end, None)
+
+    def events_for_partition(self, partition, panel=None, start=None, end=None):
+        """ Return the events of a partition. """
+        join = 'JOIN event_partitions p ON p.panel = e.panel AND p.id = e.id'
+        return self.__query(('p.partition = ?',), (partition,), panel, start, end, None, join)
+
+    def count(self, panel=None):
+        """ Return the number of stored events. """
+        with self.__lock:
+            if panel is None:
+                return self.__connection.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+            return self.__connection.execute('SELECT COUNT(*) FROM events WHERE panel = ?', (panel,)).fetchone()[0]
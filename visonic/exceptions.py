@@ -60,6 +60,13 @@ class PanelNotConnectedError(Error):
         super().__init__(self.message)
 
 
+class PartitionNotReadyError(Error):
+    """ Raised when a partition is not ready to be armed (doors or windows open). """
+    def __init__(self, message="The partition is not ready to be armed."):
+        self.message = message
+        super().__init__(self.message)
+
+
 class PanelSerialIncorrectError(Error):
     """ Raised when an incorrect panel serial/ID number was provided in the request. """
     def __init__(self, message="Connection to the alarm panel failed because the panel ID is incorrect."):
@@ -146,6 +153,14 @@ class WrongPanelSerialOrMasterUserCodeError(Error):
         super().__init__(self.message)
 
 
+class CommandTimeoutError(Error):
+    """ Raised when a command was not confirmed by the alarm panel in time. """
+
+    def __init__(self, message="The command was not confirmed by the alarm panel in time."):
+        self.message = message
+        super().__init__(self.message)
+
+
 class ConnectionTimeoutError(Error):
     """ Raised when connection to the REST API Server timed out. """
     
@@ -232,3 +247,7 @@ class UnsupportedRestAPIVersionError(Error):
     def __init__(self, message="Unsupported REST API version."):
         self.message = message
         super().__init__(self.message)
+
+
+# Exceptions indicating that the user or session token has expired
+TOKEN_ERRORS = (SessionTokenError, UserAuthRequiredError, UnauthorizedError)
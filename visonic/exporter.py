@@ -0,0 +1,205 @@
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from visonic.exceptions import *
+
+
+def _escape(value):
+    """ Escape a label value according to the Prometheus text format. """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    """ Render a label set, for example {panel="home",partition="1"}. """
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server handling each scrape in its own thread. """
+    daemon_threads = True
+
+
+class PanelTarget(object):
+    """ Class definition of a panel polled by the exporter. """
+
+    def __init__(self, name, setup, email=None, password=None, panel_serial=None, user_code=None):
+        """ Set the private variable values on instantiation. The credentials
+        are optional and only used to refresh expired tokens. """
+        self.__name = name
+        self.__setup = setup
+        self.__email = email
+        self.__password = password
+        self.__panel_serial = panel_serial
+        self.__user_code = user_code
+
+        # Client health
+        self.poll_duration = None
+        self.last_poll = None
+        self.up = False
+        self.errors = {}
+        self.token_refreshes = 0
+
+        # Last known panel state
+        self.status = None
+        self.troubles = None
+        self.devices = None
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def setup(self):
+        return self.__setup
+
+    def can_refresh_tokens(self):
+        """ Check if credentials are available to refresh expired tokens. """
+        return self.__email is not None and self.__panel_serial is not None
+
+    def refresh_tokens(self):
+        """ Authenticate and log in to the panel again. """
+        self.__setup.login(self.__email, self.__password, self.__panel_serial, self.__user_code)
+        self.token_refreshes += 1
+
+
+class PanelExporter(object):
+    """ Polls a set of panels in the background and serves their state as
+    Prometheus metrics on /metrics. Scrapes are answered from an in-memory
+    cache, so the scrape frequency never affects the load on the API server. """
+
+    def __init__(self, interval=60, address='', port=9120):
+        """ Set the private variable values on instantiation. """
+        self.__interval = interval
+        self.__address = address
+        self.__port = port
+        self.__targets = []
+        self.__metrics = ''
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__server = None
+
+    def add_panel(self, name, setup, email=None, password=None, panel_serial=None, user_code=None):
+        """ Add an authenticated Setup instance to the set of polled panels. """
+        self.__targets.append(PanelTarget(name, setup, email, password, panel_serial, user_code))
+
+    def poll(self):
+        """ Poll all panels once and update the metrics cache. """
+        for target in self.__targets:
+            self.__poll_target(target)
+        self.__metrics = self.render()
+
+    def __poll_target(self, target):
+        """ Fetch the status, troubles and devices of a single panel. """
+        start = time.perf_counter()
+        try:
+            try:
+                self.__fetch(target)
+            except TOKEN_ERRORS:
+                if not target.can_refresh_tokens():
+                    raise
+                target.refresh_tokens()
+                self.__fetch(target)
+            target.up = True
+        except Exception as e:
+            name = type(e).__name__
+            target.errors[name] = target.errors.get(name, 0) + 1
+            target.up = False
+        target.poll_duration = time.perf_counter() - start
+        target.last_poll = time.time()
+
+    def __fetch(self, target):
+        target.status = target.setup.get_status()
+        target.troubles = target.setup.get_troubles()
+        target.devices = target.setup.get_devices()
+
+    def render(self):
+        """ Render the metrics of all panels in the Prometheus text format. """
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {"counter" if name.endswith("_total") else "gauge"}')
+            for labels, value in samples:
+                lines.append(f'{name}{labels} {value}')
+
+        targets = [t for t in self.__targets if t.status is not None]
+
+        metric('visonic_panel_connected', 'API server connected to the panel.',
+               [(_labels(panel=t.name), int(t.status.connected)) for t in targets])
+        metric('visonic_panel_bba_connected', 'Broadband (PowerLink) connectivity.',
+               [(_labels(panel=t.name, state=t.status.bba_state), int(t.status.bba_connected)) for t in targets])
+        metric('visonic_panel_gprs_connected', 'GPRS connectivity.',
+               [(_labels(panel=t.name, state=t.status.gprs_state), int(t.status.gprs_connected)) for t in targets])
+        metric('visonic_panel_rssi_level', 'Signal level reported by the panel.',
+               [(_labels(panel=t.name, level=t.status.rssi_level, network=t.status.rssi_network), 1) for t in targets])
+        metric('visonic_partition_state', 'Current partition state.',
+               [(_labels(panel=t.name, partition=p.id, state=p.state), 1) for t in targets for p in t.status.partitions])
+        metric('visonic_partition_ready', 'Partition is ready to be armed.',
+               [(_labels(panel=t.name, partition=p.id), int(bool(p.ready))) for t in targets for p in t.status.partitions])
+        metric('visonic_panel_troubles', 'Number of active troubles.',
+               [(_labels(panel=t.name), len(t.troubles)) for t in targets if t.troubles is not None])
+        metric('visonic_device_warnings', 'Number of warnings per device.',
+               [(_labels(panel=t.name, device=d.id, device_type=d.device_type, subtype=d.subtype), len(d.warnings or []))
+                for t in targets if t.devices is not None for d in t.devices])
+
+        metric('visonic_exporter_up', 'Last poll of the panel succeeded.',
+               [(_labels(panel=t.name), int(t.up)) for t in self.__targets])
+        metric('visonic_exporter_poll_duration_seconds', 'Duration of the last poll.',
+               [(_labels(panel=t.name), t.poll_duration) for t in self.__targets if t.poll_duration is not None])
+        metric('visonic_exporter_last_poll_timestamp_seconds', 'Time of the last poll.',
+               [(_labels(panel=t.name), t.last_poll) for t in self.__targets if t.last_poll is not None])
+        metric('visonic_exporter_poll_errors_total', 'Failed polls by exception class.',
+               [(_labels(panel=t.name, error=error), count) for t in self.__targets for error, count in t.errors.items()])
+        metric('visonic_exporter_token_refreshes_total', 'Number of token refreshes.',
+               [(_labels(panel=t.name), t.token_refreshes) for t in self.__targets])
+
+        return '\n'.join(lines) + '\n'
+
+    @property
+    def metrics(self):
+        """ The cached metrics served on /metrics. """
+        return self.__metrics
+
+    def __poll_loop(self):
+        while not self.__stop.is_set():
+            self.poll()
+            self.__stop.wait(self.__interval)
+
+    def start(self):
+        """ Start the polling thread and the HTTP server. """
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.metrics.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__stop.clear()
+        self.__server = _ThreadingHTTPServer((self.__address, self.__port), MetricsHandler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        self.__thread = threading.Thread(target=self.__poll_loop, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """ Stop the polling thread and the HTTP server. """
+        self.__stop.set()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
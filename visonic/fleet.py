@@ -0,0 +1,274 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from visonic.exceptions import *
+from visonic.processes import FINAL_STATUSES, ProcessTracker
+
+
+class RateLimiter(object):
+    """ Token bucket limiting the number of requests per second. """
+
+    def __init__(self, rate, burst=None):
+        """ Set the private variable values on instantiation. """
+        self.__rate = float(rate)
+        self.__capacity = float(burst if burst is not None else max(1.0, rate))
+        self.__tokens = self.__capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """ Block until a request may be sent. """
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+                self.__updated = now
+                if self.__tokens >= 1.0:
+                    self.__tokens -= 1.0
+                    return
+                delay = (1.0 - self.__tokens) / self.__rate
+            time.sleep(delay)
+
+
+class FleetTarget(object):
+    """ Class definition of a partition of a panel to arm or disarm. """
+
+    def __init__(self, setup, partition=-1, name=None):
+        """ Set the private variable values on instantiation. """
+        self.__setup = setup
+        self.__partition = partition
+        self.__name = name
+
+    def __repr__(self):
+        """ Define how the object is represented on output to console. """
+        return f"{type(self).__name__}(name = '{self.name}', partition = {self.partition})"
+
+    @property
+    def setup(self):
+        return self.__setup
+
+    @property
+    def partition(self):
+        return self.__partition
+
+    @property
+    def name(self):
+        return self.__name
+
+
+class FleetResult(object):
+    """ Class definition of the outcome of a command sent to one target. """
+
+    def __init__(self, target, state, token=None, process=None, confirmed=False, error=None):
+        """ Set the private variable values on instantiation. """
+        self.__target = target
+        self.__state = state
+        self.__token = token
+        self.__process = process
+        self.__confirmed = confirmed
+        self.__error = error
+
+    def __str__(self):
+        """ Define how the print() method should print the object. """
+        object_type = str(type(self))
+        return object_type + ": " + str(self.as_dict())
+
+    def as_dict(self):
+        """ Return the object properties in a dictionary. """
+        return {
+            'target': self.target,
+            'state': self.state,
+            'token': self.token,
+            'process': self.process,
+            'confirmed': self.confirmed,
+            'error': self.error,
+            'succeeded': self.succeeded,
+        }
+
+    # Result properties
+    @property
+    def target(self):
+        return self.__target
+
+    @property
+    def state(self):
+        """ The requested state (AWAY, HOME or DISARM). """
+        return self.__state
+
+    @property
+    def token(self):
+        return self.__token
+
+    @property
+    def process(self):
+        return self.__process
+
+    @property
+    def confirmed(self):
+        """ The partition state reported by the panel matches the requested state. """
+        return self.__confirmed
+
+    @property
+    def error(self):
+        return self.__error
+
+    @property
+    def succeeded(self):
+        return self.__confirmed and self.__error is None
+
+
+class FleetOrchestrator(object):
+    """ Arms or disarms many (panel, partition) targets concurrently. Targets
+    of the same panel share one status check and batched process status
+    queries, and every request is limited by a per-host rate limiter. """
+
+    # Setup method sending each state command
+    __commands = {
+        'AWAY': 'arm_away',
+        'HOME': 'arm_home',
+        'DISARM': 'disarm',
+    }
+
+    def __init__(self, max_workers=32, rate_per_host=5.0, check_ready=True, timeout=60, interval=2.0):
+        """ Set the private variable values on instantiation. """
+        self.__max_workers = max_workers
+        self.__rate_per_host = rate_per_host
+        self.__check_ready = check_ready
+        self.__timeout = timeout
+        self.__interval = interval
+        self.__limiters = {}
+        self.__lock = threading.Lock()
+
+    def arm_away(self, targets):
+        """ Arm the targets in Away mode. Returns an iterator over a FleetResult per target as they complete. """
+        return self.run(targets, 'AWAY')
+
+    def arm_home(self, targets):
+        """ Arm the targets in Home mode. Returns an iterator over a FleetResult per target as they complete. """
+        return self.run(targets, 'HOME')
+
+    def disarm(self, targets):
+        """ Disarm the targets. Returns an iterator over a FleetResult per target as they complete. """
+        return self.run(targets, 'DISARM')
+
+    def run(self, targets, state):
+        """ Send the state command to all targets and return an iterator over
+        the results as the panels confirm them. The commands are sent right
+        away, whether or not the results are iterated. Targets can be
+        FleetTarget objects or (setup, partition) tuples. """
+        groups = {}
+        for target in targets:
+            if not isinstance(target, FleetTarget):
+                target = FleetTarget(*target)
+            groups.setdefault(id(target.setup), []).append(target)
+        if not groups:
+            return iter(())
+
+        executor = ThreadPoolExecutor(max_workers=min(self.__max_workers, len(groups)))
+        futures = [executor.submit(self.__run_panel, group, state) for group in groups.values()]
+        # The submitted panels keep running, the workers exit when they are done
+        executor.shutdown(wait=False)
+        return self.__results(futures)
+
+    @staticmethod
+    def __results(futures):
+        """ Yield the results of the panels as they complete. """
+        for future in as_completed(futures):
+            for result in future.result():
+                yield result
+
+    def __throttle(self, setup):
+        """ Wait for the rate limiter of the API server used by the setup. """
+        hostname = setup.api.hostname
+        with self.__lock:
+            limiter = self.__limiters.get(hostname)
+            if limiter is None:
+                limiter = self.__limiters[hostname] = RateLimiter(self.__rate_per_host)
+        limiter.acquire()
+
+    @staticmethod
+    def __partitions(status, partition):
+        """ Return the partitions of the status addressed by a target. """
+        if partition == -1:
+            return status.partitions
+        return [p for p in status.partitions if p.id == partition]
+
+    @staticmethod
+    def __not_found(target):
+        """ Return the error of a target whose partition is not on the panel. """
+        return NotFoundError(f"Partition {target.partition} was not found on the panel.")
+
+    def __run_panel(self, targets, state):
+        """ Send the command to all targets of one panel and confirm it. """
+        setup = targets[0].setup
+        results = []
+        try:
+            pending = list(targets)
+
+            # Do not try to arm partitions with open doors or windows
+            if self.__check_ready and state != 'DISARM':
+                self.__throttle(setup)
+                status = setup.get_status()
+                for target in list(pending):
+                    partitions = self.__partitions(status, target.partition)
+                    if not partitions:
+                        results.append(FleetResult(target, state, error=self.__not_found(target)))
+                        pending.remove(target)
+                    elif not all(p.ready for p in partitions):
+                        results.append(FleetResult(target, state, error=PartitionNotReadyError()))
+                        pending.remove(target)
+
+            tokens = {}
+            for target in pending:
+                self.__throttle(setup)
+                try:
+                    tokens[target] = getattr(setup, self.__commands[state])(target.partition)
+                except Exception as e:
+                    results.append(FleetResult(target, state, error=e))
+
+            results.extend(self.__confirm(setup, tokens, state))
+        except Exception as e:
+            done = set(result.target for result in results)
+            results.extend(FleetResult(target, state, error=e) for target in targets if target not in done)
+        return results
+
+    def __confirm(self, setup, tokens, state):
+        """ Poll the process status (batched) and the partition states until
+        every target is confirmed, has failed or the timeout expired. """
+        results = []
+        tracker = ProcessTracker(setup)
+        processes = {}
+        waiting = dict(tokens)
+        deadline = time.monotonic() + self.__timeout
+
+        while waiting:
+            self.__throttle(setup)
+            for token, process in tracker.poll(waiting.values()).items():
+                processes[token] = process
+            for target, token in list(waiting.items()):
+                process = processes.get(token)
+                if process is not None and process.status in FINAL_STATUSES and process.status != 'succeeded':
+                    results.append(FleetResult(target, state, token, process))
+                    del waiting[target]
+
+            if waiting:
+                self.__throttle(setup)
+                status = setup.get_status()
+                for target, token in list(waiting.items()):
+                    partitions = self.__partitions(status, target.partition)
+                    if not partitions:
+                        results.append(FleetResult(target, state, token, processes.get(token), error=self.__not_found(target)))
+                        del waiting[target]
+                    elif all(p.state == state for p in partitions):
+                        results.append(FleetResult(target, state, token, processes.get(token), confirmed=True))
+                        del waiting[target]
+
+            if waiting and time.monotonic() + self.__interval > deadline:
+                for target, token in waiting.items():
+                    results.append(FleetResult(target, state, token, processes.get(token), error=CommandTimeoutError()))
+                break
+            if waiting:
+                time.sleep(self.__interval)
+        return results
@@ -0,0 +1,140 @@
+import threading
+
+
+class RequestHook(object):
+    """ Base class for request instrumentation hooks.
+
+    Subclass it and override the callbacks of interest, then register the
+    hook with API.add_hook(). When no hooks are registered the API skips all
+    instrumentation, so an unused hook interface costs next to nothing. """
+
+    def on_request_start(self, endpoint, method, bytes_out):
+        """ Called right before a request is sent to the API server. """
+        pass
+
+    def on_response(self, endpoint, method, status_code, bytes_in, latency, server_time, decode_time):
+        """ Called when a response has been received and decoded.
+
+        latency is the wall time until the full response body was received,
+        server_time is the time until the response headers arrived (server +
+        network) and decode_time is the time spent decoding the JSON body. """
+        pass
+
+    def on_error(self, endpoint, method, error, latency):
+        """ Called when a request raised an exception. """
+        pass
+
+    def on_retry(self, endpoint, method):
+        """ Called when a request is sent again (hedged or failed over). """
+        pass
+
+
+class EndpointStats(object):
+    """ Class definition of the metrics collected for one API endpoint. """
+
+    def __init__(self, buckets):
+        """ Set the private variable values on instantiation. """
+        self.__buckets = buckets
+        self.__histogram = [0] * (len(buckets) + 1)
+        self.__requests = 0
+        self.__responses = 0
+        self.__bytes_in = 0
+        self.__bytes_out = 0
+        self.__retries = 0
+        self.__errors = {}
+        self.__latency_sum = 0.0
+        self.__server_time_sum = 0.0
+        self.__decode_time_sum = 0.0
+
+    def record_request(self, bytes_out):
+        self.__requests += 1
+        self.__bytes_out += bytes_out
+
+    def record_response(self, bytes_in, latency, server_time, decode_time):
+        self.__responses += 1
+        self.__bytes_in += bytes_in
+        self.__latency_sum += latency
+        self.__server_time_sum += server_time
+        self.__decode_time_sum += decode_time
+        self.__observe(latency)
+
+    def record_error(self, error, latency):
+        name = type(error).__name__
+        self.__errors[name] = self.__errors.get(name, 0) + 1
+        self.__observe(latency)
+
+    def record_retry(self):
+        self.__retries += 1
+
+    def __observe(self, latency):
+        """ Add a latency sample to the histogram. """
+        for index, bound in enumerate(self.__buckets):
+            if latency <= bound:
+                self.__histogram[index] += 1
+                return
+        self.__histogram[-1] += 1
+
+    def as_dict(self):
+        """ Return the object properties in a dictionary. """
+        histogram = {str(bound): count for bound, count in zip(self.__buckets, self.__histogram)}
+        histogram['+Inf'] = self.__histogram[-1]
+        return {
+            'requests': self.__requests,
+            'responses': self.__responses,
+            'bytes_in': self.__bytes_in,
+            'bytes_out': self.__bytes_out,
+            'retries': self.__retries,
+            'errors': dict(self.__errors),
+            'latency_sum': self.__latency_sum,
+            'server_time_sum': self.__server_time_sum,
+            'decode_time_sum': self.__decode_time_sum,
+            'latency_histogram': histogram,
+        }
+
+
+class MetricsCollector(RequestHook):
+    """ Built-in hook collecting per-endpoint latency histograms, request
+    counts, bytes in and out, errors by exception class and retry counts. """
+
+    # Histogram bucket upper bounds in seconds
+    default_buckets = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+    def __init__(self, buckets=None):
+        """ Set the private variable values on instantiation. """
+        self.__buckets = tuple(sorted(buckets)) if buckets else self.default_buckets
+        self.__endpoints = {}
+        self.__lock = threading.Lock()
+
+    def __stats(self, endpoint, method):
+        """ Return the stats object of an endpoint, creating it on first use. """
+        key = (method, endpoint)
+        stats = self.__endpoints.get(key)
+        if stats is None:
+            stats = self.__endpoints[key] = EndpointStats(self.__buckets)
+        return stats
+
+    def on_request_start(self, endpoint, method, bytes_out):
+        with self.__lock:
+            self.__stats(endpoint, method).record_request(bytes_out)
+
+    def on_response(self, endpoint, method, status_code, bytes_in, latency, server_time, decode_time):
+        with self.__lock:
+            self.__stats(endpoint, method).record_response(bytes_in, latency, server_time, decode_time)
+
+    def on_error(self, endpoint, method, error, latency):
+        with self.__lock:
+            self.__stats(endpoint, method).record_error(error, latency)
+
+    def on_retry(self, endpoint, method):
+        with self.__lock:
+            self.__stats(endpoint, method).record_retry()
+
+    def as_dict(self):
+        """ Return the collected metrics keyed by 'METHOD endpoint'. """
+        with self.__lock:
+            return {f'{method} {endpoint}': stats.as_dict() for (method, endpoint), stats in self.__endpoints.items()}
+
+    def reset(self):
+        """ Forget all collected metrics. """
+        with self.__lock:
+            self.__endpoints = {}
@@ -0,0 +1,89 @@
+import threading
+import time
+import requests
+
+
+class HostPool(object):
+    """ Keeps track of the latency and health of several API servers of the
+    same alarm provider. Requests are routed to the fastest healthy host and
+    a host that fails is avoided for failure_cooldown seconds. """
+
+    def __init__(self, hostnames, probe_interval=30, failure_cooldown=60, alpha=0.3):
+        """ Set the private variable values on instantiation. """
+        self.__hostnames = list(hostnames)
+        self.__probe_interval = probe_interval
+        self.__failure_cooldown = failure_cooldown
+        self.__alpha = alpha
+        self.__latency = {}
+        self.__failed_at = {}
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    @property
+    def hostnames(self):
+        return list(self.__hostnames)
+
+    def observe(self, hostname, latency):
+        """ Record a successful request (or probe) and its latency. """
+        with self.__lock:
+            previous = self.__latency.get(hostname)
+            self.__latency[hostname] = latency if previous is None else previous + self.__alpha * (latency - previous)
+            self.__failed_at.pop(hostname, None)
+
+    def mark_failed(self, hostname):
+        """ Record a failed request, the host is avoided for a while. """
+        with self.__lock:
+            self.__failed_at[hostname] = time.monotonic()
+
+    def is_healthy(self, hostname):
+        failed_at = self.__failed_at.get(hostname)
+        return failed_at is None or time.monotonic() - failed_at > self.__failure_cooldown
+
+    def candidates(self):
+        """ Return the hosts in the order they should be tried: the healthy
+        hosts from fastest to slowest, then the failed hosts. """
+        with self.__lock:
+            order = {hostname: index for index, hostname in enumerate(self.__hostnames)}
+            healthy = [h for h in self.__hostnames if self.is_healthy(h)]
+            failed = [h for h in self.__hostnames if not self.is_healthy(h)]
+            healthy.sort(key=lambda h: (self.__latency.get(h, float('inf')), order[h]))
+            failed.sort(key=lambda h: self.__failed_at[h])
+        return healthy + failed
+
+    def best(self):
+        """ Return the fastest healthy host. """
+        return self.candidates()[0]
+
+    def probe(self, session=None, timeout=4):
+        """ Measure the latency of every host with a cheap version request. """
+        session = session or requests.Session()
+        for hostname in self.__hostnames:
+            start = time.perf_counter()
+            try:
+                response = session.get('https://' + hostname + '/rest_api/version', timeout=timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException:
+                self.mark_failed(hostname)
+            else:
+                self.observe(hostname, time.perf_counter() - start)
+
+    def __probe_loop(self):
+        session = requests.Session()
+        while not self.__stop.is_set():
+            self.probe(session)
+            self.__stop.wait(self.__probe_interval)
+
+    def start(self):
+        """ Start probing the hosts in the background. """
+        if self.__thread is None and self.__probe_interval:
+            self.__stop.clear()
+            self.__thread = threading.Thread(target=self.__probe_loop, daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        """ Stop probing the hosts. """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
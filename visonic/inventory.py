@@ -0,0 +1,119 @@
+import threading
+import time
+
+# Inventories invalidated by events whose label contains a keyword. The
+# labels are matched by keyword since they differ between panel models
+# and API versions.
+LABEL_KEYWORDS = (
+    ('ENROLL', ('devices', 'locations')),
+    ('DELETE', ('devices', 'users')),
+    ('REMOVE', ('devices',)),
+    ('RENAME', ('devices', 'locations', 'users')),
+    ('BYPASS', ('devices',)),
+    ('LOCATION', ('locations',)),
+    ('USER', ('users',)),
+    ('CODE', ('users',)),
+)
+
+INVENTORIES = ('devices', 'locations', 'users')
+
+
+class InventoryCache(object):
+    """ Keeps the devices, locations and users of a panel until an event
+    signals that they changed (enrollment, deletion, rename, bypass, user or
+    code changes), instead of fetching them again on every poll. Call
+    poll() (or process_events() with events fetched elsewhere) regularly
+    to detect the changes. """
+
+    def __init__(self, setup, max_age=None, type_ids=None, labels=None):
+        """ Set the private variable values on instantiation. The type_ids
+        and labels dictionaries map an event type id or an exact label to
+        the inventories it invalidates, in addition to the label keywords.
+        max_age optionally limits how long an inventory is kept at all. """
+        self.__setup = setup
+        self.__max_age = max_age
+        self.__type_ids = dict(type_ids or {})
+        self.__labels = dict(labels or {})
+        self.__inventories = {}
+        self.__last_event = None
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def setup(self):
+        return self.__setup
+
+    @property
+    def last_event(self):
+        """ Id of the newest event processed. """
+        return self.__last_event
+
+    def inventories_for(self, event):
+        """ Return the set of inventories an event invalidates. """
+        inventories = set(self.__type_ids.get(event.type_id, ()))
+        inventories.update(self.__labels.get(event.label, ()))
+        label = (event.label or '').upper()
+        for keyword, names in LABEL_KEYWORDS:
+            if keyword in label:
+                inventories.update(names)
+        return inventories
+
+    def invalidate(self, *inventories):
+        """ Drop the cached inventories (all of them by default). """
+        with self.__lock:
+            self.__generation += 1
+            for name in inventories or INVENTORIES:
+                self.__inventories.pop(name, None)
+
+    def process_events(self, events):
+        """ Invalidate the inventories affected by events newer than the last
+        processed event. Returns the set of invalidated inventories. """
+        invalidated = set()
+        last_event = self.__last_event
+        for event in events:
+            if last_event is not None and event.id <= last_event:
+                continue
+            invalidated.update(self.inventories_for(event))
+            if self.__last_event is None or event.id > self.__last_event:
+                self.__last_event = event.id
+        if invalidated:
+            self.invalidate(*invalidated)
+        return invalidated
+
+    def poll(self):
+        """ Fetch the events newer than the last processed event and
+        invalidate the affected inventories. Returns the set of invalidated
+        inventories. """
+        if self.__last_event is None:
+            events = self.__setup.get_events()
+        else:
+            events = self.__setup.get_events(since=self.__last_event)
+        return self.process_events(events)
+
+    def __get(self, name):
+        """ Return a cached inventory, fetching it when missing or too old. """
+        with self.__lock:
+            entry = self.__inventories.get(name)
+            generation = self.__generation
+        if entry is not None and (self.__max_age is None or time.monotonic() - entry[1] <= self.__max_age):
+            return list(entry[0])
+
+        value = getattr(self.__setup, 'get_' + name)()
+
+        # Do not keep an inventory fetched while it was invalidated
+        with self.__lock:
+            if generation == self.__generation:
+                self.__inventories[name] = (list(value), time.monotonic())
+        return value
+
+    def get_devices(self):
+        """ Return the devices, fetched only after a relevant event. """
+        return self.__get('devices')
+
+    def get_locations(self):
+        """ Return the locations, fetched only after a relevant event. """
+        return self.__get('locations')
+
+    def get_users(self):
+        """ Return the users, fetched only after a relevant event. """
+        return self.__get('users')
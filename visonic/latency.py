@@ -0,0 +1,91 @@
+import threading
+
+from collections import deque
+
+
+class EndpointLatency(object):
+    """ Class definition of the latency estimates of one endpoint. """
+
+    def __init__(self, alpha, window):
+        """ Set the private variable values on instantiation. """
+        self.__alpha = alpha
+        self.__samples = deque(maxlen=window)
+        self.__ewma = None
+        self.__ewmd = 0.0
+
+    def observe(self, latency):
+        """ Add a latency sample (in seconds). """
+        self.__samples.append(latency)
+        if self.__ewma is None:
+            self.__ewma = latency
+        else:
+            deviation = abs(latency - self.__ewma)
+            self.__ewmd += self.__alpha * (deviation - self.__ewmd)
+            self.__ewma += self.__alpha * (latency - self.__ewma)
+
+    @property
+    def count(self):
+        return len(self.__samples)
+
+    @property
+    def ewma(self):
+        """ Exponentially weighted moving average of the latency. """
+        return self.__ewma
+
+    @property
+    def ewmd(self):
+        """ Exponentially weighted moving deviation of the latency. """
+        return self.__ewmd
+
+    def percentile(self, q):
+        """ Return the q (0.0 - 1.0) percentile of the recent samples. """
+        if not self.__samples:
+            return None
+        samples = sorted(self.__samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class LatencyTracker(object):
+    """ Keeps EWMA and percentile latency estimates per endpoint and derives
+    adaptive timeouts and hedging delays from them. """
+
+    def __init__(self, alpha=0.2, window=100, min_samples=10, min_timeout=0.5, max_timeout=4.0):
+        """ Set the private variable values on instantiation. """
+        self.__alpha = alpha
+        self.__window = window
+        self.__min_samples = min_samples
+        self.__min_timeout = min_timeout
+        self.__max_timeout = max_timeout
+        self.__endpoints = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, endpoint, latency):
+        """ Add a latency sample of an endpoint. """
+        with self.__lock:
+            stats = self.__endpoints.get(endpoint)
+            if stats is None:
+                stats = self.__endpoints[endpoint] = EndpointLatency(self.__alpha, self.__window)
+            stats.observe(latency)
+
+    def stats(self, endpoint):
+        """ Return the EndpointLatency of an endpoint, None if never observed. """
+        return self.__endpoints.get(endpoint)
+
+    def percentile(self, endpoint, q):
+        """ Return a latency percentile of an endpoint, None until enough samples. """
+        with self.__lock:
+            stats = self.__endpoints.get(endpoint)
+            if stats is None or stats.count < self.__min_samples:
+                return None
+            return stats.percentile(q)
+
+    def timeout(self, endpoint, default):
+        """ Return the timeout of an endpoint: a margin above the p99 and the
+        EWMA + 4 deviations, kept between min_timeout and max_timeout. The
+        default is used until enough samples have been observed. """
+        with self.__lock:
+            stats = self.__endpoints.get(endpoint)
+            if stats is None or stats.count < self.__min_samples:
+                return default
+            estimate = max(stats.percentile(0.99), stats.ewma + 4 * stats.ewmd) * 2
+        return min(self.__max_timeout, max(self.__min_timeout, estimate))
@@ -0,0 +1,232 @@
+from dateutil import parser
+from dateutil.relativedelta import relativedelta
+
+from visonic.classes import Event, Partition, Status, Trouble
+from visonic.devices import *
+
+
+class _Field(object):
+    """ Non-data descriptor computing a private model attribute from the raw
+    dictionary on first access. The value is stored in the instance, so
+    later reads are plain attribute lookups. """
+
+    def __init__(self, name, compute):
+        """ Set the private variable values on instantiation. """
+        self.__name = name
+        self.__compute = compute
+
+    def __get__(self, view, cls):
+        if view is None:
+            return self
+        value = view.__dict__[self.__name] = self.__compute(view)
+        return value
+
+
+class _LazyView(object):
+    """ Base class of the lazy views. A view keeps the raw dictionary of
+    the API response and computes the model attributes when they are read. """
+
+    def __init__(self, raw):
+        """ Set the private variable values on instantiation. """
+        self._raw = raw
+
+
+def _key(key):
+    return lambda view: view._raw[key]
+
+
+def _trait(trait, key, default):
+    return lambda view: view._raw['traits'][trait][key] if trait in view._raw['traits'] else default
+
+
+def _location(view):
+    traits = view._raw['traits']
+    return traits['location']['name'].capitalize() if 'location' in traits else None
+
+
+def _install(cls, owner, fields):
+    """ Add a _Field for each (name, compute) pair to a view class. The
+    attribute names are those used by the properties of the owner class. """
+    for name, compute in fields.items():
+        attribute = f'_{owner.__name__}__{name}'
+        setattr(cls, attribute, _Field(attribute, compute))
+
+
+# Device views
+_DEVICE_FIELDS = {
+    'bypass': _trait('bypass', 'enabled', False),
+    'device_number': _key('device_number'),
+    'device_type': _key('device_type'),
+    'enrollment_id': _key('enrollment_id'),
+    'id': _key('id'),
+    'name': _key('name'),
+    'partitions': _key('partitions'),
+    'preenroll': _key('preenroll'),
+    'removable': _key('removable'),
+    'renamable': _key('renamable'),
+    'subtype': _key('subtype'),
+    'warnings': _key('warnings'),
+    'zone_type': _key('zone_type'),
+}
+
+
+class LazyCameraDevice(_LazyView, CameraDevice):
+    """ Lazy view of a camera device. """
+
+
+class LazyContactDevice(_LazyView, ContactDevice):
+    """ Lazy view of a contact device. """
+
+
+class LazyGenericDevice(_LazyView, GenericDevice):
+    """ Lazy view of a generic device. """
+
+
+class LazyGSMDevice(_LazyView, GSMDevice):
+    """ Lazy view of a GSM device. """
+
+
+class LazyKeyFobDevice(_LazyView, KeyFobDevice):
+    """ Lazy view of a KeyFob device. """
+
+
+class LazyPGMDevice(_LazyView, PGMDevice):
+    """ Lazy view of a PGM device. """
+
+
+class LazySmokeDevice(_LazyView, SmokeDevice):
+    """ Lazy view of a smoke device. """
+
+
+for _cls in (LazyCameraDevice, LazyContactDevice, LazyGenericDevice, LazyGSMDevice,
+             LazyKeyFobDevice, LazyPGMDevice, LazySmokeDevice):
+    _install(_cls, Device, _DEVICE_FIELDS)
+
+_install(LazyCameraDevice, CameraDevice, {
+    'location': _location,
+    'soak': _trait('soak', 'enabled', False),
+    'vod': lambda view: view._raw['traits'].get('vod'),
+})
+_install(LazyContactDevice, ContactDevice, {
+    'location': _location,
+    'soak': _trait('soak', 'enabled', False),
+})
+_install(LazyGSMDevice, GSMDevice, {
+    'signal_level': _trait('signal_level', 'level', None),
+})
+_install(LazyKeyFobDevice, KeyFobDevice, {
+    'owner_id': _trait('owner', 'id', None),
+    'owner_name': _trait('owner', 'name', None),
+})
+_install(LazyPGMDevice, PGMDevice, {
+    'parent_id': _trait('parent', 'id', None),
+    'parent_port': _trait('parent', 'port', None),
+})
+_install(LazySmokeDevice, SmokeDevice, {
+    'location': _location,
+    'soak': _trait('soak', 'enabled', False),
+})
+
+# Device view class by subtype, then by device type
+_DEVICE_SUBTYPES = {
+    'CONTACT': LazyContactDevice,
+    'MOTION_CAMERA': LazyCameraDevice,
+    'SMOKE': LazySmokeDevice,
+    'BASIC_KEYFOB': LazyKeyFobDevice,
+}
+_DEVICE_TYPES = {
+    'GSM': LazyGSMDevice,
+    'PGM': LazyPGMDevice,
+}
+
+
+def device(raw):
+    """ Return the lazy view of a device dictionary returned by the API. """
+    cls = _DEVICE_SUBTYPES.get(raw['subtype']) or _DEVICE_TYPES.get(raw['device_type'], LazyGenericDevice)
+    return cls(raw)
+
+
+# Status views
+class LazyPartition(_LazyView, Partition):
+    """ Lazy view of a partition. """
+
+
+_install(LazyPartition, Partition, {
+    'id': _key('id'),
+    'state': _key('state'),
+    'status': _key('status'),
+    'ready': _key('ready'),
+    'options': _key('options'),
+})
+
+
+def _connected(connection, key, default):
+    return lambda view: view._raw['connected_status'][connection][key] \
+        if connection in view._raw['connected_status'] else default
+
+
+class LazyStatus(_LazyView, Status):
+    """ Lazy view of the status of the alarm system. """
+
+
+_install(LazyStatus, Status, {
+    'connected': _key('connected'),
+    'bba_connected': _connected('bba', 'is_connected', False),
+    'bba_state': _connected('bba', 'state', 'unknown'),
+    'gprs_connected': _connected('gprs', 'is_connected', False),
+    'gprs_state': _connected('gprs', 'state', 'unknown'),
+    'discovery_completed': lambda view: view._raw['discovery']['completed'],
+    'discovery_stages': lambda view: view._raw['discovery']['stages'],
+    'discovery_in_queue': lambda view: view._raw['discovery']['in_queue'],
+    'discovery_triggered': lambda view: view._raw['discovery']['triggered'],
+    'partitions': lambda view: [LazyPartition(partition) for partition in view._raw['partitions']],
+    'rssi_level': lambda view: view._raw['rssi']['level'],
+    'rssi_network': lambda view: view._raw['rssi']['network'],
+})
+
+
+# Event views
+class LazyEvent(_LazyView, Event):
+    """ Lazy view of an event. The timestamp is only parsed when the
+    datetime is read. """
+
+    def __init__(self, raw, timestamp_hour_offset=2):
+        """ Set the private variable values on instantiation. """
+        _LazyView.__init__(self, raw)
+        self._timestamp_hour_offset = timestamp_hour_offset
+
+
+def _event_datetime(view):
+    dt = parser.parse(view._raw['datetime']) + relativedelta(hours=view._timestamp_hour_offset)
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+_install(LazyEvent, Event, {
+    'id': _key('event'),
+    'type_id': _key('type_id'),
+    'label': _key('label'),
+    'description': _key('description'),
+    'appointment': _key('appointment'),
+    'datetime': _event_datetime,
+    'video': _key('video'),
+    'device_type': _key('device_type'),
+    'zone': _key('zone'),
+    'partitions': _key('partitions'),
+    'name': _key('name'),
+})
+
+
+# Trouble views
+class LazyTrouble(_LazyView, Trouble):
+    """ Lazy view of a trouble. """
+
+
+_install(LazyTrouble, Trouble, {
+    'device_type': _key('device_type'),
+    'location': _key('location'),
+    'partitions': _key('partitions'),
+    'trouble_type': _key('trouble_type'),
+    'zone': _key('zone'),
+    'zone_name': _key('zone_name'),
+    'zone_type': _key('zone_type'),
+})
@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+def _safe_name(value):
+    """ Turn a value (timestamp, zone, ...) into a safe file name part. """
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(value)).strip('_')
+
+
+def _extension(url, default):
+    """ Return the file extension of a URL, or the default. """
+    extension = os.path.splitext(urlparse(url).path)[1]
+    return extension if extension else default
+
+
+class MediaFetcher(object):
+    """ Downloads camera previews and event videos through the authenticated
+    session with bounded concurrency. Files are streamed to disk and cached
+    by (zone, timestamp), so an unchanged preview is never downloaded twice.
+    A preview without a timestamp can not be told apart from a newer one
+    and is downloaded again on every fetch. """
+
+    def __init__(self, setup, directory, max_workers=8):
+        """ Set the private variable values on instantiation. """
+        self.__setup = setup
+        self.__directory = directory
+        self.__max_workers = max_workers
+        self.__in_flight = {}
+        self.__lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def directory(self):
+        return self.__directory
+
+    def preview_file(self, camera):
+        """ Return the cache file name of a camera preview. """
+        if camera.timestamp is None:
+            name = f'preview-{_safe_name(camera.zone)}'
+        else:
+            name = f'preview-{_safe_name(camera.zone)}-{_safe_name(camera.timestamp)}'
+        return os.path.join(self.__directory, name + _extension(camera.preview_path, '.jpg'))
+
+    def video_file(self, event):
+        """ Return the cache file name of an event video. """
+        name = f'video-{_safe_name(event.zone)}-{_safe_name(event.datetime)}-{_safe_name(event.id)}'
+        return os.path.join(self.__directory, name + _extension(event.video, '.mp4'))
+
+    def fetch(self, url, path, refresh=False):
+        """ Download a URL to path unless the file is already cached (or
+        refresh is True). A file requested by several threads at once is
+        only downloaded once. """
+        if not refresh and os.path.exists(path):
+            return path
+
+        with self.__lock:
+            event = self.__in_flight.get(path)
+            owner = event is None
+            if owner:
+                event = self.__in_flight[path] = threading.Event()
+
+        if not owner:
+            event.wait()
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Download of '{url}' failed.")
+            return path
+
+        try:
+            self.__setup.api.download(url, path)
+        finally:
+            with self.__lock:
+                del self.__in_flight[path]
+            event.set()
+        return path
+
+    def __fetch_all(self, jobs):
+        """ Download (key, url, path, refresh) jobs concurrently. Returns {key: path or exception}. """
+        results = {}
+        if not jobs:
+            return results
+
+        def call(job):
+            key, url, path, refresh = job
+            try:
+                return key, self.fetch(url, path, refresh)
+            except Exception as e:
+                return key, e
+
+        with ThreadPoolExecutor(max_workers=min(self.__max_workers, len(jobs))) as executor:
+            for key, result in executor.map(call, jobs):
+                results[key] = result
+        return results
+
+    def fetch_previews(self, cameras=None, zones=None):
+        """ Download the preview of the cameras (all cameras by default),
+        optionally only those in zones. Returns {zone: path or exception}. """
+        if cameras is None:
+            cameras = self.__setup.get_cameras()
+        jobs = [(camera.zone, camera.preview_path, self.preview_file(camera), camera.timestamp is None)
+                for camera in cameras
+                if camera.preview_path and (zones is None or camera.zone in zones)]
+        return self.__fetch_all(jobs)
+
+    def fetch_event_videos(self, events):
+        """ Download the videos of events carrying a video path or URL.
+        Returns {event id: path or exception}. """
+        jobs = [(event.id, event.video, self.video_file(event), False)
+                for event in events
+                if isinstance(event.video, str) and event.video]
+        return self.__fetch_all(jobs)
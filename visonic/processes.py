@@ -0,0 +1,146 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Process statuses that will not change anymore
+FINAL_STATUSES = ('succeeded', 'failed')
+
+
+class OperationResult(object):
+    """ Class definition of the outcome of one operation in a batch. """
+
+    def __init__(self, key, token=None, process=None, error=None):
+        """ Set the private variable values on instantiation. """
+        self.__key = key
+        self.__token = token
+        self.__process = process
+        self.__error = error
+
+    def __str__(self):
+        """ Define how the print() method should print the object. """
+        object_type = str(type(self))
+        return object_type + ": " + str(self.as_dict())
+
+    def __repr__(self):
+        """ Define how the object is represented on output to console. """
+        class_name = type(self).__name__
+        key        = f"key = {self.key}"
+        token      = f"token = '{self.token}'"
+        process    = f"process = {self.process}"
+        error      = f"error = {self.error!r}"
+
+        return f"{class_name}({key}, {token}, {process}, {error})"
+
+    def as_dict(self):
+        """ Return the object properties in a dictionary. """
+        return {
+            'key': self.key,
+            'token': self.token,
+            'process': self.process,
+            'error': self.error,
+            'succeeded': self.succeeded,
+        }
+
+    # Result properties
+    @property
+    def key(self):
+        """ The item the operation was performed on (zone, operation, ...). """
+        return self.__key
+
+    @property
+    def token(self):
+        """ Process token returned by the API server. """
+        return self.__token
+
+    @property
+    def process(self):
+        """ Last known process status, None if never fetched. """
+        return self.__process
+
+    @property
+    def error(self):
+        """ Exception raised when submitting or tracking the operation. """
+        return self.__error
+
+    @property
+    def succeeded(self):
+        return self.__error is None and self.__process is not None and self.__process.status == 'succeeded'
+
+
+def submit_concurrently(submit, keys, max_workers=8):
+    """ Call submit(key) for every key using at most max_workers threads and
+    return {key: (process_token, error)}. """
+    keys = list(keys)
+    results = {}
+    if not keys:
+        return results
+
+    def call(key):
+        try:
+            return submit(key), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        for key, result in zip(keys, executor.map(call, keys)):
+            results[key] = result
+    return results
+
+
+class ProcessTracker(object):
+    """ Tracks many process tokens with batched process status queries
+    instead of polling the tokens one at a time. """
+
+    def __init__(self, setup, interval=1.0, timeout=30, batch_size=25):
+        """ Set the private variable values on instantiation. """
+        self.__setup = setup
+        self.__interval = interval
+        self.__timeout = timeout
+        self.__batch_size = batch_size
+
+    def poll(self, tokens):
+        """ Fetch the status of the process tokens, batch_size tokens per request. """
+        tokens = list(tokens)
+        processes = {}
+        for index in range(0, len(tokens), self.__batch_size):
+            batch = tokens[index:index + self.__batch_size]
+            for process in self.__setup.get_process_status(','.join(batch)):
+                processes[process.token] = process
+        return processes
+
+    def wait(self, tokens):
+        """ Poll the process tokens until all of them reached a final status
+        or the timeout expired. Returns {token: Process}. """
+        pending = set(tokens)
+        processes = {}
+        deadline = time.monotonic() + self.__timeout
+        while pending:
+            for token, process in self.poll(pending).items():
+                processes[token] = process
+                if process.status in FINAL_STATUSES or process.error:
+                    pending.discard(token)
+            if not pending or time.monotonic() + self.__interval > deadline:
+                break
+            time.sleep(self.__interval)
+        return processes
+
+    def run(self, submit, keys, max_workers=8, wait=True):
+        """ Submit an operation per key concurrently and track all of the
+        returned process tokens together. Returns {key: OperationResult}. """
+        submitted = submit_concurrently(submit, keys, max_workers)
+        tokens = [token for token, error in submitted.values() if error is None]
+
+        processes = {}
+        tracking_error = None
+        if tokens:
+            try:
+                processes = self.wait(tokens) if wait else self.poll(tokens)
+            except Exception as e:
+                tracking_error = e
+
+        results = {}
+        for key, (token, error) in submitted.items():
+            if error is None and token not in processes:
+                error = tracking_error
+            results[key] = OperationResult(key, token, processes.get(token), error)
+        return results
@@ -0,0 +1,117 @@
+import functools
+import threading
+import time
+
+# CPU time of the current thread (falls back to process time on Python 3.6)
+_cpu_time = getattr(time, 'thread_time', time.process_time)
+
+
+class _NullPhase(object):
+    """ Context manager doing nothing, used when profiling is disabled. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class _Phase(object):
+    """ Context manager measuring the wall and CPU time of one phase. """
+
+    def __init__(self, profiler, name):
+        self.__profiler = profiler
+        self.__name = name
+
+    def __enter__(self):
+        self.__wall = time.perf_counter()
+        self.__cpu = _cpu_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.__wall
+        cpu = _cpu_time() - self.__cpu
+        self.__profiler.record(self.__profiler.current_method, self.__name, wall, cpu)
+        return False
+
+
+class _Method(object):
+    """ Context manager attributing phases in the current thread to a method. """
+
+    def __init__(self, profiler, local, name):
+        self.__profiler = profiler
+        self.__local = local
+        self.__name = name
+
+    def __enter__(self):
+        self.__previous = getattr(self.__local, 'method', None)
+        self.__local.method = self.__name
+        self.__phase = _Phase(self.__profiler, 'total').__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__phase.__exit__(*exc_info)
+        self.__local.method = self.__previous
+        return False
+
+
+class Profiler(object):
+    """ Records wall and CPU time per phase (network, decode, parse, build)
+    for each Setup method and keeps the aggregates. """
+
+    def __init__(self):
+        """ Set the private variable values on instantiation. """
+        self.__stats = {}
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+
+    @property
+    def current_method(self):
+        """ The method being profiled in the current thread. """
+        return getattr(self.__local, 'method', None) or '(direct)'
+
+    def method(self, name):
+        """ Return a context manager attributing phases to the method name. """
+        return _Method(self, self.__local, name)
+
+    def phase(self, name):
+        """ Return a context manager measuring one phase of the current method. """
+        return _Phase(self, name)
+
+    def record(self, method, phase, wall, cpu):
+        """ Add a wall and CPU time sample to the aggregates. """
+        with self.__lock:
+            phases = self.__stats.setdefault(method, {})
+            stats = phases.get(phase)
+            if stats is None:
+                stats = phases[phase] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0}
+            stats['calls'] += 1
+            stats['wall'] += wall
+            stats['cpu'] += cpu
+
+    def as_dict(self):
+        """ Return the aggregated timings as {method: {phase: {calls, wall, cpu}}}. """
+        with self.__lock:
+            return {method: {phase: dict(stats) for phase, stats in phases.items()}
+                    for method, phases in self.__stats.items()}
+
+    def reset(self):
+        """ Forget all recorded timings. """
+        with self.__lock:
+            self.__stats = {}
+
+
+def profiled(method):
+    """ Decorator attributing all phases of a Setup method to its name when
+    the Setup instance has profiling enabled. """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        with profiler.method(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,105 @@
+import heapq
+import itertools
+import threading
+
+# Priority classes, a lower value is more urgent
+CONTROL = 0
+ALARMS = 1
+STATUS = 2
+INVENTORY = 3
+
+# Priority class of each endpoint, endpoints not listed are INVENTORY
+ENDPOINT_PRIORITIES = {
+    'activate_siren': CONTROL,
+    'auth': CONTROL,
+    'disable_siren': CONTROL,
+    'panel/login': CONTROL,
+    'set_bypass_zone': CONTROL,
+    'set_state': CONTROL,
+    'alarms': ALARMS,
+    'alerts': ALARMS,
+    'process_status': STATUS,
+    'status': STATUS,
+    'troubles': STATUS,
+    'version': STATUS,
+}
+
+
+class _Slot(object):
+    """ Context manager holding a request slot of the scheduler. """
+
+    def __init__(self, scheduler, priority):
+        self.__scheduler = scheduler
+        self.__priority = priority
+
+    def __enter__(self):
+        self.__scheduler.acquire(self.__priority)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__scheduler.release()
+        return False
+
+
+class RequestScheduler(object):
+    """ Limits the number of concurrent requests of a panel session and
+    hands out free slots by priority class (control > alarms > status >
+    inventory/history). The reserved slots are only used by control
+    requests, so arming, disarming and siren commands get a slot quickly
+    no matter how much background polling is running. """
+
+    def __init__(self, max_concurrent=4, reserved=1, priorities=None):
+        """ Set the private variable values on instantiation. """
+        if reserved >= max_concurrent:
+            raise ValueError('At least one slot must be left for non-control requests.')
+        self.__max_concurrent = max_concurrent
+        self.__reserved = reserved
+        self.__priorities = dict(ENDPOINT_PRIORITIES, **(priorities or {}))
+        self.__active = 0
+        self.__waiting = []
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+
+    @property
+    def active(self):
+        """ Number of requests currently holding a slot. """
+        return self.__active
+
+    def priority(self, endpoint):
+        """ Return the priority class of an endpoint. """
+        return self.__priorities.get(endpoint, INVENTORY)
+
+    def __limit(self, priority):
+        """ Number of slots a priority class may use. """
+        return self.__max_concurrent if priority == CONTROL else self.__max_concurrent - self.__reserved
+
+    def __can_run(self, entry):
+        """ Check if the waiter may take a slot: a slot must be free for its
+        class and no more urgent waiter may be able to use it instead. """
+        if self.__active >= self.__limit(entry[0]):
+            return False
+        for other in self.__waiting:
+            if other < entry and self.__active < self.__limit(other[0]):
+                return False
+        return True
+
+    def acquire(self, priority):
+        """ Block until a slot is available for the priority class. """
+        with self.__condition:
+            entry = (priority, next(self.__sequence))
+            heapq.heappush(self.__waiting, entry)
+            while not self.__can_run(entry):
+                self.__condition.wait()
+            self.__waiting.remove(entry)
+            heapq.heapify(self.__waiting)
+            self.__active += 1
+
+    def release(self):
+        """ Give a slot back and wake up the waiters. """
+        with self.__condition:
+            self.__active -= 1
+            self.__condition.notify_all()
+
+    def slot(self, priority):
+        """ Return a context manager holding a slot of the priority class. """
+        return _Slot(self, priority)
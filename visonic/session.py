@@ -0,0 +1,80 @@
+import threading
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from visonic.alarm import Setup
+from visonic.core import API
+from visonic.exceptions import *
+
+
+class MultiPanelSession(object):
+    """ Authenticates an account once and logs in to many of its panels.
+    Every panel gets its own Setup (and session token) while all of them
+    share the user token and one connection pool to the API server. """
+
+    def __init__(self, hostname, app_id, api_version='latest', pool_size=10, **options):
+        """ Set the private variable values on instantiation. The options
+        are passed on to the Setup of each panel (profile, dedup_window, ...). """
+        self.__hostname = hostname
+        self.__app_id = app_id
+        self.__options = options
+        self.__panels = {}
+        self.__lock = threading.Lock()
+
+        # One connection pool shared by all panels
+        self.__session = requests.session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.__session.mount('https://', adapter)
+
+        # The account API negotiates the version and holds the user token
+        self.__api = API(hostname, app_id, options.get('capabilities'), session=self.__session)
+        self.__account = Setup(hostname, app_id, api_version, api=self.__api)
+
+    @property
+    def account(self):
+        """ Return the Setup used for account level calls (get_panels, ...). """
+        return self.__account
+
+    @property
+    def panels(self):
+        """ Return the logged in panels as {panel_serial: Setup}. """
+        return dict(self.__panels)
+
+    def authenticate(self, email, password):
+        """ Authenticate the account once and share the user token with all panels. """
+        result = self.__account.authenticate(email, password)
+        with self.__lock:
+            for setup in self.__panels.values():
+                setup.api.set_user_token(self.__api.user_token)
+        return result
+
+    def get_panels(self):
+        """ Fetch a list of panels associated with the account. """
+        return self.__account.get_panels()
+
+    def panel_login(self, panel_serial, user_code):
+        """ Log in to a panel and return its Setup. Logging in again to a
+        panel refreshes its session token. """
+        with self.__lock:
+            setup = self.__panels.get(panel_serial)
+        if setup is None:
+            api = API(self.__hostname, self.__app_id, self.__api.capabilities, session=self.__session)
+            api.set_rest_version(self.__api.rest_version)
+            setup = Setup(self.__hostname, self.__app_id, None, api=api, **self.__options)
+        if self.__api.user_token is None:
+            raise UserAuthRequiredError()
+        setup.login(None, None, panel_serial, user_code, user_token=self.__api.user_token)
+        with self.__lock:
+            self.__panels[panel_serial] = setup
+        return setup
+
+    def panel(self, panel_serial):
+        """ Return the Setup of a logged in panel. """
+        try:
+            return self.__panels[panel_serial]
+        except KeyError:
+            raise SessionTokenError(f"Not logged in to panel '{panel_serial}'.")
+
+    def __getitem__(self, panel_serial):
+        return self.panel(panel_serial)
@@ -0,0 +1,414 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from visonic.exceptions import *
+from visonic.session import MultiPanelSession
+
+
+class HashRing(object):
+    """ Consistent hash ring mapping keys (panel serials) to nodes (worker
+    processes). Every node is placed on the ring replicas times, so the keys
+    are spread evenly and changing the number of nodes only moves the keys
+    of the nodes added or removed. """
+
+    def __init__(self, nodes, replicas=64):
+        """ Set the private variable values on instantiation. """
+        ring = sorted((self.hash(f'{node}-{replica}'), node)
+                      for node in nodes for replica in range(replicas))
+        if not ring:
+            raise ValueError('A hash ring needs at least one node.')
+        self.__keys = [key for key, node in ring]
+        self.__nodes = [node for key, node in ring]
+
+    @staticmethod
+    def hash(key):
+        """ Return the position of a key on the ring. """
+        return int.from_bytes(hashlib.md5(str(key).encode('utf-8')).digest()[:8], 'big')
+
+    def node(self, key):
+        """ Return the node owning a key. """
+        index = bisect.bisect(self.__keys, self.hash(key)) % len(self.__keys)
+        return self.__nodes[index]
+
+
+class ShardedPanel(object):
+    """ Class definition of a panel polled by a ShardedPoller. Only the
+    credentials are sent to the worker process, which logs in itself. """
+
+    def __init__(self, panel_serial, user_code, email, password, name=None):
+        """ Set the private variable values on instantiation. """
+        self.__panel_serial = panel_serial
+        self.__user_code = user_code
+        self.__email = email
+        self.__password = password
+        self.__name = name
+
+    def __repr__(self):
+        """ Define how the object is represented on output to console. """
+        return f"{type(self).__name__}(panel_serial = '{self.panel_serial}', name = '{self.name}')"
+
+    @property
+    def panel_serial(self):
+        return self.__panel_serial
+
+    @property
+    def user_code(self):
+        return self.__user_code
+
+    @property
+    def email(self):
+        return self.__email
+
+    @property
+    def password(self):
+        return self.__password
+
+    @property
+    def name(self):
+        return self.__name if self.__name is not None else self.__panel_serial
+
+
+class PanelDelta(object):
+    """ Class definition of the changes of one panel since its previous poll. """
+
+    def __init__(self, panel_serial, name, shard, timestamp, status=None, devices=None,
+                 removed_devices=None, events=None, error=None):
+        """ Set the private variable values on instantiation. """
+        self.__panel_serial = panel_serial
+        self.__name = name
+        self.__shard = shard
+        self.__timestamp = timestamp
+        self.__status = status
+        self.__devices = devices or []
+        self.__removed_devices = removed_devices or []
+        self.__events = events or []
+        self.__error = error
+
+    def __str__(self):
+        """ Define how the print() method should print the object. """
+        object_type = str(type(self))
+        return object_type + ": " + str(self.as_dict())
+
+    def as_dict(self):
+        """ Return the object properties in a dictionary. """
+        return {
+            'panel_serial': self.panel_serial,
+            'name': self.name,
+            'shard': self.shard,
+            'timestamp': self.timestamp,
+            'status': self.status,
+            'devices': self.devices,
+            'removed_devices': self.removed_devices,
+            'events': self.events,
+            'error': self.error,
+        }
+
+    # Delta properties
+    @property
+    def panel_serial(self):
+        return self.__panel_serial
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def shard(self):
+        """ Index of the worker process polling the panel. """
+        return self.__shard
+
+    @property
+    def timestamp(self):
+        """ Time (time.time()) of the poll. """
+        return self.__timestamp
+
+    @property
+    def status(self):
+        """ The new Status, None if unchanged. """
+        return self.__status
+
+    @property
+    def devices(self):
+        """ The devices added or changed since the previous poll. """
+        return self.__devices
+
+    @property
+    def removed_devices(self):
+        """ The ids of the devices removed since the previous poll. """
+        return self.__removed_devices
+
+    @property
+    def events(self):
+        """ The events not seen in the previous poll. """
+        return self.__events
+
+    @property
+    def error(self):
+        """ Description of the error of a failed poll, None on success. """
+        return self.__error
+
+    @property
+    def is_empty(self):
+        return (self.__status is None and not self.__devices and not self.__removed_devices
+                and not self.__events and self.__error is None)
+
+
+class _Account(object):
+    """ An account inside a worker process. It is authenticated once and
+    its panels are logged in to with the shared user token (see
+    MultiPanelSession). """
+
+    def __init__(self, hostname, app_id, email, password, options):
+        """ Set the private variable values on instantiation. """
+        self.__session = MultiPanelSession(hostname, app_id, **options)
+        self.__email = email
+        self.__password = password
+        self.__lock = threading.Lock()
+
+    def panel_login(self, panel_serial, user_code, expired_user_token=None):
+        """ Log in to a panel and return its Setup. The account is
+        authenticated on first use, and again when expired_user_token is
+        still the user token of the account. """
+        with self.__lock:
+            user_token = self.__session.account.api.user_token
+            if user_token is None or user_token == expired_user_token:
+                self.__session.authenticate(self.__email, self.__password)
+        return self.__session.panel_login(panel_serial, user_code)
+
+
+class _PanelPoller(object):
+    """ Polls one panel inside a worker process and keeps the state needed
+    to compute its deltas. """
+
+    def __init__(self, panel, shard, account, resources):
+        """ Set the private variable values on instantiation. """
+        self.__panel = panel
+        self.__shard = shard
+        self.__account = account
+        self.__resources = resources
+        self.__setup = None
+        self.__user_token = None
+        self.__status = None
+        self.__devices = {}
+        self.__events = None
+
+    def __login(self, expired=False):
+        """ Log in to the panel with the user token of its account. When
+        expired is True, the user token used so far was rejected. """
+        self.__setup = self.__account.panel_login(self.__panel.panel_serial, self.__panel.user_code,
+                                                  self.__user_token if expired else None)
+        self.__user_token = self.__setup.api.user_token
+
+    def __fetch(self):
+        """ Fetch the resources of the panel, logging in again when the tokens expired. """
+        if self.__setup is None:
+            self.__login()
+        try:
+            return {resource: getattr(self.__setup, 'get_' + resource)() for resource in self.__resources}
+        except TOKEN_ERRORS as e:
+            # A rejected user token is renewed once for all panels of the account
+            self.__login(expired=not isinstance(e, SessionTokenError))
+            return {resource: getattr(self.__setup, 'get_' + resource)() for resource in self.__resources}
+
+    def poll(self):
+        """ Poll the panel and return a PanelDelta. Objects are compared by
+        their pickled form, so only the changed ones are sent to the parent. """
+        timestamp = time.time()
+        try:
+            result = self.__fetch()
+        except Exception as e:
+            return PanelDelta(self.__panel.panel_serial, self.__panel.name, self.__shard, timestamp,
+                              error=f'{type(e).__name__}: {e}')
+
+        status = None
+        if 'status' in result:
+            pickled = pickle.dumps(result['status'])
+            if pickled != self.__status:
+                self.__status = pickled
+                status = result['status']
+
+        devices = []
+        removed_devices = []
+        if 'devices' in result:
+            previous = self.__devices
+            self.__devices = {}
+            for device in result['devices']:
+                pickled = pickle.dumps(device)
+                self.__devices[device.id] = pickled
+                if previous.get(device.id) != pickled:
+                    devices.append(device)
+            removed_devices = [id for id in previous if id not in self.__devices]
+
+        events = []
+        if 'events' in result:
+            ids = set(event.id for event in result['events'])
+
+            # The first poll only records the events that already happened
+            if self.__events is not None:
+                events = [event for event in result['events'] if event.id not in self.__events]
+            self.__events = ids
+
+        return PanelDelta(self.__panel.panel_serial, self.__panel.name, self.__shard, timestamp,
+                          status, devices, removed_devices, events)
+
+
+def _sleep(stop, seconds):
+    """ Sleep until the stop event is set or the time has passed. The event
+    is polled instead of waited on: a worker killed inside stop.wait() would
+    make stop.set() in the parent block forever. """
+    deadline = time.monotonic() + seconds
+    while not stop.is_set() and time.monotonic() < deadline:
+        time.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+
+
+def _poll_shard(shard, panels, hostname, app_id, resources, interval, threads, options, deltas, stop):
+    """ Main loop of a worker process: poll the panels of the shard every
+    interval seconds and send the non-empty deltas of each round to the
+    parent in one message. A None message tells the parent the worker stopped. """
+    try:
+        # Creating an account already sends the version request
+        accounts = {}
+        pollers = []
+        for panel in panels:
+            key = (panel.email, panel.password)
+            if key not in accounts:
+                accounts[key] = _Account(hostname, app_id, panel.email, panel.password, options)
+            pollers.append(_PanelPoller(panel, shard, accounts[key], resources))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(threads, len(pollers)))) as executor:
+            while not stop.is_set():
+                started = time.monotonic()
+                batch = [delta for delta in executor.map(lambda poller: poller.poll(), pollers)
+                         if not delta.is_empty]
+                if batch:
+                    deltas.put((shard, batch))
+                _sleep(stop, interval - (time.monotonic() - started))
+    finally:
+        deltas.put((shard, None))
+
+
+class ShardedPoller(object):
+    """ Polls a large fleet of panels from several worker processes, so the
+    decoding of devices and events runs on all CPU cores. The panels are
+    assigned to the workers with a consistent hash of their serial. Every
+    worker keeps its own sessions and sends only the changes (new status,
+    changed devices and new events) back to the parent. """
+
+    def __init__(self, hostname, app_id, panels, workers=None, interval=30, threads=4,
+                 resources=('status', 'devices', 'events'), replicas=64, context=None, **options):
+        """ Set the private variable values on instantiation. The options
+        are passed on to the Setup of each panel (api_version, ...). """
+        self.__hostname = hostname
+        self.__app_id = app_id
+        self.__workers = workers or os.cpu_count() or 1
+        self.__interval = interval
+        self.__threads = threads
+        self.__resources = tuple(resources)
+        self.__options = options
+        self.__context = context or multiprocessing.get_context()
+        self.__ring = HashRing(range(self.__workers), replicas)
+
+        self.__shards = {shard: [] for shard in range(self.__workers)}
+        for panel in panels:
+            self.__shards[self.__ring.node(panel.panel_serial)].append(panel)
+
+        self.__processes = []
+        self.__deltas = None
+        self.__stop = None
+        self.__running = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    @property
+    def shards(self):
+        """ Return the panel serials polled by each worker as {shard: [panel_serial]}. """
+        return {shard: [panel.panel_serial for panel in panels] for shard, panels in self.__shards.items()}
+
+    def shard(self, panel_serial):
+        """ Return the index of the worker polling a panel. """
+        return self.__ring.node(panel_serial)
+
+    def start(self):
+        """ Start a worker process for every shard with panels. """
+        if self.__processes:
+            return
+        self.__deltas = self.__context.Queue()
+        self.__stop = self.__context.Event()
+        for shard, panels in self.__shards.items():
+            if not panels:
+                continue
+            process = self.__context.Process(
+                target=_poll_shard,
+                args=(shard, panels, self.__hostname, self.__app_id, self.__resources,
+                      self.__interval, self.__threads, self.__options, self.__deltas, self.__stop),
+                daemon=True)
+            process.start()
+            self.__processes.append(process)
+            self.__running[shard] = process
+
+    def get(self, timeout=None):
+        """ Wait for the next batch of deltas of a worker and return it as a
+        list. An empty list is returned on timeout or when all workers stopped. """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.__running:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                # Wake up regularly to notice workers that died without saying so
+                shard, batch = self.__deltas.get(timeout=1.0 if remaining is None else min(remaining, 1.0))
+            except queue.Empty:
+                self.__reap()
+                if deadline is not None and time.monotonic() >= deadline:
+                    return []
+                continue
+            if batch is None:
+                self.__running.pop(shard, None)
+                continue
+            return batch
+        return []
+
+    def __reap(self):
+        """ Count the workers that exited (or were killed) without sending
+        their final message as stopped. """
+        for shard, process in list(self.__running.items()):
+            if not process.is_alive():
+                del self.__running[shard]
+
+    def deltas(self):
+        """ Yield the PanelDelta objects as the workers send them, until all
+        workers have stopped. """
+        while self.__running:
+            for delta in self.get():
+                yield delta
+
+    def stop(self, timeout=10):
+        """ Stop the worker processes. Deltas still queued are discarded. """
+        if not self.__processes:
+            return
+        self.__stop.set()
+
+        # Drain the queue, a worker can not exit while its data is unread
+        deadline = time.monotonic() + timeout
+        while self.__running and time.monotonic() < deadline:
+            self.get(timeout=max(0.0, deadline - time.monotonic()))
+
+        for process in self.__processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.__processes = []
+        self.__running = {}
@@ -0,0 +1,225 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from visonic.exceptions import *
+from visonic.snapshot import from_bytes, to_bytes
+from visonic.stale import StaleValue
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    panel TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    data BLOB NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (panel, resource)
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    panel TEXT PRIMARY KEY,
+    user_token TEXT,
+    session_token TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    panel TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SharedStateCache(object):
+    """ Panel state and tokens shared by all processes on a host through a
+    SQLite database. A lease per panel decides which process refreshes the
+    panel, the other processes only read the stored state. The values are
+    stored in the snapshot format (see visonic.snapshot). """
+
+    def __init__(self, path, lease_time=30, timeout=10):
+        """ Set the private variable values on instantiation. """
+        self.__path = path
+        self.__lease_time = lease_time
+        self.__owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.executescript(_SCHEMA)
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def owner(self):
+        """ Identifier of this cache instance in the leases. """
+        return self.__owner
+
+    def close(self):
+        """ Close the database connection. """
+        with self.__lock:
+            self.__connection.close()
+
+    def put(self, panel, resource, value):
+        """ Store the value of a resource (status, devices, ...) of a panel. """
+        data = to_bytes(value)
+        with self.__lock:
+            self.__connection.execute('INSERT OR REPLACE INTO state (panel, resource, data, updated) VALUES (?, ?, ?, ?)',
+                                      (panel, resource, data, time.time()))
+
+    def get(self, panel, resource):
+        """ Return (value, updated) of a resource of a panel, None if not stored. """
+        with self.__lock:
+            row = self.__connection.execute('SELECT data, updated FROM state WHERE panel = ? AND resource = ?',
+                                            (panel, resource)).fetchone()
+        if row is None:
+            return None
+        return from_bytes(row[0]), row[1]
+
+    def put_tokens(self, panel, user_token, session_token):
+        """ Store the tokens used for a panel. """
+        with self.__lock:
+            self.__connection.execute('INSERT OR REPLACE INTO tokens (panel, user_token, session_token, updated) '
+                                      'VALUES (?, ?, ?, ?)', (panel, user_token, session_token, time.time()))
+
+    def get_tokens(self, panel):
+        """ Return (user_token, session_token) of a panel, None if not stored. """
+        with self.__lock:
+            row = self.__connection.execute('SELECT user_token, session_token FROM tokens WHERE panel = ?',
+                                            (panel,)).fetchone()
+        return tuple(row) if row is not None else None
+
+    def acquire_lease(self, panel):
+        """ Try to become (or stay) the process refreshing a panel. Returns
+        True when the lease is held by this cache instance. """
+        now = time.time()
+        with self.__lock:
+            connection = self.__connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute('SELECT owner, expires FROM leases WHERE panel = ?', (panel,)).fetchone()
+                acquired = row is None or row[0] == self.__owner or row[1] < now
+                if acquired:
+                    connection.execute('INSERT OR REPLACE INTO leases (panel, owner, expires) VALUES (?, ?, ?)',
+                                       (panel, self.__owner, now + self.__lease_time))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        return acquired
+
+    def release_lease(self, panel):
+        """ Give up the lease of a panel held by this cache instance. """
+        with self.__lock:
+            self.__connection.execute('DELETE FROM leases WHERE panel = ? AND owner = ?', (panel, self.__owner))
+
+
+class SharedPanel(object):
+    """ Serves the state of a panel from a SharedStateCache. When the state
+    is older than max_age, the process holding the lease of the panel
+    fetches it from the API server and stores it (and the tokens) in the
+    cache, all other processes keep serving the stored state. The number
+    of requests to the API server does not grow with the number of processes. """
+
+    def __init__(self, setup, cache, panel_serial, max_age=30, resources=('status', 'devices', 'troubles'),
+                 email=None, password=None, user_code=None, wait=10):
+        """ Set the private variable values on instantiation. The credentials
+        are optional and only used to log in when no valid tokens are shared. """
+        self.__setup = setup
+        self.__cache = cache
+        self.__panel_serial = panel_serial
+        self.__max_age = max_age
+        self.__resources = tuple(resources)
+        self.__email = email
+        self.__password = password
+        self.__user_code = user_code
+        self.__wait = wait
+        self.__lock = threading.Lock()
+
+    @property
+    def setup(self):
+        return self.__setup
+
+    @property
+    def panel_serial(self):
+        return self.__panel_serial
+
+    def __login(self):
+        """ Log in with the credentials and share the new tokens. """
+        if self.__email is None or self.__user_code is None:
+            raise SessionTokenError(f"No valid tokens for panel '{self.__panel_serial}' and no credentials to log in.")
+        self.__setup.login(self.__email, self.__password, self.__panel_serial, self.__user_code)
+        api = self.__setup.api
+        self.__cache.put_tokens(self.__panel_serial, api.user_token, api.session_token)
+
+    def __fetch(self):
+        """ Fetch the resources from the API server, using the shared tokens. """
+        tokens = self.__cache.get_tokens(self.__panel_serial)
+        api = self.__setup.api
+        if tokens is not None and tokens[1] != api.session_token:
+            api.set_tokens(tokens[0], tokens[1])
+        elif tokens is None and api.session_token is None:
+            self.__login()
+        elif tokens is None:
+            # Share the tokens of a Setup that was logged in already
+            self.__cache.put_tokens(self.__panel_serial, api.user_token, api.session_token)
+
+        try:
+            return {resource: getattr(self.__setup, 'get_' + resource)() for resource in self.__resources}
+        except TOKEN_ERRORS:
+            self.__login()
+            return {resource: getattr(self.__setup, 'get_' + resource)() for resource in self.__resources}
+
+    def refresh(self):
+        """ Fetch the state and store it in the cache if this process holds
+        the lease of the panel. Returns True if the state was refreshed. """
+        with self.__lock:
+            if not self.__cache.acquire_lease(self.__panel_serial):
+                return False
+            values = self.__fetch()
+            for resource, value in values.items():
+                self.__cache.put(self.__panel_serial, resource, value)
+            return True
+
+    def get(self, resource):
+        """ Return the StaleValue of a resource. The state is refreshed first
+        when it is older than max_age and this process holds the lease. A
+        process without the lease waits up to wait seconds for the first
+        state to be stored. """
+        if resource not in self.__resources:
+            raise ValueError(f"Unknown resource '{resource}'.")
+
+        error = None
+        entry = self.__cache.get(self.__panel_serial, resource)
+        if entry is None or time.time() - entry[1] > self.__max_age:
+            try:
+                if self.refresh():
+                    entry = self.__cache.get(self.__panel_serial, resource)
+            except Exception as e:
+                if entry is None:
+                    raise
+                error = e
+
+        deadline = time.monotonic() + self.__wait
+        while entry is None and time.monotonic() < deadline:
+            time.sleep(0.1)
+            entry = self.__cache.get(self.__panel_serial, resource)
+        if entry is None:
+            raise TimeoutError(f"No state of panel '{self.__panel_serial}' was stored.")
+
+        value, updated = entry
+        age = time.time() - updated
+        return StaleValue(value, updated, age, age > self.__max_age or error is not None, error)
+
+    def get_status(self):
+        """ Return the StaleValue of the Status. """
+        return self.get('status')
+
+    def get_devices(self):
+        """ Return the StaleValue of the list of devices. """
+        return self.get('devices')
+
+    def get_troubles(self):
+        """ Return the StaleValue of the list of troubles. """
+        return self.get('troubles')
@@ -0,0 +1,280 @@
+import inspect
+import mmap
+import os
+import struct
+
+from visonic import classes, devices
+
+# File and payload format version, bump when the encoding changes
+VERSION = 1
+
+_MAGIC = b'VSNP'
+_FILE_MAGIC = b'VSNF'
+_HEADER = struct.Struct('<4sB')
+_FILE_HEADER = struct.Struct('<4sBIQ')
+_INDEX_ENTRY = struct.Struct('<HQI')
+
+# Value tags
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT8 = 3
+_INT64 = 4
+_FLOAT = 5
+_STR8 = 6
+_STR32 = 7
+_LIST = 8
+_DICT = 9
+_OBJECT = 10
+
+_B = struct.Struct('<B')
+_I8 = struct.Struct('<b')
+_I = struct.Struct('<I')
+_Q = struct.Struct('<q')
+_D = struct.Struct('<d')
+
+# Model classes by code. The codes are part of the format, new classes
+# must be appended.
+_CLASSES = (
+    classes.Camera,
+    classes.Event,
+    classes.FeatureSet,
+    classes.Location,
+    classes.PanelInfo,
+    classes.Panel,
+    classes.Partition,
+    classes.Process,
+    classes.Status,
+    classes.Trouble,
+    classes.User,
+    classes.WakeupSMS,
+    devices.Device,
+    devices.CameraDevice,
+    devices.ContactDevice,
+    devices.GenericDevice,
+    devices.GSMDevice,
+    devices.KeyFobDevice,
+    devices.PGMDevice,
+    devices.SmokeDevice,
+)
+
+
+def _attributes(cls):
+    """ Return the names of the private attributes set by the constructor
+    of a model class, in the order of the constructor arguments. """
+    names = []
+    for parameter in list(inspect.signature(cls.__init__).parameters)[1:]:
+        # The attribute is owned by the class whose constructor takes the argument first
+        owner = next(base for base in reversed(cls.__mro__)
+                     if '__init__' in vars(base) and parameter in inspect.signature(base.__init__).parameters)
+        names.append(f'_{owner.__name__}__{parameter}')
+    return tuple(names)
+
+
+_SCHEMAS = [(cls, _attributes(cls)) for cls in _CLASSES]
+_CODES = {cls: code for code, (cls, attributes) in enumerate(_SCHEMAS)}
+
+
+def _schema(cls):
+    """ Return the code and attributes of a model class or of its nearest model base class. """
+    for base in cls.__mro__:
+        code = _CODES.get(base)
+        if code is not None:
+            return code, _SCHEMAS[code][1]
+    raise TypeError(f"Can not snapshot objects of type '{cls.__name__}'.")
+
+
+def _encode(value, out):
+    """ Append the encoding of a value to the out list. """
+    if value is None:
+        out.append(b'\x00')
+    elif value is True:
+        out.append(b'\x02')
+    elif value is False:
+        out.append(b'\x01')
+    elif isinstance(value, int):
+        if -128 <= value <= 127:
+            out.append(b'\x03' + _I8.pack(value))
+        else:
+            out.append(b'\x04' + _Q.pack(value))
+    elif isinstance(value, float):
+        out.append(b'\x05' + _D.pack(value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        if len(data) < 256:
+            out.append(b'\x06' + _B.pack(len(data)) + data)
+        else:
+            out.append(b'\x07' + _I.pack(len(data)) + data)
+    elif isinstance(value, (list, tuple)):
+        out.append(b'\x08' + _I.pack(len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(b'\x09' + _I.pack(len(value)))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        code, attributes = _schema(type(value))
+        out.append(b'\x0a' + _B.pack(code))
+        for attribute in attributes:
+            _encode(getattr(value, attribute, None), out)
+
+
+def _decode(data, offset):
+    """ Decode the value at offset, returns (value, next offset). """
+    tag = data[offset]
+    offset += 1
+    if tag == _STR8:
+        end = offset + 1 + data[offset]
+        return str(data[offset + 1:end], 'utf-8'), end
+    if tag == _INT8:
+        return _I8.unpack_from(data, offset)[0], offset + 1
+    if tag == _NONE:
+        return None, offset
+    if tag == _TRUE:
+        return True, offset
+    if tag == _FALSE:
+        return False, offset
+    if tag == _OBJECT:
+        cls, attributes = _SCHEMAS[data[offset]]
+        offset += 1
+        state = {}
+        for attribute in attributes:
+            state[attribute], offset = _decode(data, offset)
+        obj = cls.__new__(cls)
+        obj.__dict__ = state
+        return obj, offset
+    if tag == _LIST:
+        count = _I.unpack_from(data, offset)[0]
+        offset += 4
+        items = []
+        for _ in range(count):
+            item, offset = _decode(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _DICT:
+        count = _I.unpack_from(data, offset)[0]
+        offset += 4
+        items = {}
+        for _ in range(count):
+            key, offset = _decode(data, offset)
+            items[key], offset = _decode(data, offset)
+        return items, offset
+    if tag == _INT64:
+        return _Q.unpack_from(data, offset)[0], offset + 8
+    if tag == _FLOAT:
+        return _D.unpack_from(data, offset)[0], offset + 8
+    if tag == _STR32:
+        end = offset + 4 + _I.unpack_from(data, offset)[0]
+        return str(data[offset + 4:end], 'utf-8'), end
+    raise ValueError(f'Unknown snapshot tag {tag}.')
+
+
+def to_bytes(value):
+    """ Encode a model object (Status, Device, Event, ...), or a list or
+    dictionary of them, in the compact binary snapshot format. """
+    out = [_HEADER.pack(_MAGIC, VERSION)]
+    _encode(value, out)
+    return b''.join(out)
+
+
+def from_bytes(data):
+    """ Decode a value encoded with to_bytes(). The objects are restored
+    without calling their constructors. """
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError('Not a snapshot.')
+    if version != VERSION:
+        raise ValueError(f'Unsupported snapshot version {version}.')
+    return _decode(data, _HEADER.size)[0]
+
+
+class SnapshotFile(object):
+    """ Read only file of snapshots by key (for example the last known
+    state of thousands of panels by panel serial). The file is memory
+    mapped and only its index is read on open, a snapshot is decoded when
+    it is requested. """
+
+    def __init__(self, path):
+        """ Set the private variable values on instantiation. """
+        self.__path = path
+        self.__index = {}
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, index_offset = _FILE_HEADER.unpack_from(self.__map, 0)
+        if magic != _FILE_MAGIC:
+            self.__map.close()
+            raise ValueError(f"'{path}' is not a snapshot file.")
+        if version != VERSION:
+            self.__map.close()
+            raise ValueError(f'Unsupported snapshot file version {version}.')
+
+        offset = index_offset
+        for _ in range(count):
+            length, data_offset, data_length = _INDEX_ENTRY.unpack_from(self.__map, offset)
+            offset += _INDEX_ENTRY.size
+            key = self.__map[offset:offset + length].decode('utf-8')
+            offset += length
+            self.__index[key] = (data_offset, data_length)
+
+    @staticmethod
+    def write(path, snapshots):
+        """ Write a {key: value} dictionary to a snapshot file. The file is
+        replaced atomically, so readers never see a partial file. """
+        blobs = []
+        index = []
+        offset = _FILE_HEADER.size
+        for key, value in snapshots.items():
+            out = []
+            _encode(value, out)
+            blob = b''.join(out)
+            blobs.append(blob)
+            index.append((str(key).encode('utf-8'), offset, len(blob)))
+            offset += len(blob)
+
+        temporary = path + '.part'
+        with open(temporary, 'wb') as f:
+            f.write(_FILE_HEADER.pack(_FILE_MAGIC, VERSION, len(index), offset))
+            for blob in blobs:
+                f.write(blob)
+            for key, data_offset, data_length in index:
+                f.write(_INDEX_ENTRY.pack(len(key), data_offset, data_length))
+                f.write(key)
+        os.replace(temporary, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __contains__(self, key):
+        return key in self.__index
+
+    def __getitem__(self, key):
+        offset, length = self.__index[key]
+        return _decode(self.__map[offset:offset + length], 0)[0]
+
+    @property
+    def path(self):
+        return self.__path
+
+    def keys(self):
+        """ Return the keys of the snapshots in the file. """
+        return list(self.__index)
+
+    def get(self, key, default=None):
+        """ Return the decoded snapshot of a key, or default. """
+        if key not in self.__index:
+            return default
+        return self[key]
+
+    def close(self):
+        """ Unmap the file. """
+        self.__map.close()
@@ -0,0 +1,155 @@
+import threading
+import time
+
+
+class StaleValue(object):
+    """ Class definition of a value served by a StaleWhileRevalidate cache. """
+
+    def __init__(self, value, updated, age, stale, error=None):
+        """ Set the private variable values on instantiation. """
+        self.__value = value
+        self.__updated = updated
+        self.__age = age
+        self.__stale = stale
+        self.__error = error
+
+    def __str__(self):
+        """ Define how the print() method should print the object. """
+        object_type = str(type(self))
+        return object_type + ": " + str(self.as_dict())
+
+    def as_dict(self):
+        """ Return the object properties in a dictionary. """
+        return {
+            'value': self.value,
+            'updated': self.updated,
+            'age': self.age,
+            'stale': self.stale,
+            'error': self.error,
+        }
+
+    # Value properties
+    @property
+    def value(self):
+        """ The last value fetched successfully. """
+        return self.__value
+
+    @property
+    def updated(self):
+        """ Time (time.time()) the value was fetched. """
+        return self.__updated
+
+    @property
+    def age(self):
+        """ Seconds since the value was fetched. """
+        return self.__age
+
+    @property
+    def stale(self):
+        """ The value is older than max_age or the last refresh failed. """
+        return self.__stale
+
+    @property
+    def error(self):
+        """ The exception of the last failed refresh, None if it succeeded. """
+        return self.__error
+
+
+class StaleWhileRevalidate(object):
+    """ Serves the last good status, devices and troubles of a panel without
+    waiting for the API server. A value older than max_age is still
+    returned immediately (flagged as stale) while it is refreshed in the
+    background, with at most one refresh in flight for the panel. When the
+    API server is slow or the panel is not connected, the last good values
+    are served until a refresh succeeds. """
+
+    def __init__(self, setup, max_age=30, retry_after=5, resources=('status', 'devices', 'troubles')):
+        """ Set the private variable values on instantiation. """
+        self.__setup = setup
+        self.__max_age = max_age
+        self.__retry_after = retry_after
+        self.__resources = tuple(resources)
+        self.__values = {}
+        self.__error = None
+        self.__failed_at = None
+        self.__refreshing = None
+        self.__lock = threading.Lock()
+
+    @property
+    def setup(self):
+        return self.__setup
+
+    @property
+    def refreshing(self):
+        """ A refresh is in flight. """
+        return self.__refreshing is not None
+
+    def __fetch(self):
+        """ Fetch all resources from the API server. """
+        values = {}
+        for resource in self.__resources:
+            values[resource] = (getattr(self.__setup, 'get_' + resource)(), time.time(), time.monotonic())
+        return values
+
+    def __refresh(self, done):
+        """ Fetch the resources and replace the served values. """
+        try:
+            values = self.__fetch()
+        except Exception as e:
+            with self.__lock:
+                self.__error = e
+                self.__failed_at = time.monotonic()
+        else:
+            with self.__lock:
+                self.__values.update(values)
+                self.__error = None
+                self.__failed_at = None
+        finally:
+            with self.__lock:
+                self.__refreshing = None
+            done.set()
+
+    def refresh(self, wait=False):
+        """ Start a refresh unless one is in flight, and optionally wait for it. """
+        with self.__lock:
+            done = self.__refreshing
+            if done is None:
+                done = self.__refreshing = threading.Event()
+                threading.Thread(target=self.__refresh, args=(done,), daemon=True).start()
+        if wait:
+            done.wait()
+
+    def get(self, resource):
+        """ Return the StaleValue of a resource (status, devices or troubles).
+        Only the first call waits for the API server, and raises the error
+        when that fetch fails. """
+        entry = self.__values.get(resource)
+        if entry is None:
+            if resource not in self.__resources:
+                raise ValueError(f"Unknown resource '{resource}'.")
+            self.refresh(wait=True)
+            entry = self.__values.get(resource)
+            if entry is None:
+                raise self.__error
+
+        value, updated, fetched = entry
+        now = time.monotonic()
+        age = now - fetched
+        error = self.__error
+        if age > self.__max_age and self.__refreshing is None:
+            failed_at = self.__failed_at
+            if failed_at is None or now - failed_at > self.__retry_after:
+                self.refresh()
+        return StaleValue(value, updated, age, age > self.__max_age or error is not None, error)
+
+    def get_status(self):
+        """ Return the StaleValue of the Status. """
+        return self.get('status')
+
+    def get_devices(self):
+        """ Return the StaleValue of the list of devices. """
+        return self.get('devices')
+
+    def get_troubles(self):
+        """ Return the StaleValue of the list of troubles. """
+        return self.get('troubles')